@@ -0,0 +1,230 @@
+"""
+Activity (audit) event recording off the request's write path.
+
+Routes call recorder.record(...) before committing their change. What
+happens next depends on ACTIVITY_MODE:
+
+* 'sync': the Activity row is added to the caller's session and commits with
+  the change itself, in the same transaction.
+* 'buffered' (default): the event is held on the session until it commits
+  (a rolled-back change records nothing), then put on a bounded queue. A
+  background thread writes queued events with one multi-row INSERT every
+  ACTIVITY_FLUSH_BATCH events or ACTIVITY_FLUSH_INTERVAL_MS milliseconds.
+  If the queue is full the events are written synchronously instead of
+  being dropped, and the queue is drained at interpreter exit.
+
+A batch that fails is retried ACTIVITY_MAX_ATTEMPTS times in all, then split
+in halves until the rows that still fail are isolated; those are logged and
+kept in recorder.dead_letters, so one bad row cannot stall the log. Nothing
+raises out of the after_commit hook: the change itself has already committed.
+"""
+import atexit
+import collections
+import logging
+import queue
+import threading
+import time
+from datetime import datetime
+
+from sqlalchemy import event, insert, select
+from sqlalchemy.orm import Session
+
+from config import db
+from models import Activity, Task
+from versions import bump_versions
+from events import broadcaster
+
+logger = logging.getLogger(__name__)
+
+ACTIVITY_MODES = ('buffered', 'sync')
+
+# Failed rows kept for inspection (oldest are dropped first)
+MAX_DEAD_LETTERS = 1000
+
+
+class ActivityRecorder:
+    def __init__(self, app, mode='buffered', batch_size=100, flush_interval_ms=200, max_queue=10000,
+                 max_attempts=3):
+        if mode not in ACTIVITY_MODES:
+            raise ValueError(f"Unknown ACTIVITY_MODE: {mode}")
+        self.app = app
+        self.mode = mode
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval_ms / 1000
+        self.max_attempts = max(1, max_attempts)
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._write_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+        self._thread_lock = threading.Lock()
+        self.written = 0
+        self.overflowed = 0
+        self.dead_letters = collections.deque(maxlen=MAX_DEAD_LETTERS)
+
+    def record(self, event_type, message, task_id=None, user_id=None):
+        """Record an event as part of the current transaction; the caller commits."""
+        if self.mode == 'sync':
+            db.session.add(Activity(event_type=event_type, message=message, task_id=task_id, user_id=user_id))
+            return
+        row = {'event_type': event_type, 'message': message, 'task_id': task_id,
+               'user_id': user_id, 'created_at': datetime.utcnow()}
+        db.session.info.setdefault('pending_activities', []).append((self, row))
+
+    def enqueue(self, rows):
+        self._ensure_thread()
+        overflow = []
+        for row in rows:
+            try:
+                self._queue.put_nowait(row)
+            except queue.Full:
+                overflow.append(row)
+        if overflow:
+            # Never drop audit events: pay for the write on this request instead
+            self.overflowed += len(overflow)
+            self._write_isolating(overflow)
+
+    def flush(self):
+        """Write everything queued so far; returns the number of rows written."""
+        written = 0
+        while True:
+            rows = self._drain(self.batch_size)
+            if not rows:
+                return written
+            written += self._write_isolating(rows)
+
+    def close(self):
+        self._stop.set()
+        try:
+            self._queue.put_nowait(None)  # wake the flush thread
+        except queue.Full:
+            pass
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+            self._thread = None
+        self.flush()
+
+    def pending(self):
+        return self._queue.qsize()
+
+    def _drain(self, limit):
+        rows = []
+        while len(rows) < limit:
+            try:
+                row = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if row is not None:
+                rows.append(row)
+        return rows
+
+    def _write(self, rows):
+        with self._write_lock, self.app.app_context():
+            with db.engine.begin() as conn:
+                conn.execute(insert(Activity.__table__).values(_without_deleted_tasks(conn, rows)))
+                bump_versions(conn, {'activity'})
+            self.written += len(rows)
+        broadcaster.publish('activity', {'action': 'created', 'count': len(rows)})
+
+    def _write_isolating(self, rows):
+        """Write rows, halving a failing batch until the bad rows are dead-lettered.
+
+        Returns the number of rows written; never raises.
+        """
+        try:
+            self._write(rows)
+            return len(rows)
+        except Exception:
+            if len(rows) == 1:
+                logger.exception("Dead-lettering activity event %r", rows[0])
+                self.dead_letters.append(rows[0])
+                return 0
+        middle = len(rows) // 2
+        return self._write_isolating(rows[:middle]) + self._write_isolating(rows[middle:])
+
+    def _ensure_thread(self):
+        if self._thread is not None:
+            return
+        with self._thread_lock:
+            if self._thread is None and not self._stop.is_set():
+                self._thread = threading.Thread(target=self._loop, name='taskwise-activity', daemon=True)
+                self._thread.start()
+
+    def _loop(self):
+        retry, attempts = [], 0
+        while not self._stop.is_set():
+            deadline = time.monotonic() + self.flush_interval
+            rows = retry
+            while len(rows) < self.batch_size and time.monotonic() < deadline:
+                try:
+                    row = self._queue.get(timeout=max(0.0, deadline - time.monotonic()))
+                except queue.Empty:
+                    break
+                if row is None:
+                    break
+                rows.append(row)
+            rows.extend(self._drain(self.batch_size - len(rows)))
+            if not rows:
+                retry = []
+                continue
+            try:
+                self._write(rows)
+                retry, attempts = [], 0
+            except Exception:
+                attempts += 1
+                if attempts < self.max_attempts:
+                    # Possibly transient (lock timeout, lost connection): try the batch again next cycle
+                    logger.warning("Writing %d activity events failed (attempt %d of %d)",
+                                   len(rows), attempts, self.max_attempts, exc_info=True)
+                    retry = rows
+                    self._stop.wait(self.flush_interval)
+                else:
+                    self._write_isolating(rows)
+                    retry, attempts = [], 0
+        if retry:
+            self._write_isolating(retry)
+
+
+def _without_deleted_tasks(conn, rows):
+    """Drop task_id from rows whose task was deleted before they were written (it would break the FK)"""
+    task_ids = {row['task_id'] for row in rows if row['task_id'] is not None}
+    if not task_ids:
+        return rows
+    existing = set(conn.execute(select(Task.id).where(Task.id.in_(task_ids))).scalars())
+    return [row if row['task_id'] is None or row['task_id'] in existing else {**row, 'task_id': None}
+            for row in rows]
+
+
+@event.listens_for(Session, 'after_commit')
+def _enqueue_committed(session):
+    pending = session.info.pop('pending_activities', None)
+    if not pending:
+        return
+    by_recorder = {}
+    for recorder, row in pending:
+        by_recorder.setdefault(recorder, []).append(row)
+    for recorder, rows in by_recorder.items():
+        try:
+            recorder.enqueue(rows)
+        except Exception:
+            # The change is committed; failing the request now would only hide that
+            logger.exception("Queueing %d activity events failed", len(rows))
+
+
+@event.listens_for(Session, 'after_rollback')
+def _discard_rolled_back(session):
+    session.info.pop('pending_activities', None)
+
+
+def init_activity_recorder(app):
+    """Create the recorder from config, register it on the app and flush it at exit."""
+    recorder = ActivityRecorder(
+        app,
+        mode=app.config.get('ACTIVITY_MODE', 'buffered'),
+        batch_size=app.config.get('ACTIVITY_FLUSH_BATCH', 100),
+        flush_interval_ms=app.config.get('ACTIVITY_FLUSH_INTERVAL_MS', 200),
+        max_queue=app.config.get('ACTIVITY_QUEUE_SIZE', 10000),
+        max_attempts=app.config.get('ACTIVITY_MAX_ATTEMPTS', 3),
+    )
+    app.extensions['taskwise_activity'] = recorder
+    atexit.register(recorder.close)
+    return recorder
@@ -0,0 +1,79 @@
+"""
+Create any index declared on the models that is missing from the database.
+
+db.create_all() only creates indexes together with new tables, so databases
+created before an index was added to a model need this script. Tables that
+gained an index are re-analyzed so the planner has statistics for it. Works
+on SQLite and MySQL.
+
+Before a unique index is created, rows that would violate it are removed
+(the oldest copy is kept; see DEDUPLICATE), and indexes it replaces are
+dropped (see SUPERSEDED).
+
+Usage:
+    python add_indexes.py
+"""
+from sqlalchemy import inspect, text
+
+from config import create_app, db
+
+# Unique index -> duplicate rows to delete before creating it
+DEDUPLICATE = {
+    'uq_task_dependencies_edge': (
+        "DELETE FROM task_dependencies WHERE id NOT IN "
+        "(SELECT id FROM (SELECT MIN(id) AS id FROM task_dependencies GROUP BY task_id, depends_on_id) AS keep)"
+    ),
+}
+
+# Index -> older indexes on the same columns it replaces
+SUPERSEDED = {
+    'uq_task_dependencies_edge': ('ix_task_dependencies_task_id',),
+}
+
+
+def add_missing_indexes():
+    inspector = inspect(db.engine)
+    created = []
+    analyze = []
+    for table in db.metadata.sorted_tables:
+        if not inspector.has_table(table.name):
+            continue
+        existing = {index['name'] for index in inspector.get_indexes(table.name)}
+        for index in sorted(table.indexes, key=lambda i: i.name):
+            if index.name not in existing:
+                if index.name in DEDUPLICATE:
+                    with db.engine.begin() as conn:
+                        removed = conn.execute(text(DEDUPLICATE[index.name])).rowcount
+                    if removed:
+                        print(f"🧹 Removed {removed} duplicate row(s) from {table.name}")
+                index.create(db.engine)
+                created.append(index.name)
+                print(f"➕ Created {index.name} on {table.name}")
+                for old_name in SUPERSEDED.get(index.name, ()):
+                    if old_name in existing:
+                        preparer = db.engine.dialect.identifier_preparer
+                        on_table = f" ON {preparer.quote(table.name)}" if db.engine.dialect.name == 'mysql' else ''
+                        with db.engine.begin() as conn:
+                            conn.execute(text(f"DROP INDEX {preparer.quote(old_name)}{on_table}"))
+                        print(f"➖ Dropped {old_name}, replaced by {index.name}")
+                if table.name not in analyze:
+                    analyze.append(table.name)
+    if analyze:
+        analyze_tables(analyze)
+    return created
+
+
+def analyze_tables(names):
+    preparer = db.engine.dialect.identifier_preparer
+    keyword = 'ANALYZE TABLE' if db.engine.dialect.name == 'mysql' else 'ANALYZE'
+    with db.engine.connect() as conn:
+        for name in names:
+            conn.execute(text(f"{keyword} {preparer.quote(name)}"))
+        conn.commit()
+
+
+if __name__ == "__main__":
+    app = create_app()
+    with app.app_context():
+        created = add_missing_indexes()
+        print(f"✅ {len(created)} index(es) created" if created else "✅ All indexes already present")
@@ -0,0 +1,211 @@
+"""
+Server-side aggregates behind /api/stats and /api/analytics/*.
+
+Every function here answers with a handful of GROUP BY rows computed by the
+database, so the browser never has to download and count the task table.
+Each also has a dev_* counterpart used when SKIP_DB=1 and tasks are dicts.
+"""
+from datetime import datetime, timedelta
+
+from sqlalchemy import func, case, and_
+
+from config import db
+from models import Task, Project, TaskStatus, Priority
+from models.sqlfuncs import day_bucket, week_bucket, seconds_between
+
+BUCKETS = {'day': day_bucket, 'week': week_bucket}
+
+
+def _overdue_case(now):
+    return case((and_(Task.due_date < now, Task.status != TaskStatus.COMPLETED), 1), else_=0)
+
+
+def _status_bucket(value):
+    """Distribution key for a stored status: anything not started or finished counts as todo.
+
+    'overdue' is reported separately, from due dates (see _overdue_case), so a
+    task stored as overdue is counted there once and under todo like the rest.
+    """
+    return value if value in (TaskStatus.IN_PROGRESS.value, TaskStatus.COMPLETED.value) else TaskStatus.TODO.value
+
+
+def _scoped(query, project_id):
+    if project_id:
+        query = query.filter(Task.project_id == project_id)
+    return query
+
+
+def dashboard_stats(project_id=None):
+    """KPI counters from a single grouped query over tasks"""
+    counts, overdue_tasks = _status_counts(project_id)
+    total_tasks = sum(counts.values())
+    completed_tasks = counts.get(TaskStatus.COMPLETED.value, 0)
+    in_progress_tasks = counts.get(TaskStatus.IN_PROGRESS.value, 0)
+    completion_rate = (completed_tasks / total_tasks * 100) if total_tasks > 0 else 0
+    return {'total_tasks': total_tasks, 'completed_tasks': completed_tasks, 'in_progress_tasks': in_progress_tasks, 'overdue_tasks': overdue_tasks, 'completion_rate': round(completion_rate, 1), 'todo_tasks': total_tasks - completed_tasks - in_progress_tasks}
+
+
+def _status_counts(project_id=None):
+    """Return ({status: count}, overdue_count) with GROUP BY status"""
+    query = db.session.query(Task.status, func.count(Task.id), func.sum(_overdue_case(datetime.utcnow())))
+    counts = {}
+    overdue = 0
+    for status, count, overdue_count in _scoped(query, project_id).group_by(Task.status):
+        counts[status.value] = count
+        overdue += overdue_count or 0
+    return counts, overdue
+
+
+def distribution(project_id=None):
+    """Task counts by status (plus overdue) and by priority"""
+    counts, overdue = _status_counts(project_id)
+    status = {s.value: 0 for s in TaskStatus}
+    for value, count in counts.items():
+        status[_status_bucket(value)] += count
+    status['overdue'] = overdue
+
+    priority = {p.value: 0 for p in Priority}
+    query = db.session.query(Task.priority, func.count(Task.id))
+    for value, count in _scoped(query, project_id).group_by(Task.priority):
+        priority[value.value] = count
+    return {'status': status, 'priority': priority}
+
+
+def completion_series(interval='day', days=30, project_id=None):
+    """Completed task counts per day or week over the last `days` days"""
+    bucket = BUCKETS[interval](Task.completed_at)
+    since = datetime.utcnow() - timedelta(days=days)
+    query = (
+        db.session.query(bucket.label('period'), func.count(Task.id))
+        .filter(Task.completed_at.isnot(None), Task.completed_at >= since)
+    )
+    rows = _scoped(query, project_id).group_by(bucket).order_by(bucket)
+    return [{'period': str(period), 'completed': count} for period, count in rows]
+
+
+def cycle_time(project_id=None, days=None):
+    """Average hours from created_at to completed_at for completed tasks"""
+    query = db.session.query(
+        func.count(Task.id),
+        func.avg(seconds_between(Task.created_at, Task.completed_at)),
+    ).filter(Task.completed_at.isnot(None), Task.created_at.isnot(None))
+    if days:
+        query = query.filter(Task.completed_at >= datetime.utcnow() - timedelta(days=days))
+    count, avg_seconds = _scoped(query, project_id).one()
+    return {
+        'completed_tasks': count,
+        'average_cycle_hours': round(avg_seconds / 3600, 2) if avg_seconds is not None else None,
+    }
+
+
+def project_throughput(days=30):
+    """Per-project totals, completions in the window and average cycle time"""
+    since = datetime.utcnow() - timedelta(days=days)
+    in_window = and_(Task.completed_at.isnot(None), Task.completed_at >= since)
+    rows = (
+        db.session.query(
+            Task.project_id,
+            Project.name,
+            Project.color,
+            func.count(Task.id),
+            func.sum(case((in_window, 1), else_=0)),
+            func.avg(case((in_window, seconds_between(Task.created_at, Task.completed_at)), else_=None)),
+        )
+        .outerjoin(Project, Project.id == Task.project_id)
+        .group_by(Task.project_id, Project.name, Project.color)
+        .order_by(func.count(Task.id).desc())
+    )
+    return [{
+        'project_id': project_id,
+        'project_name': name or 'No Project',
+        'project_color': color or '#667eea',
+        'total_tasks': total,
+        'completed_in_period': completed or 0,
+        'average_cycle_hours': round(avg_seconds / 3600, 2) if avg_seconds is not None else None,
+    } for project_id, name, color, total, completed, avg_seconds in rows]
+
+
+# ---- SKIP_DB equivalents over dev store task dicts ----
+
+def _parse(value):
+    if not value:
+        return None
+    try:
+        return datetime.fromisoformat(value.replace('Z', '+00:00')).replace(tzinfo=None)
+    except (AttributeError, ValueError):
+        return None
+
+
+def _dev_scoped(tasks, project_id):
+    return [t for t in tasks if not project_id or str(t.get('project_id')) == str(project_id)]
+
+
+def dev_dashboard_stats(tasks, project_id=None):
+    dist = dev_distribution(tasks, project_id)['status']
+    total_tasks = len(_dev_scoped(tasks, project_id))
+    completed_tasks = dist['completed']
+    in_progress_tasks = dist['in_progress']
+    completion_rate = (completed_tasks / total_tasks * 100) if total_tasks > 0 else 0
+    return {'total_tasks': total_tasks, 'completed_tasks': completed_tasks, 'in_progress_tasks': in_progress_tasks, 'overdue_tasks': dist['overdue'], 'completion_rate': round(completion_rate, 1), 'todo_tasks': total_tasks - completed_tasks - in_progress_tasks}
+
+
+def dev_distribution(tasks, project_id=None):
+    now = datetime.utcnow()
+    status = {s.value: 0 for s in TaskStatus}
+    priority = {p.value: 0 for p in Priority}
+    for t in _dev_scoped(tasks, project_id):
+        st = t.get('status') or 'todo'
+        status[_status_bucket(st)] += 1
+        priority[t.get('priority') or 'medium'] = priority.get(t.get('priority') or 'medium', 0) + 1
+        due = _parse(t.get('due_date'))
+        if due and due < now and st != 'completed':
+            status['overdue'] += 1
+    return {'status': status, 'priority': priority}
+
+
+def dev_completion_series(tasks, interval='day', days=30, project_id=None):
+    since = datetime.utcnow() - timedelta(days=days)
+    buckets = {}
+    for t in _dev_scoped(tasks, project_id):
+        done = _parse(t.get('completed_at'))
+        if not done or done < since:
+            continue
+        day = done.date() if interval == 'day' else (done - timedelta(days=done.weekday())).date()
+        buckets[day.isoformat()] = buckets.get(day.isoformat(), 0) + 1
+    return [{'period': period, 'completed': buckets[period]} for period in sorted(buckets)]
+
+
+def dev_cycle_time(tasks, project_id=None, days=None):
+    since = datetime.utcnow() - timedelta(days=days) if days else None
+    hours = []
+    for t in _dev_scoped(tasks, project_id):
+        done, created = _parse(t.get('completed_at')), _parse(t.get('created_at'))
+        if done and created and (since is None or done >= since):
+            hours.append((done - created).total_seconds() / 3600)
+    return {
+        'completed_tasks': len(hours),
+        'average_cycle_hours': round(sum(hours) / len(hours), 2) if hours else None,
+    }
+
+
+def dev_project_throughput(tasks, projects, days=30):
+    since = datetime.utcnow() - timedelta(days=days)
+    by_id = {p.get('id'): p for p in projects}
+    totals = {}
+    for t in tasks:
+        row = totals.setdefault(t.get('project_id'), {'total_tasks': 0, 'completed_in_period': 0, 'hours': []})
+        row['total_tasks'] += 1
+        done, created = _parse(t.get('completed_at')), _parse(t.get('created_at'))
+        if done and done >= since:
+            row['completed_in_period'] += 1
+            if created:
+                row['hours'].append((done - created).total_seconds() / 3600)
+    result = [{
+        'project_id': project_id,
+        'project_name': by_id.get(project_id, {}).get('name', 'No Project'),
+        'project_color': by_id.get(project_id, {}).get('color', '#667eea'),
+        'total_tasks': row['total_tasks'],
+        'completed_in_period': row['completed_in_period'],
+        'average_cycle_hours': round(sum(row['hours']) / len(row['hours']), 2) if row['hours'] else None,
+    } for project_id, row in totals.items()]
+    return sorted(result, key=lambda r: r['total_tasks'], reverse=True)
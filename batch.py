@@ -0,0 +1,216 @@
+"""
+Apply many task create / update / delete operations in one transaction.
+
+Backs POST /api/tasks/batch. Instead of one UPDATE, one commit and one
+Activity insert per card, a batch costs:
+
+* one SELECT to check which referenced task ids exist,
+* one UPDATE ... WHERE id IN (...) per distinct set of changed values
+  (moving 200 cards to the same status or project is a single statement),
+* one batched INSERT for new tasks and one DELETE per child table for removed ones,
+* one multi-row INSERT into activities,
+* when statuses or projects change or tasks are removed, two aggregate SELECTs
+  recording the earliest day the snapshots must rebuild (see snapshots.py),
+
+followed by a single commit. Every operation gets its own entry in the
+result list; with atomic=True any failed item aborts the whole batch.
+"""
+from collections import defaultdict
+from datetime import datetime
+
+from sqlalchemy import delete, insert, update
+
+from config import db
+from models import Task, Subtask, TimeEntry, TaskDependency, Activity, TaskStatus, Priority
+from snapshots import note_task_changes
+
+BATCH_OPERATIONS = ('create', 'update', 'delete')
+MAX_BATCH_OPERATIONS = 500
+
+# Payload key -> (column attribute, converter)
+_TASK_FIELDS = {
+    'title': ('title', str),
+    'description': ('description', str),
+    'status': ('status', TaskStatus),
+    'priority': ('priority', Priority),
+    'progress': ('progress', int),
+    'project_id': ('project_id', lambda v: int(v) if v is not None else None),
+    'card_color': ('card_color', str),
+    'due_date': ('due_date', lambda v: datetime.fromisoformat(v.replace('Z', '+00:00')) if v else None),
+}
+
+# Columns whose change moves the daily progress snapshots (see snapshots.py)
+_SNAPSHOT_FIELDS = {'status', 'project_id', 'completed_at'}
+
+
+class BatchError(ValueError):
+    """The batch as a whole is malformed"""
+
+
+def task_values(data, now):
+    """Column values for a task payload, mirroring update_task(); raises ValueError."""
+    values = {}
+    for key, (column, convert) in _TASK_FIELDS.items():
+        if key in data:
+            try:
+                values[column] = convert(data[key])
+            except (TypeError, ValueError, AttributeError):
+                raise ValueError(f"Invalid {key}: {data[key]!r}")
+    if 'title' in values and not values['title']:
+        raise ValueError('Title is required')
+    if values.get('status') == TaskStatus.COMPLETED:
+        values.update(progress=100, completed_at=now)
+    return values
+
+
+def parse_operations(payload):
+    operations = payload.get('operations') if isinstance(payload, dict) else None
+    if not isinstance(operations, list) or not operations:
+        raise BatchError('operations must be a non-empty list')
+    if len(operations) > MAX_BATCH_OPERATIONS:
+        raise BatchError(f'At most {MAX_BATCH_OPERATIONS} operations per batch')
+    return operations
+
+
+def _validate(operation, now):
+    """Return (op, task_id, values) or raise ValueError"""
+    if not isinstance(operation, dict):
+        raise ValueError('Operation must be an object')
+    op = operation.get('op')
+    if op not in BATCH_OPERATIONS:
+        raise ValueError(f"op must be one of {', '.join(BATCH_OPERATIONS)}")
+    task_id = None
+    if op != 'create':
+        try:
+            task_id = int(operation.get('id'))
+        except (TypeError, ValueError):
+            raise ValueError('id is required')
+    data = operation.get('data') or {}
+    values = task_values(data, now) if op != 'delete' else {}
+    if op == 'create' and not values.get('title'):
+        raise ValueError('Title is required')
+    return op, task_id, values
+
+
+def apply_task_batch(operations, atomic=False, idempotency=None):
+    """Apply operations and commit once. Returns (results, applied_count).
+
+    Each result is {'index', 'op', 'id', 'success'} plus 'error' on failure.
+    A create whose client_token was seen before returns that task with
+    'idempotent': True, whether the token came from an earlier request or
+    from an earlier create in this batch; a token whose task has since been
+    deleted creates the task again.
+    """
+    now = datetime.utcnow()
+    results = []
+    valid = []
+    for index, operation in enumerate(operations):
+        op = operation.get('op') if isinstance(operation, dict) else None
+        try:
+            op, task_id, values = _validate(operation, now)
+        except ValueError as e:
+            results.append({'index': index, 'op': op, 'id': None, 'success': False, 'error': str(e)})
+            continue
+        result = {'index': index, 'op': op, 'id': task_id, 'success': True}
+        results.append(result)
+        valid.append((result, operation, values))
+
+    # Tasks created by earlier requests with the same client_token, checked below like any other id
+    replayed = {}
+    if idempotency is not None:
+        for result, operation, _ in valid:
+            token = operation.get('client_token')
+            if result['op'] == 'create' and token and token not in replayed:
+                replayed[token] = idempotency.get(token)
+
+    # One lookup for every id the batch refers to (titles are for the activity log)
+    referenced = {r['id'] for r, _, _ in valid if r['id'] is not None}
+    referenced.update(task_id for task_id in replayed.values() if task_id is not None)
+    existing = {}
+    if referenced:
+        existing = dict(db.session.query(Task.id, Task.title).filter(Task.id.in_(referenced)))
+    deleted = set()
+    updates = defaultdict(list)   # frozen changed values -> [task ids]
+    creates = []
+    first_with_token = {}         # client_token -> result of the first create carrying it
+    repeats = []                  # (result, first result) for later creates with the same token
+    for result, operation, values in valid:
+        if result['op'] == 'create':
+            token = operation.get('client_token') if idempotency is not None else None
+            if token and token in first_with_token:
+                repeats.append((result, first_with_token[token]))
+                continue
+            previous = replayed.get(token)
+            if previous in existing:
+                result.update(id=previous, idempotent=True)
+            else:
+                if previous is not None:
+                    # The earlier task was deleted since; the token is reused for a new one
+                    idempotency.discard(token)
+                creates.append((result, values, token))
+            if token:
+                first_with_token[token] = result
+            continue
+        if result['id'] not in existing or result['id'] in deleted:
+            result.update(success=False, error='Not found')
+        elif result['op'] == 'delete':
+            deleted.add(result['id'])
+        else:
+            updates[frozenset(values.items())].append(result)
+
+    if atomic and any(not r['success'] for r in results):
+        db.session.rollback()
+        return results, 0
+
+    # Bulk statements skip the ORM flush, so tell the snapshot refresh which days they change
+    note_task_changes(sorted(deleted | {
+        r['id'] for changes, items in updates.items() if _SNAPSHOT_FIELDS & {column for column, _ in changes}
+        for r in items
+    }))
+
+    activities = []
+    # Updates to tasks deleted later in the same batch are pointless
+    for changes, items in updates.items():
+        changes = dict(changes)
+        ids = [r['id'] for r in items if r['id'] not in deleted]
+        if ids:
+            db.session.execute(
+                update(Task).where(Task.id.in_(ids)).values({**changes, 'updated_at': now}),
+                execution_options={'synchronize_session': False},
+            )
+        activities.extend(
+            ('task_updated', f"Task updated: {changes.get('title', existing[task_id])}", task_id) for task_id in ids)
+
+    if creates:
+        tasks = [Task(**values) for _, values, _ in creates]
+        db.session.add_all(tasks)
+        db.session.flush()
+        for (result, _, token), task in zip(creates, tasks):
+            result['id'] = task.id
+            if idempotency is not None and token:
+                idempotency.put(token, task.id)
+            activities.append(('task_created', f"Task created: {task.title}", task.id))
+    for result, first in repeats:
+        result.update(id=first['id'], idempotent=True)
+
+    if deleted:
+        ids = list(deleted)
+        for model, column in ((Subtask, Subtask.parent_task_id), (TimeEntry, TimeEntry.task_id),
+                              (TaskDependency, TaskDependency.task_id), (TaskDependency, TaskDependency.depends_on_id)):
+            db.session.execute(delete(model).where(column.in_(ids)), execution_options={'synchronize_session': False})
+        db.session.execute(
+            update(Task).where(Task.parent_task_id.in_(ids)).values(parent_task_id=None),
+            execution_options={'synchronize_session': False},
+        )
+        db.session.execute(delete(Task).where(Task.id.in_(ids)), execution_options={'synchronize_session': False})
+        # Like the single delete route, these rows keep the id in the message, not in task_id
+        activities.extend(('task_deleted', f"Task deleted: {existing[task_id]} (#{task_id})", None) for task_id in ids)
+
+    if activities:
+        # A single multi-row INSERT ... VALUES (...), (...)
+        db.session.execute(insert(Activity.__table__).values([
+            {'event_type': event_type, 'message': message, 'task_id': task_id, 'created_at': now}
+            for event_type, message, task_id in activities
+        ]))
+    db.session.commit()
+    return results, sum(1 for r in results if r['success'])
@@ -0,0 +1,111 @@
+"""
+Calculated progress for many tasks: per-task paths against the batch calculator.
+
+Fills a fresh SQLite file with --tasks tasks (a few subtasks and time entries
+each), then times:
+
+* relationships: the original per-task path, summing task.subtasks and
+  task.time_entries (lazy loads, two SELECTs per task),
+* rollups: calculate_task_progress() over loaded tasks (rollup columns),
+* batch query / batch ids: calculate_progress_batch() with a Task query or
+  an id list (grouped aggregates over subtasks and time_entries).
+
+Every path must return the same {task id: progress} map.
+
+Usage:
+    python benchmarks/progress_batch.py
+    python benchmarks/progress_batch.py --tasks 50000 --repeat 5
+"""
+import argparse
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+from datetime import timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def relationships_progress(task):
+    """calculate_task_progress() as it was before the rollup columns: walks both collections"""
+    from models.progress_tracking import weighted_progress
+    subtasks = task.subtasks
+    seconds = sum(entry.duration.total_seconds() for entry in task.time_entries if entry.duration)
+    return weighted_progress(task.progress, task.estimated_hours, len(subtasks),
+                             sum(1 for s in subtasks if s.completed), seconds)
+
+
+def populate(db, count, seed=1):
+    from models import Task, Subtask, TimeEntry, recompute_task_rollups
+    rng = random.Random(seed)
+    db.session.execute(db.insert(Task), [
+        {'title': f'Bench {n}', 'progress': rng.choice([0, 25, 50, 100]),
+         'estimated_hours': rng.choice([None, 1, 4, 16])} for n in range(count)])
+    ids = [task_id for (task_id,) in db.session.execute(db.select(Task.id))]
+    db.session.execute(db.insert(Subtask), [
+        {'parent_task_id': task_id, 'title': 'Step', 'completed': rng.random() < 0.5, 'order': n}
+        for task_id in ids for n in range(rng.randint(0, 4))])
+    db.session.execute(db.insert(TimeEntry), [
+        {'task_id': task_id, 'duration': timedelta(minutes=rng.randint(5, 240))}
+        for task_id in ids for _ in range(rng.randint(0, 3))])
+    recompute_task_rollups()
+    db.session.commit()
+    return ids
+
+
+def timed(fn, repeat):
+    best, result = None, None
+    for _ in range(repeat):
+        from config import db
+        db.session.expunge_all()
+        started = time.perf_counter()
+        result = fn()
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--tasks', type=int, default=10000)
+    parser.add_argument('--repeat', type=int, default=3, help='runs per path; the best is reported')
+    args = parser.parse_args()
+
+    directory = tempfile.mkdtemp(prefix='taskwise-bench-')
+    os.environ['DATABASE_URL'] = f"sqlite:///{os.path.join(directory, 'bench.db')}"
+    try:
+        from config import create_app, db
+        from models import Task, calculate_task_progress, calculate_progress_batch
+        app = create_app()
+        app.extensions['taskwise_scheduler'].stop()
+        with app.app_context():
+            db.create_all()
+            ids = populate(db, args.tasks)
+            paths = {
+                'relationships': lambda: {t.id: relationships_progress(t) for t in Task.query.all()},
+                'rollups': lambda: {t.id: calculate_task_progress(t) for t in Task.query.all()},
+                'batch query': lambda: calculate_progress_batch(Task.query),
+                'batch ids': lambda: calculate_progress_batch(ids),
+            }
+            print(f"🏁 Calculated progress for {args.tasks} tasks (best of {args.repeat})")
+            print(f"{'path':<14} {'ms':>9}")
+            reference = None
+            for name, fn in paths.items():
+                elapsed, result = timed(fn, args.repeat)
+                if reference is None:
+                    reference = result
+                elif result != reference:
+                    mismatched = sum(1 for k in reference if reference[k] != result.get(k))
+                    raise SystemExit(f"❌ {name} differs from relationships for {mismatched} task(s)")
+                print(f"{name:<14} {elapsed * 1000:>9.1f}")
+            print("✅ All paths agree")
+            db.session.remove()
+            db.engine.dispose()
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
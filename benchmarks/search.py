@@ -0,0 +1,91 @@
+"""
+Full-text task search (/api/search) latency on a large SQLite database.
+
+Fills a fresh SQLite file with --tasks tasks whose titles, descriptions and
+subtask titles are drawn from a Zipf-like vocabulary (so some words are in
+most tasks and most words in few), then times search_tasks() for first
+pages of rare, common, multi-word, prefix and filtered queries.
+
+Usage:
+    python benchmarks/search.py
+    python benchmarks/search.py --tasks 1000000 --repeat 5
+"""
+import argparse
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+VOCABULARY = [f'w{n}' for n in range(5000)]
+# Word n is drawn with weight 1 / (n + 1)
+WEIGHTS = [1 / (n + 1) for n in range(len(VOCABULARY))]
+
+QUERIES = {
+    'rare word': {'text': 'w4000'},
+    'common word': {'text': 'w3'},
+    'two words': {'text': 'w10 w250'},
+    'prefix': {'text': 'w12'},
+    'project filter': {'text': 'w50', 'project_id': 1},
+    'status filter': {'text': 'w5', 'status': 'todo'},
+}
+
+
+def words(rng, count):
+    return ' '.join(rng.choices(VOCABULARY, WEIGHTS, k=count))
+
+
+def populate(db, count, seed=1, chunk=20000):
+    from models import Project, Task, Subtask
+    rng = random.Random(seed)
+    db.session.execute(db.insert(Project), [{'name': f'Project {n}'} for n in range(20)])
+    for start in range(0, count, chunk):
+        db.session.execute(db.insert(Task), [
+            {'title': words(rng, 4), 'description': words(rng, 12), 'project_id': rng.randint(1, 20)}
+            for _ in range(min(chunk, count - start))])
+        ids = range(start + 1, start + 1 + min(chunk, count - start))
+        db.session.execute(db.insert(Subtask), [
+            {'parent_task_id': task_id, 'title': words(rng, 3), 'order': n}
+            for task_id in ids for n in range(rng.randint(0, 2))])
+        db.session.commit()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--tasks', type=int, default=100000)
+    parser.add_argument('--repeat', type=int, default=5, help='runs per query; the best is reported')
+    args = parser.parse_args()
+
+    directory = tempfile.mkdtemp(prefix='taskwise-bench-')
+    os.environ['DATABASE_URL'] = f"sqlite:///{os.path.join(directory, 'bench.db')}"
+    try:
+        from config import create_app, db
+        from search import search_tasks
+        app = create_app()
+        app.extensions['taskwise_scheduler'].stop()
+        with app.app_context():
+            db.create_all()
+            started = time.perf_counter()
+            populate(db, args.tasks)
+            print(f"🏗️  Indexed {args.tasks} tasks in {time.perf_counter() - started:.1f} s")
+            print(f"🏁 First page of /api/search (best of {args.repeat})")
+            print(f"{'query':<16} {'ms':>9} {'hits':>6}")
+            for name, params in QUERIES.items():
+                best = None
+                for _ in range(args.repeat):
+                    started = time.perf_counter()
+                    hits, _, _ = search_tasks(**params)
+                    elapsed = time.perf_counter() - started
+                    best = elapsed if best is None else min(best, elapsed)
+                print(f"{name:<16} {best * 1000:>9.1f} {len(hits):>6}")
+            db.session.remove()
+            db.engine.dispose()
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
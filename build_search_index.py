@@ -0,0 +1,31 @@
+"""
+Add the full-text search index (/api/search) to an existing database.
+
+db.create_all() creates it with new tables; databases created before search
+existed need this script once. It creates the task_search table (FTS5 on
+SQLite, InnoDB with FULLTEXT indexes on MySQL) and the triggers that keep it
+in step, then fills it from tasks and subtasks. Afterwards the index follows
+every write.
+
+Usage:
+    python build_search_index.py
+    python build_search_index.py --rebuild     # refill the index, e.g. after a restore
+"""
+import argparse
+
+from config import create_app, db
+from search import ensure_search_index
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Create or rebuild the task search index')
+    parser.add_argument('--rebuild', action='store_true', help='refill the index even if it exists')
+    args = parser.parse_args()
+
+    app = create_app()
+    with app.app_context():
+        done = ensure_search_index(rebuild=args.rebuild)
+        db.session.commit()
+        for step in done:
+            print(f"🔎 {step[0].upper()}{step[1:]}")
+        print("✅ Search index ready" if done else "✅ Search index already present")
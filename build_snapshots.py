@@ -0,0 +1,36 @@
+"""
+Materialize daily ProgressSnapshot rows.
+
+Usage:
+    python build_snapshots.py                                  # incremental refresh since the last run
+    python build_snapshots.py --backfill 2024-01-01            # rebuild from a day until today
+    python build_snapshots.py --backfill 2024-01-01 --until 2024-06-30 --batch-days 14
+"""
+import argparse
+from datetime import date
+
+from config import create_app
+from snapshots import DEFAULT_BATCH_DAYS, backfill_snapshots, refresh_snapshots
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--backfill', metavar='YYYY-MM-DD', type=date.fromisoformat,
+                        help='rebuild every day from this date instead of refreshing incrementally')
+    parser.add_argument('--until', metavar='YYYY-MM-DD', type=date.fromisoformat,
+                        help='last day to rebuild when backfilling (default: today)')
+    parser.add_argument('--batch-days', type=int, default=DEFAULT_BATCH_DAYS,
+                        help='days rebuilt per transaction')
+    args = parser.parse_args()
+
+    app = create_app()
+    with app.app_context():
+        if args.backfill:
+            run = backfill_snapshots(args.backfill, args.until, args.batch_days)
+        else:
+            run = refresh_snapshots(args.batch_days)
+        print(f"✅ Snapshots {run.first_day} → {run.last_day}: {run.rows_written} row(s) written")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+"""
+Small in-process result cache for read-heavy aggregate endpoints.
+
+Entries are keyed by scope (e.g. ``('stats', project_id)``), expire after a
+TTL and are dropped wholesale when a transaction that flushed or ran a bulk
+statement against the tasks table commits. Hit/miss counters are kept so the
+effectiveness of the cache can be checked from /api/stats/cache.
+"""
+import threading
+import time
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from models import Task
+
+# session.info key: caches to invalidate once the session's transaction commits
+_PENDING_INVALIDATIONS = 'taskwise_cache_invalidations'
+
+
+class QueryCache:
+    def __init__(self, ttl=30):
+        self.ttl = ttl
+        self._entries = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    def get_or_compute(self, key, compute):
+        """Return the cached value for key, calling compute() on a miss."""
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] > now:
+                self.hits += 1
+                return entry[1]
+            self.misses += 1
+            generation = self.invalidations
+        value = compute()
+        with self._lock:
+            # Skip storing if a write invalidated the cache while computing
+            if generation == self.invalidations:
+                self._entries[key] = (now + self.ttl, value)
+        return value
+
+    def invalidate(self):
+        with self._lock:
+            self._entries.clear()
+            self.invalidations += 1
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'invalidations': self.invalidations,
+                'entries': len(self._entries),
+                'hit_rate': round(self.hits / lookups * 100, 1) if lookups else 0,
+                'ttl_seconds': self.ttl,
+            }
+
+
+def invalidate_on_writes(cache, model):
+    """Invalidate cache when a transaction that wrote rows of model through the ORM commits.
+
+    Writes only mark the session; clearing at flush time would let a
+    concurrent request recompute from pre-commit data and keep that entry.
+    """
+
+    def _mark(session):
+        session.info.setdefault(_PENDING_INVALIDATIONS, set()).add(cache)
+
+    @event.listens_for(Session, 'after_flush')
+    def _after_flush(session, flush_context):
+        for obj in (*session.new, *session.dirty, *session.deleted):
+            if isinstance(obj, model):
+                _mark(session)
+                return
+
+    @event.listens_for(Session, 'do_orm_execute')
+    def _bulk_statement(orm_execute_state):
+        if orm_execute_state.is_update or orm_execute_state.is_delete or orm_execute_state.is_insert:
+            mapper = orm_execute_state.bind_mapper
+            if mapper is not None and mapper.class_ is model:
+                _mark(orm_execute_state.session)
+
+
+@event.listens_for(Session, 'after_commit')
+def _invalidate_committed(session):
+    for cache in session.info.pop(_PENDING_INVALIDATIONS, ()):
+        cache.invalidate()
+
+
+@event.listens_for(Session, 'after_rollback')
+def _discard_rolled_back(session):
+    session.info.pop(_PENDING_INVALIDATIONS, None)
+
+
+# Dashboard statistics, per project scope
+stats_cache = QueryCache()
+invalidate_on_writes(stats_cache, Task)
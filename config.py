@@ -4,12 +4,14 @@ from flask_cors import CORS
 from flask_marshmallow import Marshmallow
 import os
 from dotenv import load_dotenv
+from engine_profiles import apply_engine_profile, install_engine_hooks
+from replicas import RoutingSession, create_replica_engines, init_replica_routing
 
 # Load environment variables
 load_dotenv()
 
 # Initialize extensions
-db = SQLAlchemy()
+db = SQLAlchemy(session_options={'class_': RoutingSession})
 ma = Marshmallow()
 
 def _build_database_uri() -> str:
@@ -46,9 +48,51 @@ def create_app():
     app.config['SECRET_KEY'] = os.getenv('SECRET_KEY', 'dev-secret-key')
     app.config['SQLALCHEMY_DATABASE_URI'] = _build_database_uri()
     app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+    # Pool / PRAGMA tuning: 'balanced', 'durable' or 'default' (library defaults), see engine_profiles.py
+    app.config['DB_ENGINE_PROFILE'] = os.getenv('DB_ENGINE_PROFILE', 'balanced')
+    # Optional comma-separated read replica URIs for GET /api/ requests, see replicas.py
+    app.config['DATABASE_REPLICA_URLS'] = os.getenv('DATABASE_REPLICA_URLS', '')
+    # Seconds after a write during which that client reads from the primary
+    app.config['READ_YOUR_WRITES_SECONDS'] = int(os.getenv('READ_YOUR_WRITES_SECONDS', '5'))
+    # Seconds a cached /api/stats result stays valid; task writes invalidate it sooner
+    app.config['STATS_CACHE_TTL'] = int(os.getenv('STATS_CACHE_TTL', '30'))
+    # Server-Sent Events: seconds before a stream ends and the browser reconnects, and open streams per process
+    app.config['EVENTS_STREAM_SECONDS'] = int(os.getenv('EVENTS_STREAM_SECONDS', '300'))
+    app.config['EVENTS_MAX_STREAMS'] = int(os.getenv('EVENTS_MAX_STREAMS', '8'))
+    # client_token dedupe for creates: 'database' (shared by all workers) or 'memory' (per process)
+    app.config['IDEMPOTENCY_STORE'] = os.getenv('IDEMPOTENCY_STORE', 'database')
+    app.config['IDEMPOTENCY_TTL_SECONDS'] = int(os.getenv('IDEMPOTENCY_TTL_SECONDS', '86400'))
+    app.config['IDEMPOTENCY_MAX_ENTRIES'] = int(os.getenv('IDEMPOTENCY_MAX_ENTRIES', '10000'))
+    # Activity log writes: 'buffered' (background multi-row inserts) or 'sync' (in the request's transaction)
+    app.config['ACTIVITY_MODE'] = os.getenv('ACTIVITY_MODE', 'buffered')
+    app.config['ACTIVITY_FLUSH_BATCH'] = int(os.getenv('ACTIVITY_FLUSH_BATCH', '100'))
+    app.config['ACTIVITY_FLUSH_INTERVAL_MS'] = int(os.getenv('ACTIVITY_FLUSH_INTERVAL_MS', '200'))
+    app.config['ACTIVITY_QUEUE_SIZE'] = int(os.getenv('ACTIVITY_QUEUE_SIZE', '10000'))
+    # Tries per failing batch before it is split up and the bad rows are dead-lettered
+    app.config['ACTIVITY_MAX_ATTEMPTS'] = int(os.getenv('ACTIVITY_MAX_ATTEMPTS', '3'))
+    # Activity retention: rows older than this many days are archived ('table', 'file') or dropped ('delete')
+    app.config['ACTIVITY_RETENTION_DAYS'] = int(os.getenv('ACTIVITY_RETENTION_DAYS', '90'))
+    app.config['ACTIVITY_ARCHIVE'] = os.getenv('ACTIVITY_ARCHIVE', 'table')
+    app.config['ACTIVITY_ARCHIVE_DIR'] = os.getenv('ACTIVITY_ARCHIVE_DIR', os.path.join(app.instance_path, 'activity_archive'))
+    app.config['ACTIVITY_RETENTION_BATCH'] = int(os.getenv('ACTIVITY_RETENTION_BATCH', '500'))
+    # Background jobs (seconds between runs; 0, the default, disables the in-process job: use the cron scripts)
+    app.config['SNAPSHOT_INTERVAL_SECONDS'] = int(os.getenv('SNAPSHOT_INTERVAL_SECONDS', '0'))
+    app.config['ACTIVITY_RETENTION_INTERVAL_SECONDS'] = int(os.getenv('ACTIVITY_RETENTION_INTERVAL_SECONDS', '0'))
+    app.config['IDEMPOTENCY_PURGE_INTERVAL_SECONDS'] = int(os.getenv('IDEMPOTENCY_PURGE_INTERVAL_SECONDS', '0'))
+    # Off by default so tests and one-off scripts start no thread; deployments set e.g. 60
+    app.config['DUE_NOTIFY_INTERVAL_SECONDS'] = int(os.getenv('DUE_NOTIFY_INTERVAL_SECONDS', '0'))
+    # How far back the very first due-date scan looks for tasks that just became due
+    app.config['DUE_NOTIFY_LOOKBACK_HOURS'] = int(os.getenv('DUE_NOTIFY_LOOKBACK_HOURS', '24'))
+    # SKIP_DB dev data: 'memory' (per process) or 'sqlite' (throwaway file, or DEV_STORE_PATH to keep it)
+    app.config['DEV_STORE'] = os.getenv('DEV_STORE', 'memory')
+    app.config['DEV_STORE_PATH'] = os.getenv('DEV_STORE_PATH')
 
     # Initialize extensions with app
+    apply_engine_profile(app)
     db.init_app(app)
+    create_replica_engines(app)
+    install_engine_hooks(app, db)
+    init_replica_routing(app)
     ma.init_app(app)
     CORS(app)
 
@@ -56,4 +100,8 @@ def create_app():
     from routes import register_routes
     register_routes(app)
 
+    # Start configured background jobs (see scheduler.py)
+    from scheduler import init_scheduler
+    init_scheduler(app)
+
     return app
\ No newline at end of file
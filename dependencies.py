@@ -0,0 +1,296 @@
+"""
+Task dependency graph (task_dependencies) and its analyses.
+
+An edge (task_id, depends_on_id) means the task cannot finish before the
+task it depends on. A DependencyGraph holds one scope, either a project's
+tasks (plus the tasks they depend on in other projects) or every task, as
+adjacency lists built from a single query that joins tasks, their edges and
+the prerequisite tasks. Nothing is lazy-loaded per task.
+
+Graphs are cached per scope under the current 'tasks' collection version
+(versions.py). Every task and dependency write bumps that version, so a
+cached graph is reused until something it depends on changes, in any worker.
+
+Edges are unique per (task_id, depends_on_id). add_dependency() inserts the
+edge first and then checks for a cycle with one recursive query over the
+edges reachable from the new prerequisite, so a cycle check never loads the
+whole table. Writers are serialized for the check: on SQLite the insert
+takes the database write lock; on MySQL a named lock (GET_LOCK) is held
+until the connection goes back to the pool after the commit or rollback.
+
+Every analysis is linear in tasks + edges:
+
+* would_create_cycle(): a search from the new prerequisite back to the task
+  (over reachable_edges() only when adding an edge),
+* topological_order(): Kahn's algorithm; tasks left over are on cycles,
+* blocked() / unblocked(): open tasks with / without open prerequisites,
+* critical_path(): the longest chain of estimated_hours (missing estimates
+  count as 0) over the topological order.
+"""
+from collections import deque
+
+from sqlalchemy import event, select, text
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.pool import Pool
+
+from cache import QueryCache, invalidate_on_writes
+from config import db
+from models import Task, TaskDependency, TaskStatus
+from versions import get_versions
+
+# MySQL named lock held by dependency writers, and how long to wait for it
+DEPENDENCY_LOCK = 'taskwise_dependencies'
+DEPENDENCY_LOCK_TIMEOUT = 10
+
+# Pool connection record info key: the connection holds DEPENDENCY_LOCK
+_HOLDS_LOCK = 'taskwise_dependency_lock'
+
+
+class DependencyCycleError(ValueError):
+    """The new edge would close a cycle; path runs from the task back to itself"""
+
+    def __init__(self, path):
+        self.path = path
+        super().__init__("Dependency would create a cycle: " + ' → '.join(str(task_id) for task_id in path))
+
+
+class DependencyGraph:
+    def __init__(self, nodes, edges):
+        """nodes: {task id: {'title', 'status', 'estimated_hours', 'project_id', 'external'}};
+        edges: (task_id, depends_on_id) pairs"""
+        self.nodes = nodes
+        self.prerequisites = {task_id: [] for task_id in nodes}
+        self.dependents = {task_id: [] for task_id in nodes}
+        for task_id, depends_on_id in edges:
+            self.prerequisites.setdefault(task_id, []).append(depends_on_id)
+            self.dependents.setdefault(depends_on_id, []).append(task_id)
+
+    def has_edge(self, task_id, depends_on_id):
+        return depends_on_id in self.prerequisites.get(task_id, ())
+
+    def path(self, start, target):
+        """Shortest prerequisite chain start → ... → target, or None"""
+        parents = {start: None}
+        queue = deque([start])
+        while queue:
+            current = queue.popleft()
+            if current == target:
+                path = []
+                while current is not None:
+                    path.append(current)
+                    current = parents[current]
+                return path[::-1]
+            for nxt in self.prerequisites.get(current, ()):
+                if nxt not in parents:
+                    parents[nxt] = current
+                    queue.append(nxt)
+        return None
+
+    def would_create_cycle(self, task_id, depends_on_id):
+        """The cycle (as a list of ids) that the edge task_id → depends_on_id would close, or None"""
+        if task_id == depends_on_id:
+            return [task_id, task_id]
+        back = self.path(depends_on_id, task_id)
+        return [task_id, *back] if back else None
+
+    def _is_open(self, task_id):
+        return self.nodes[task_id]['status'] != TaskStatus.COMPLETED.value
+
+    def topological_order(self):
+        """(order with prerequisites first, ids of tasks on or behind a cycle)"""
+        remaining = {task_id: len(self.prerequisites[task_id]) for task_id in self.nodes}
+        queue = deque(sorted(task_id for task_id, count in remaining.items() if count == 0))
+        order = []
+        while queue:
+            task_id = queue.popleft()
+            order.append(task_id)
+            for dependent in self.dependents[task_id]:
+                remaining[dependent] -= 1
+                if remaining[dependent] == 0:
+                    queue.append(dependent)
+        placed = set(order)
+        return order, sorted(task_id for task_id in self.nodes if task_id not in placed)
+
+    def blocked(self):
+        """Open tasks of the scope waiting on at least one open prerequisite"""
+        return [task_id for task_id in sorted(self.nodes)
+                if not self.nodes[task_id]['external'] and self._is_open(task_id)
+                and any(self._is_open(p) for p in self.prerequisites[task_id])]
+
+    def unblocked(self):
+        """Open tasks of the scope whose prerequisites are all completed"""
+        return [task_id for task_id in sorted(self.nodes)
+                if not self.nodes[task_id]['external'] and self._is_open(task_id)
+                and not any(self._is_open(p) for p in self.prerequisites[task_id])]
+
+    def critical_path(self, order=None):
+        """Longest chain by estimated_hours: {'task_ids': prerequisites first, 'hours': total}"""
+        if order is None:
+            order, _ = self.topological_order()
+        finish, previous = {}, {}
+        for task_id in order:
+            best = None
+            for prerequisite in self.prerequisites[task_id]:
+                if best is None or finish[prerequisite] > finish[best]:
+                    best = prerequisite
+            previous[task_id] = best
+            finish[task_id] = (finish[best] if best is not None else 0) + (self.nodes[task_id]['estimated_hours'] or 0)
+        if not finish:
+            return {'task_ids': [], 'hours': 0}
+        # On ties end at the later task, so zero-estimate tasks at the tail stay on the path
+        end = max(reversed(order), key=lambda task_id: finish[task_id])
+        chain = []
+        current = end
+        while current is not None:
+            chain.append(current)
+            current = previous[current]
+        return {'task_ids': chain[::-1], 'hours': round(finish[end], 2)}
+
+    def to_dict(self):
+        order, cyclic = self.topological_order()
+        return {
+            'tasks': [{'id': task_id, **node} for task_id, node in sorted(self.nodes.items())],
+            'edges': [[task_id, depends_on_id] for task_id in sorted(self.prerequisites)
+                      for depends_on_id in self.prerequisites[task_id]],
+            'order': order,
+            'cyclic': cyclic,
+            'blocked': self.blocked(),
+            'unblocked': self.unblocked(),
+            'critical_path': self.critical_path(order),
+        }
+
+
+def _node(title, status, estimated_hours, project_id, external):
+    return {'title': title, 'status': status.value if status else None, 'estimated_hours': estimated_hours,
+            'project_id': project_id, 'external': external}
+
+
+def build_graph(project_id=None):
+    """Graph of a project (or of every task with project_id=None) from one query"""
+    tasks = Task.__table__
+    deps = TaskDependency.__table__
+    prerequisite = tasks.alias('prerequisite')
+    query = (
+        select(tasks.c.id, tasks.c.title, tasks.c.status, tasks.c.estimated_hours, tasks.c.project_id,
+               prerequisite.c.id, prerequisite.c.title, prerequisite.c.status, prerequisite.c.estimated_hours,
+               prerequisite.c.project_id)
+        .select_from(tasks.outerjoin(deps, deps.c.task_id == tasks.c.id)
+                     .outerjoin(prerequisite, prerequisite.c.id == deps.c.depends_on_id))
+    )
+    if project_id is not None:
+        query = query.where(tasks.c.project_id == project_id)
+    nodes, edges = {}, []
+    for row in db.session.execute(query):
+        nodes[row[0]] = _node(*row[1:5], external=False)
+        if row[5] is not None:
+            edges.append((row[0], row[5]))
+            if row[5] not in nodes:
+                nodes[row[5]] = _node(*row[6:10], external=project_id is not None and row[9] != project_id)
+    return DependencyGraph(nodes, edges)
+
+
+def reachable_edges(start):
+    """Every edge on a prerequisite path from start (task_id, depends_on_id pairs), from one recursive query"""
+    deps = TaskDependency.__table__
+    reach = (
+        select(deps.c.task_id, deps.c.depends_on_id)
+        .where(deps.c.task_id == start)
+        .cte('reach', recursive=True)
+    )
+    # UNION (not UNION ALL) stops at edges already reached, so existing cycles terminate
+    reach = reach.union(
+        select(deps.c.task_id, deps.c.depends_on_id).join(reach, deps.c.task_id == reach.c.depends_on_id)
+    )
+    return db.session.execute(select(reach.c.task_id, reach.c.depends_on_id)).all()
+
+
+# Graphs by (kind, scope, tasks version); local writes also drop them right away
+graph_cache = QueryCache(ttl=300)
+invalidate_on_writes(graph_cache, Task)
+invalidate_on_writes(graph_cache, TaskDependency)
+
+
+def _cached(key, build, version):
+    if version is None:
+        return build()
+    return graph_cache.get_or_compute((*key, version), build)
+
+
+def dependency_graph(project_id=None):
+    versions = get_versions('tasks')
+    return _cached(('graph', project_id), lambda: build_graph(project_id), versions and versions[0])
+
+
+def _lock_dependency_writers():
+    """Serialize dependency inserts so two cannot each pass the cycle check and close a cycle together.
+
+    Returns the primary's connection, which the insert will use (before any
+    write, a request may read from a replica). SQLite needs no lock: inserting
+    the edge takes the database write lock, and a transaction whose reads are
+    stale cannot take it.
+    """
+    connection = db.session.connection(bind_arguments={'bind': db.engine})
+    if connection.dialect.name != 'mysql' or connection.info.get(_HOLDS_LOCK):
+        return connection
+    acquired = connection.execute(text('SELECT GET_LOCK(:name, :timeout)'),
+                                  {'name': DEPENDENCY_LOCK, 'timeout': DEPENDENCY_LOCK_TIMEOUT}).scalar()
+    if not acquired:
+        raise TimeoutError("Timed out waiting for another dependency write")
+    # Released at checkin, i.e. once this transaction has committed or rolled back
+    connection.info[_HOLDS_LOCK] = True
+    return connection
+
+
+@event.listens_for(Pool, 'checkin')
+def _release_dependency_lock(dbapi_connection, connection_record):
+    if connection_record.info.pop(_HOLDS_LOCK, False) and dbapi_connection is not None:
+        cursor = dbapi_connection.cursor()
+        try:
+            cursor.execute('SELECT RELEASE_LOCK(%s)', (DEPENDENCY_LOCK,))
+        finally:
+            cursor.close()
+
+
+def add_dependency(task_id, depends_on_id):
+    """Add the edge task_id → depends_on_id in the current transaction; the caller commits.
+
+    Call it before anything else in the transaction reads from the primary:
+    GET_LOCK reads no table, so MySQL's REPEATABLE READ snapshot then starts
+    after the previous lock holder committed. Raises LookupError if a task
+    does not exist, DependencyCycleError if the edge would close a cycle and
+    ValueError if it already exists; the caller must then roll back.
+    """
+    if task_id == depends_on_id:
+        raise DependencyCycleError([task_id, task_id])
+    connection = _lock_dependency_writers()
+    found = set(connection.execute(select(Task.id).where(Task.id.in_((task_id, depends_on_id)))).scalars())
+    for required in (task_id, depends_on_id):
+        if required not in found:
+            raise LookupError(f"Task {required} not found")
+    edge = TaskDependency(task_id=task_id, depends_on_id=depends_on_id)
+    db.session.add(edge)
+    try:
+        db.session.flush()
+    except IntegrityError:
+        raise ValueError("Dependency already exists")
+    # A path from the new prerequisite back to the task closes a cycle
+    cycle = DependencyGraph({}, reachable_edges(depends_on_id)).would_create_cycle(task_id, depends_on_id)
+    if cycle:
+        raise DependencyCycleError(cycle)
+    return edge
+
+
+def remove_dependency(task_id, depends_on_id):
+    """Delete the edge; returns False if it did not exist. The caller commits."""
+    edges = TaskDependency.query.filter_by(task_id=task_id, depends_on_id=depends_on_id).all()
+    for edge in edges:
+        db.session.delete(edge)
+    return bool(edges)
+
+
+def dev_dependency_graph(tasks, project_id=None):
+    """SKIP_DB counterpart: dev tasks carry no dependencies"""
+    nodes = {t['id']: {'title': t.get('title'), 'status': t.get('status'), 'estimated_hours': t.get('estimated_hours'),
+                       'project_id': t.get('project_id'), 'external': False}
+             for t in tasks if project_id is None or str(t.get('project_id')) == str(project_id)}
+    return DependencyGraph(nodes, [])
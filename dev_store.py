@@ -0,0 +1,387 @@
+"""
+Server-side data store for SKIP_DB dev mode.
+
+Dev mode used to keep its tasks, projects, subtasks, activity log and
+notifications in the signed cookie session, so every request re-serialized
+and re-signed the whole dataset (and toggling a subtask scanned every session
+key). The store keeps them on the server instead, shared by every client of
+the process like the real database:
+
+* MemoryDevStore: dicts keyed by id plus secondary indexes (tasks by project,
+  subtasks by task), guarded by one lock.
+* SqliteDevStore: the same records as JSON in a throwaway SQLite file (or
+  DEV_STORE_PATH to keep it between restarts), with the same lookups backed
+  by indexes. Every operation is one write transaction, so several worker
+  processes can share a DEV_STORE_PATH.
+
+Both expose the same record-level methods used by the dev branches in
+routes.py. Records are plain dicts shaped like the API responses; callers get
+copies, so changes only stick when written back through the store.
+"""
+import abc
+import atexit
+import json
+import os
+import sqlite3
+import tempfile
+import threading
+from contextlib import contextmanager
+from datetime import datetime
+
+DEV_STORE_BACKENDS = ('memory', 'sqlite')
+
+# Collections and the attribute each one is indexed by (None: lookups by id only)
+DEV_COLLECTIONS = {
+    'projects': None,
+    'tasks': 'project_id',
+    'subtasks': 'task_id',
+    'activity': None,
+    'notifications': None,
+}
+
+TASK_FIELDS = ('title', 'description', 'status', 'priority', 'progress', 'project_id', 'due_date', 'card_color')
+
+
+def _now():
+    return datetime.utcnow().isoformat() + 'Z'
+
+
+def _owner_key(value):
+    """Index key for a foreign id that clients may send as a number or a string"""
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
+class DevStore(abc.ABC):
+    """Record operations shared by the backends; subclasses provide storage primitives"""
+
+    def __init__(self):
+        self.lock = threading.RLock()
+        self._depth = 0
+
+    @contextmanager
+    def transaction(self):
+        """Group several operations; nested use joins the outer transaction"""
+        with self.lock:
+            self._depth += 1
+            try:
+                if self._depth == 1:
+                    self._begin()
+                yield self
+                if self._depth == 1:
+                    self._commit()
+            except BaseException:
+                if self._depth == 1:
+                    self._rollback()
+                raise
+            finally:
+                self._depth -= 1
+
+    # -- storage primitives -------------------------------------------------
+    def _begin(self):
+        pass
+
+    def _commit(self):
+        pass
+
+    def _rollback(self):
+        pass
+
+    @abc.abstractmethod
+    def _get(self, kind, record_id):
+        """A copy of one record, or None"""
+
+    @abc.abstractmethod
+    def _all(self, kind):
+        """Copies of every record of a collection"""
+
+    @abc.abstractmethod
+    def _by(self, kind, owner_id):
+        """Copies of the records whose indexed attribute (DEV_COLLECTIONS) is owner_id"""
+
+    @abc.abstractmethod
+    def _save(self, kind, record):
+        """Insert or replace a record by its id"""
+
+    @abc.abstractmethod
+    def _remove(self, kind, record_ids):
+        """Delete records by id"""
+
+    @abc.abstractmethod
+    def _next_id(self, kind):
+        """Allocate the next id of a collection"""
+
+    # -- records --------------------------------------------------------------
+    def seed(self):
+        """Add the sample project and task on an empty store"""
+        with self.transaction():
+            if self._all('projects') or self._all('tasks'):
+                return
+            self.create_project({'name': 'Sample Project', 'description': 'Dev project', 'color': '#667eea'})
+            self.create_task({'title': 'Sample Task', 'description': 'This is a sample task to get you started.',
+                              'project_id': 1})
+
+    def list_tasks(self, project_id=None):
+        with self.transaction():
+            return self._all('tasks') if project_id is None else self._by('tasks', project_id)
+
+    def get_task(self, task_id):
+        with self.transaction():
+            return self._get('tasks', task_id)
+
+    def create_task(self, data, now=None):
+        now = now or _now()
+        with self.transaction():
+            task = {
+                'id': self._next_id('tasks'),
+                'title': data['title'],
+                'description': data.get('description', ''),
+                'priority': data.get('priority', 'medium'),
+                'project_id': data.get('project_id'),
+                'progress': data.get('progress', 0),
+                'status': data.get('status', 'todo'),
+                'due_date': data.get('due_date'),
+                'card_color': data.get('card_color', '#fecaca'),
+                'created_at': now,
+                'updated_at': now
+            }
+            self._save('tasks', task)
+            return task
+
+    def update_task(self, task_id, data, now=None):
+        """Apply the allowed fields of data; returns the task or None if missing"""
+        with self.transaction():
+            task = self._get('tasks', task_id)
+            if task is None:
+                return None
+            for field in TASK_FIELDS:
+                if field in data:
+                    task[field] = data[field]
+            task['updated_at'] = now or _now()
+            self._save('tasks', task)
+            return task
+
+    def delete_task(self, task_id):
+        with self.transaction():
+            task = self._get('tasks', task_id)
+            if task is None:
+                return None
+            self._remove('subtasks', [s['id'] for s in self._by('subtasks', task_id)])
+            self._remove('tasks', [task_id])
+            return task
+
+    def list_projects(self):
+        with self.transaction():
+            return self._all('projects')
+
+    def create_project(self, data):
+        with self.transaction():
+            project = {'id': self._next_id('projects'), 'name': data['name'],
+                       'description': data.get('description', ''), 'color': data.get('color', '#667eea')}
+            self._save('projects', project)
+            return project
+
+    def update_project(self, project_id, data):
+        with self.transaction():
+            project = self._get('projects', project_id)
+            if project is None:
+                return None
+            for field in ('name', 'description', 'color'):
+                project[field] = data.get(field, project.get(field))
+            self._save('projects', project)
+            return project
+
+    def delete_project(self, project_id):
+        """Delete the project and detach its tasks; returns False if missing"""
+        with self.transaction():
+            if self._get('projects', project_id) is None:
+                return False
+            for task in self._by('tasks', project_id):
+                task['project_id'] = None
+                self._save('tasks', task)
+            self._remove('projects', [project_id])
+            return True
+
+    def list_subtasks(self, task_id):
+        with self.transaction():
+            return sorted(self._by('subtasks', task_id), key=lambda s: s.get('order', 0))
+
+    def create_subtask(self, task_id, title):
+        with self.transaction():
+            subtask = {
+                'id': self._next_id('subtasks'),
+                'task_id': task_id,
+                'title': title,
+                'completed': False,
+                'order': len(self._by('subtasks', task_id)),
+                'created_at': _now()
+            }
+            self._save('subtasks', subtask)
+            return subtask
+
+    def toggle_subtask(self, subtask_id):
+        with self.transaction():
+            subtask = self._get('subtasks', subtask_id)
+            if subtask is None:
+                return None
+            subtask['completed'] = not subtask.get('completed', False)
+            subtask['completed_at'] = _now() if subtask['completed'] else None
+            self._save('subtasks', subtask)
+            return subtask
+
+    def delete_subtask(self, subtask_id):
+        with self.transaction():
+            self._remove('subtasks', [subtask_id])
+
+    def record_activity(self, event_type, message, task_id=None):
+        with self.transaction():
+            entry = {'id': self._next_id('activity'), 'event_type': event_type, 'message': message,
+                     'task_id': task_id, 'created_at': _now()}
+            self._save('activity', entry)
+            return entry
+
+    def list_activity(self):
+        with self.transaction():
+            return self._all('activity')[::-1]
+
+    def list_notifications(self):
+        """Newest first"""
+        with self.transaction():
+            return self._all('notifications')[::-1]
+
+    def add_notification(self, title, message='', read=False, time=None):
+        with self.transaction():
+            notif = {'id': self._next_id('notifications'), 'title': title, 'message': message,
+                     'read': bool(read), 'time': time or _now()}
+            self._save('notifications', notif)
+            return notif
+
+    def save_notifications(self, notifications):
+        with self.transaction():
+            for notif in notifications:
+                self._save('notifications', notif)
+
+    def remove_notifications(self, ids):
+        with self.transaction():
+            self._remove('notifications', ids)
+
+
+class MemoryDevStore(DevStore):
+    def __init__(self):
+        super().__init__()
+        self._records = {kind: {} for kind in DEV_COLLECTIONS}
+        # kind -> owner id -> set of record ids
+        self._indexes = {kind: {} for kind, attr in DEV_COLLECTIONS.items() if attr}
+        self._ids = {kind: 0 for kind in DEV_COLLECTIONS}
+
+    def _get(self, kind, record_id):
+        record = self._records[kind].get(record_id)
+        return dict(record) if record is not None else None
+
+    def _all(self, kind):
+        return [dict(r) for r in self._records[kind].values()]
+
+    def _by(self, kind, owner_id):
+        records = self._records[kind]
+        return [dict(records[i]) for i in sorted(self._indexes[kind].get(_owner_key(owner_id), ()))]
+
+    def _unindex(self, kind, record):
+        attr = DEV_COLLECTIONS[kind]
+        if attr and record is not None:
+            key = _owner_key(record.get(attr))
+            ids = self._indexes[kind].get(key)
+            if ids is not None:
+                ids.discard(record['id'])
+                if not ids:
+                    del self._indexes[kind][key]
+
+    def _save(self, kind, record):
+        self._unindex(kind, self._records[kind].get(record['id']))
+        self._records[kind][record['id']] = dict(record)
+        attr = DEV_COLLECTIONS[kind]
+        if attr:
+            self._indexes[kind].setdefault(_owner_key(record.get(attr)), set()).add(record['id'])
+
+    def _remove(self, kind, record_ids):
+        for record_id in record_ids:
+            self._unindex(kind, self._records[kind].pop(record_id, None))
+
+    def _next_id(self, kind):
+        self._ids[kind] += 1
+        return self._ids[kind]
+
+
+class SqliteDevStore(DevStore):
+    def __init__(self, path=None):
+        super().__init__()
+        if path is None:
+            fd, path = tempfile.mkstemp(prefix='taskwise-dev-', suffix='.db')
+            os.close(fd)
+            atexit.register(self._discard, path)
+        self.path = path
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        for kind in DEV_COLLECTIONS:
+            self._conn.execute(f'CREATE TABLE IF NOT EXISTS {kind} (id INTEGER PRIMARY KEY, owner_id INTEGER, data TEXT NOT NULL)')
+            if DEV_COLLECTIONS[kind]:
+                self._conn.execute(f'CREATE INDEX IF NOT EXISTS ix_{kind}_owner ON {kind} (owner_id, id)')
+
+    def _begin(self):
+        # Take the write lock up front so id allocation cannot race another process
+        self._conn.execute('BEGIN IMMEDIATE')
+
+    def _commit(self):
+        self._conn.execute('COMMIT')
+
+    def _rollback(self):
+        self._conn.execute('ROLLBACK')
+
+    def _discard(self, path):
+        self._conn.close()
+        for suffix in ('', '-wal', '-shm'):
+            if os.path.exists(path + suffix):
+                os.remove(path + suffix)
+
+    def _rows(self, sql, *params):
+        return [json.loads(data) for (data,) in self._conn.execute(sql, params)]
+
+    def _get(self, kind, record_id):
+        rows = self._rows(f'SELECT data FROM {kind} WHERE id = ?', record_id)
+        return rows[0] if rows else None
+
+    def _all(self, kind):
+        return self._rows(f'SELECT data FROM {kind} ORDER BY id')
+
+    def _by(self, kind, owner_id):
+        owner_id = _owner_key(owner_id)
+        if owner_id is None:
+            return self._rows(f'SELECT data FROM {kind} WHERE owner_id IS NULL ORDER BY id')
+        return self._rows(f'SELECT data FROM {kind} WHERE owner_id = ? ORDER BY id', owner_id)
+
+    def _save(self, kind, record):
+        attr = DEV_COLLECTIONS[kind]
+        self._conn.execute(f'INSERT OR REPLACE INTO {kind} (id, owner_id, data) VALUES (?, ?, ?)',
+                           (record['id'], _owner_key(record.get(attr)) if attr else None, json.dumps(record)))
+
+    def _remove(self, kind, record_ids):
+        self._conn.executemany(f'DELETE FROM {kind} WHERE id = ?', [(i,) for i in record_ids])
+
+    def _next_id(self, kind):
+        # Runs inside transaction(), which holds the database write lock
+        return self._conn.execute(f'SELECT COALESCE(MAX(id), 0) + 1 FROM {kind}').fetchone()[0]
+
+
+def init_dev_store(app):
+    """Create the configured dev store, seed it and register it on the app."""
+    backend = app.config.get('DEV_STORE', 'memory')
+    if backend not in DEV_STORE_BACKENDS:
+        raise ValueError(f"Unknown DEV_STORE: {backend}")
+    if backend == 'sqlite':
+        store = SqliteDevStore(app.config.get('DEV_STORE_PATH'))
+    else:
+        store = MemoryDevStore()
+    store.seed()
+    app.extensions['taskwise_dev_store'] = store
+    return store
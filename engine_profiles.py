@@ -0,0 +1,149 @@
+"""
+Named database engine tuning profiles (DB_ENGINE_PROFILE).
+
+A profile holds settings per backend:
+
+* MySQL: connection pool sizing (pool_size, max_overflow, pool_timeout),
+  pool_pre_ping so connections dropped by the server or a proxy are replaced
+  instead of failing the request, pool_recycle below the server's
+  wait_timeout, and a per-session statement timeout (max_execution_time,
+  which MySQL applies to SELECTs).
+* SQLite: PRAGMAs run on every new connection: WAL journaling so readers do
+  not block the writer, synchronous=NORMAL (safe with WAL, one fsync per
+  checkpoint instead of per commit), busy_timeout so concurrent writers wait
+  instead of failing with "database is locked", and larger mmap/page caches.
+
+'default' applies nothing and keeps the library defaults, for comparison
+(see benchmarks/engine_profiles.py). Engine options must be in place before
+db.init_app() creates the engine, and the connect hooks are installed right
+after, so create_app() calls apply_engine_profile() and
+install_engine_hooks() around it. The configured settings are logged at
+startup and the values the database actually reports on the first
+connection.
+"""
+import logging
+
+from sqlalchemy import event
+from sqlalchemy.engine import make_url
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_ENGINE_PROFILE = 'balanced'
+
+ENGINE_PROFILES = {
+    'default': {},
+    'balanced': {
+        'mysql': {
+            'engine_options': {'pool_size': 10, 'max_overflow': 20, 'pool_timeout': 30,
+                               'pool_pre_ping': True, 'pool_recycle': 1800},
+            'session': {'max_execution_time': 30000},
+        },
+        'sqlite': {
+            'pragmas': {'journal_mode': 'WAL', 'synchronous': 'NORMAL', 'busy_timeout': 5000,
+                        'mmap_size': 256 * 1024 * 1024, 'cache_size': -64 * 1024, 'temp_store': 'MEMORY'},
+        },
+    },
+    # Favors never losing a commit over write throughput
+    'durable': {
+        'mysql': {
+            'engine_options': {'pool_size': 5, 'max_overflow': 10, 'pool_timeout': 30,
+                               'pool_pre_ping': True, 'pool_recycle': 900},
+            'session': {'max_execution_time': 60000},
+        },
+        'sqlite': {
+            'pragmas': {'journal_mode': 'WAL', 'synchronous': 'FULL', 'busy_timeout': 10000,
+                        'cache_size': -16 * 1024},
+        },
+    },
+}
+
+# PRAGMAs read back for the startup log
+REPORTED_PRAGMAS = ('journal_mode', 'synchronous', 'busy_timeout', 'mmap_size', 'cache_size', 'temp_store')
+
+
+def backend_name(uri):
+    return make_url(uri).get_backend_name()
+
+
+def profile_settings(profile, uri):
+    """Settings of profile for the backend of uri ({} when the profile does not tune it)"""
+    if profile not in ENGINE_PROFILES:
+        raise ValueError(f"Unknown DB_ENGINE_PROFILE: {profile}")
+    return ENGINE_PROFILES[profile].get(backend_name(uri), {})
+
+
+def _sqlite_connect_hook(pragmas):
+    def set_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        for name, value in pragmas.items():
+            cursor.execute(f'PRAGMA {name}={value}')
+        cursor.close()
+    return set_pragmas
+
+
+def _mysql_connect_hook(variables):
+    def set_session(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        for name, value in variables.items():
+            cursor.execute(f'SET SESSION {name} = {int(value)}')
+        cursor.close()
+    return set_session
+
+
+def _effective_settings(dbapi_connection, backend, settings):
+    cursor = dbapi_connection.cursor()
+    try:
+        if backend == 'sqlite':
+            values = {}
+            for name in REPORTED_PRAGMAS:
+                cursor.execute(f'PRAGMA {name}')
+                values[name] = cursor.fetchone()[0]
+            return values
+        values = {}
+        for name in settings.get('session', {}):
+            cursor.execute(f'SELECT @@SESSION.{name}')
+            values[name] = cursor.fetchone()[0]
+        return values
+    finally:
+        cursor.close()
+
+
+def install_connect_hooks(engine, profile, settings):
+    """Apply the profile's per-connection settings; log what the first connection reports"""
+    backend = engine.dialect.name
+    if settings.get('pragmas'):
+        event.listen(engine, 'connect', _sqlite_connect_hook(settings['pragmas']))
+    if settings.get('session'):
+        event.listen(engine, 'connect', _mysql_connect_hook(settings['session']))
+
+    def report(dbapi_connection, connection_record):
+        try:
+            values = _effective_settings(dbapi_connection, backend, settings)
+        except Exception:
+            logger.exception("Could not read back %s engine settings", backend)
+            return
+        logger.info("Engine profile %s effective on %s: %s", profile, backend,
+                    ', '.join(f'{k}={v}' for k, v in values.items()) or 'library defaults')
+    # Registered after the hooks above, so it sees their effect
+    event.listen(engine, 'connect', report, once=True)
+
+
+def apply_engine_profile(app):
+    """Put the profile's engine options into the app config; call before db.init_app(app)."""
+    profile = app.config.get('DB_ENGINE_PROFILE', DEFAULT_ENGINE_PROFILE)
+    uri = app.config['SQLALCHEMY_DATABASE_URI']
+    settings = profile_settings(profile, uri)
+    options = dict(app.config.get('SQLALCHEMY_ENGINE_OPTIONS') or {})
+    options.update(settings.get('engine_options', {}))
+    app.config['SQLALCHEMY_ENGINE_OPTIONS'] = options
+    app.extensions['taskwise_engine_profile'] = {'name': profile, 'settings': settings}
+    logger.info("Engine profile %s for %s: %s", profile, backend_name(uri), settings or 'library defaults')
+    return settings
+
+
+def install_engine_hooks(app, db):
+    """Attach the profile's connect hooks to the app's engine and read replicas; call after db.init_app(app)."""
+    profile = app.extensions['taskwise_engine_profile']['name']
+    with app.app_context():
+        for engine in (db.engine, *app.extensions.get('taskwise_replicas', ())):
+            install_connect_hooks(engine, profile, profile_settings(profile, engine.url))
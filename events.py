@@ -0,0 +1,170 @@
+"""
+Change events pushed to browsers over Server-Sent Events (/api/events).
+
+Committed writes to tasks, projects, subtasks, activities and notifications are turned into
+small events ({"action": "updated", "id": 5, ...}) by session listeners: the
+changes are collected at flush time and published only once the transaction
+commits, so a rolled-back write is never announced.
+
+EventBroadcaster is in-process. Every connection reads from one shared ring
+buffer and sleeps on one condition variable, so publishing is O(1) however
+many streams are open. Event ids are "<epoch>-<seq>", where the epoch is
+chosen per process start: a client resuming with Last-Event-ID gets the
+events it missed if they are still in the buffer, otherwise (buffer
+overflowed, server restarted or request served by another worker) a single
+"reset" event telling it to refetch everything.
+
+Because the feed is per process, a write handled by another worker never
+reaches a stream; pages keep a slow poll running alongside it, and the feed
+only makes refreshes prompt. Each open stream holds a worker thread, so a
+stream ends after EVENTS_STREAM_SECONDS (the browser reconnects and resumes)
+and at most EVENTS_MAX_STREAMS are served at once. Notification events carry
+their recipient and are only sent to that user's streams.
+"""
+import json
+import threading
+import time
+import uuid
+from collections import deque
+
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import Session
+
+from models import Task, Project, Subtask, Activity, Notification
+
+EVENT_BUFFER_SIZE = 1000
+KEEPALIVE_SECONDS = 15
+STREAM_SECONDS = 300
+
+# Model -> (event type, extra attributes included in the payload)
+EVENT_MODELS = {
+    Task: ('task', ('project_id',)),
+    Project: ('project', ()),
+    Subtask: ('subtask', ('parent_task_id',)),
+    Activity: ('activity', ('task_id',)),
+    Notification: ('notification', ('user_id', 'kind')),
+}
+EVENT_TABLES = {model.__tablename__: kind for model, (kind, _) in EVENT_MODELS.items()}
+
+
+class EventBroadcaster:
+    def __init__(self, buffer_size=EVENT_BUFFER_SIZE):
+        self.epoch = uuid.uuid4().hex[:8]
+        self._events = deque(maxlen=buffer_size)  # (seq, type, json data, recipient user id or None)
+        self._seq = 0
+        self._condition = threading.Condition()
+        self.subscribers = 0
+
+    def publish(self, kind, data, user_id=None):
+        """Append an event; with user_id only that user's streams receive it"""
+        payload = json.dumps(data, separators=(',', ':'))
+        with self._condition:
+            self._seq += 1
+            self._events.append((self._seq, kind, payload, user_id))
+            self._condition.notify_all()
+        return f'{self.epoch}-{self._seq}'
+
+    def _since(self, seq):
+        """Buffered events after seq, or None if some of them were already evicted"""
+        if seq > self._seq or (self._events and self._events[0][0] > seq + 1):
+            return None
+        return [e for e in self._events if e[0] > seq]
+
+    def _resume_point(self, last_event_id):
+        """Sequence number the client has seen, or None if it must reset"""
+        if not last_event_id:
+            return self._seq
+        epoch, _, seq = last_event_id.partition('-')
+        if epoch != self.epoch or not seq.isdigit():
+            return None
+        return int(seq)
+
+    def stream(self, last_event_id=None, keepalive=KEEPALIVE_SECONDS, user_id=None, duration=STREAM_SECONDS):
+        """Yield SSE-formatted chunks for `duration` seconds, starting after last_event_id.
+
+        Events addressed to another user are skipped. When the time is up the
+        stream ends and the browser reconnects with the last id it saw.
+        """
+        deadline = time.monotonic() + duration
+        with self._condition:
+            position = self._resume_point(last_event_id)
+            pending = self._since(position) if position is not None else None
+            self.subscribers += 1
+        try:
+            yield 'retry: 3000\n\n'
+            while True:
+                if pending is None:
+                    # Missed events are gone: tell the client to refetch everything
+                    with self._condition:
+                        position = self._seq
+                    yield f'id: {self.epoch}-{position}\nevent: reset\ndata: {{}}\n\n'
+                    pending = []
+                for seq, kind, payload, recipient in pending:
+                    position = seq
+                    if recipient is None or recipient == user_id:
+                        yield f'id: {self.epoch}-{seq}\nevent: {kind}\ndata: {payload}\n\n'
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return
+                with self._condition:
+                    if self._seq == position:
+                        self._condition.wait(min(keepalive, remaining))
+                    pending = self._since(position)
+                if pending == []:
+                    yield ': keepalive\n\n'
+        finally:
+            with self._condition:
+                self.subscribers -= 1
+
+
+broadcaster = EventBroadcaster()
+
+
+def _describe(obj, action):
+    kind, extra = EVENT_MODELS[type(obj)]
+    # Read loaded state only: deleted rows cannot be refreshed from the database
+    values = inspect(obj).dict
+    data = {'action': action, 'id': values.get('id')}
+    for attr in extra:
+        data[attr] = values.get(attr)
+    return kind, data
+
+
+@event.listens_for(Session, 'after_flush')
+def _collect_events(session, flush_context):
+    pending = session.info.setdefault('pending_events', [])
+    for action, objects in (('created', session.new), ('updated', session.dirty), ('deleted', session.deleted)):
+        for obj in objects:
+            if type(obj) not in EVENT_MODELS:
+                continue
+            if action == 'updated' and not session.is_modified(obj, include_collections=False):
+                continue
+            pending.append(_describe(obj, action))
+
+
+@event.listens_for(Session, 'do_orm_execute')
+def _collect_bulk_events(orm_execute_state):
+    if orm_execute_state.is_update or orm_execute_state.is_delete or orm_execute_state.is_insert:
+        table = getattr(orm_execute_state.statement, 'table', None)
+        kind = EVENT_TABLES.get(getattr(table, 'name', None))
+        if kind:
+            # Affected ids are not known for bulk statements; clients refetch the collection
+            orm_execute_state.session.info.setdefault('pending_events', []).append((kind, {'action': 'bulk'}))
+
+
+@event.listens_for(Session, 'after_commit')
+def _publish_events(session):
+    pending = session.info.pop('pending_events', None)
+    if not pending:
+        return
+    seen = set()
+    for kind, data in pending:
+        key = (kind, json.dumps(data, sort_keys=True))
+        if key not in seen:
+            seen.add(key)
+            broadcaster.publish(kind, data, user_id=data.get('user_id') if kind == 'notification' else None)
+
+
+@event.listens_for(Session, 'after_rollback')
+def _drop_events(session):
+    session.info.pop('pending_events', None)
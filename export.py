@@ -0,0 +1,96 @@
+"""
+Streaming export of tasks together with their subtasks and time entries.
+
+Rows are read in fixed-size chunks walking the primary key, each chunk's
+subtasks and time entries are batch-loaded, serialized and then released from
+the session before the next chunk is read. Memory therefore stays flat no
+matter how many tasks the database holds.
+"""
+import csv
+import io
+import json
+
+from config import db
+from models import Task, TaskStatus, load_tasks
+
+DEFAULT_CHUNK_SIZE = 500
+
+EXPORT_FORMATS = {
+    'ndjson': 'application/x-ndjson',
+    'csv': 'text/csv',
+}
+
+# Task keys written for every exported task (relationships are added separately)
+EXPORT_TASK_FIELDS = (
+    'id', 'title', 'description', 'status', 'priority', 'progress', 'card_color',
+    'due_date', 'created_at', 'updated_at', 'completed_at', 'project_id',
+    'estimated_hours', 'actual_hours', 'start_date', 'parent_task_id',
+    'subtasks', 'time_entries',
+)
+
+# One flat CSV layout shared by tasks, subtasks and time entries
+CSV_COLUMNS = (
+    'record_type', 'id', 'task_id', 'title', 'description', 'status', 'priority',
+    'progress', 'project_id', 'due_date', 'created_at', 'updated_at', 'completed_at',
+    'estimated_hours', 'actual_hours', 'completed', 'order',
+    'start_time', 'end_time', 'duration',
+)
+
+
+def iter_task_chunks(project_id=None, status=None, chunk_size=DEFAULT_CHUNK_SIZE):
+    """Yield lists of serialized tasks, ``chunk_size`` tasks at a time."""
+    last_id = 0
+    while True:
+        query = Task.query.filter(Task.id > last_id)
+        if project_id:
+            query = query.filter(Task.project_id == project_id)
+        if status:
+            query = query.filter(Task.status == TaskStatus(status))
+        tasks = load_tasks(query.order_by(Task.id).limit(chunk_size), EXPORT_TASK_FIELDS)
+        if not tasks:
+            return
+        chunk = [task.to_dict(EXPORT_TASK_FIELDS) for task in tasks]
+        last_id = tasks[-1].id
+        # Drop the chunk from the identity map so the session does not grow
+        db.session.expunge_all()
+        yield chunk
+        if len(tasks) < chunk_size:
+            return
+
+
+def iter_dev_task_chunks(tasks, subtasks_for, chunk_size=DEFAULT_CHUNK_SIZE):
+    """Chunk dev store tasks into the same shape as iter_task_chunks()."""
+    for start in range(0, len(tasks), chunk_size):
+        chunk = []
+        for task in tasks[start:start + chunk_size]:
+            item = {field: task.get(field) for field in EXPORT_TASK_FIELDS}
+            item['subtasks'] = subtasks_for(task.get('id'))
+            item['time_entries'] = []
+            chunk.append(item)
+        yield chunk
+
+
+def ndjson_lines(chunks):
+    """One JSON document per task, newline-delimited."""
+    for chunk in chunks:
+        yield ''.join(json.dumps(task, default=str) + '\n' for task in chunk)
+
+
+def csv_lines(chunks):
+    """Flat CSV with a record_type column: a task row followed by its subtasks and time entries."""
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=CSV_COLUMNS, extrasaction='ignore')
+    writer.writeheader()
+    yield buffer.getvalue()
+    buffer.seek(0)
+    buffer.truncate(0)
+    for chunk in chunks:
+        for task in chunk:
+            writer.writerow(dict(task, record_type='task', task_id=task.get('id')))
+            for subtask in task.get('subtasks') or []:
+                writer.writerow(dict(subtask, record_type='subtask', task_id=subtask.get('parent_task_id', subtask.get('task_id'))))
+            for entry in task.get('time_entries') or []:
+                writer.writerow(dict(entry, record_type='time_entry'))
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate(0)
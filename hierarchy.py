@@ -0,0 +1,144 @@
+"""
+Task hierarchy queries over tasks.parent_task_id.
+
+Trees can be arbitrarily deep, so they are walked by the database with
+recursive CTEs (WITH RECURSIVE on SQLite and MySQL 8) instead of one lazy
+load per level per node:
+
+* subtree(): the task and its descendants, plus per-task rollups (task
+  count, completed count, average progress, estimated and actual hours of
+  the task and everything below it). A second recursive CTE pairs every
+  returned task with each of its descendants, and the rollups are one
+  GROUP BY over those pairs, all in a single statement.
+* ancestors(): the chain from the task's parent up to the root.
+
+max_depth limits how many levels are followed (rollups cover the returned
+levels only). It is capped at MAX_TREE_DEPTH, which also stops a corrupted
+parent_task_id loop from recursing forever.
+"""
+from sqlalchemy import case, func, literal, select
+
+from config import db
+from models import Task, TaskStatus
+
+MAX_TREE_DEPTH = 100
+
+_TREE_COLUMNS = ('id', 'title', 'status', 'progress', 'estimated_hours', 'actual_hours', 'parent_task_id')
+_ROLLUP_COLUMNS = ('tasks', 'completed', 'progress', 'estimated_hours', 'actual_hours')
+
+
+def parse_max_depth(value):
+    """?max_depth= as an int in [0, MAX_TREE_DEPTH]; raises ValueError"""
+    if value in (None, ''):
+        return MAX_TREE_DEPTH
+    try:
+        depth = int(value)
+    except (TypeError, ValueError):
+        raise ValueError('max_depth must be an integer')
+    if depth < 0:
+        raise ValueError('max_depth must not be negative')
+    return min(depth, MAX_TREE_DEPTH)
+
+
+def _task_dict(row, depth):
+    data = {name: getattr(row, name) for name in _TREE_COLUMNS}
+    data['status'] = data['status'].value if data['status'] else None
+    data['depth'] = depth
+    return data
+
+
+def subtree(root_id, max_depth=MAX_TREE_DEPTH):
+    """Tasks of the subtree (root first, then by depth) with rollups; None if the root does not exist"""
+    tasks = Task.__table__
+    child = tasks.alias('child')
+
+    # (id, depth) of every task in the subtree
+    tree = select(tasks.c.id, literal(0).label('depth')).where(tasks.c.id == root_id).cte('subtree', recursive=True)
+    tree = tree.union_all(
+        select(child.c.id, tree.c.depth + 1)
+        .where(child.c.parent_task_id == tree.c.id, tree.c.depth < max_depth))
+
+    # (ancestor_id, id, depth): each subtree task paired with itself and its descendants
+    pairs = select(tree.c.id.label('ancestor_id'), tree.c.id, tree.c.depth).cte('subtree_pairs', recursive=True)
+    pairs = pairs.union_all(
+        select(pairs.c.ancestor_id, child.c.id, pairs.c.depth + 1)
+        .where(child.c.parent_task_id == pairs.c.id, pairs.c.depth < max_depth))
+
+    descendant = tasks.alias('descendant')
+    rollups = (
+        select(pairs.c.ancestor_id,
+               func.count().label('tasks'),
+               func.sum(case((descendant.c.status == TaskStatus.COMPLETED, 1), else_=0)).label('completed'),
+               func.avg(func.coalesce(descendant.c.progress, 0)).label('progress'),
+               func.sum(func.coalesce(descendant.c.estimated_hours, 0)).label('estimated_hours'),
+               func.sum(func.coalesce(descendant.c.actual_hours, 0)).label('actual_hours'))
+        .join(descendant, descendant.c.id == pairs.c.id)
+        .group_by(pairs.c.ancestor_id)
+        .subquery('rollups')
+    )
+    query = (
+        select(*(tasks.c[name] for name in _TREE_COLUMNS), tree.c.depth,
+               *(rollups.c[name].label(f'rollup_{name}') for name in _ROLLUP_COLUMNS))
+        .join(tree, tree.c.id == tasks.c.id)
+        .join(rollups, rollups.c.ancestor_id == tasks.c.id)
+        .order_by(tree.c.depth, tasks.c.id)
+    )
+    result = []
+    for row in db.session.execute(query):
+        data = _task_dict(row, row.depth)
+        data['rollup'] = {
+            'tasks': row.rollup_tasks,
+            'completed': int(row.rollup_completed or 0),
+            'progress': round(float(row.rollup_progress or 0), 1),
+            'estimated_hours': round(float(row.rollup_estimated_hours or 0), 2),
+            'actual_hours': round(float(row.rollup_actual_hours or 0), 2),
+        }
+        result.append(data)
+    return result or None
+
+
+def ancestors(task_id, max_depth=MAX_TREE_DEPTH):
+    """Parent first up to the root (depth 1, 2, ...); None if the task does not exist"""
+    tasks = Task.__table__
+    parent = tasks.alias('parent')
+
+    chain = (select(tasks.c.id, tasks.c.parent_task_id, literal(0).label('depth'))
+             .where(tasks.c.id == task_id).cte('ancestors', recursive=True))
+    chain = chain.union_all(
+        select(parent.c.id, parent.c.parent_task_id, chain.c.depth + 1)
+        .where(parent.c.id == chain.c.parent_task_id, chain.c.depth < max_depth))
+
+    query = (
+        select(*(tasks.c[name] for name in _TREE_COLUMNS), chain.c.depth)
+        .join(chain, chain.c.id == tasks.c.id)
+        .order_by(chain.c.depth)
+    )
+    rows = db.session.execute(query).all()
+    if not rows:
+        return None
+    return [_task_dict(row, row.depth) for row in rows if row.depth > 0]
+
+
+def is_descendant(task_id, candidate_id):
+    """Whether candidate_id is task_id itself or lies below it (so it cannot become its parent)"""
+    chain = ancestors(candidate_id)
+    if chain is None:
+        return False
+    return candidate_id == task_id or any(t['id'] == task_id for t in chain)
+
+
+def dev_subtree(tasks, root_id):
+    """SKIP_DB counterpart of subtree(): dev tasks have no parent, so the tree is the task itself"""
+    root = next((t for t in tasks if t['id'] == root_id), None)
+    if root is None:
+        return None
+    data = {name: root.get(name) for name in _TREE_COLUMNS}
+    data['depth'] = 0
+    data['rollup'] = {
+        'tasks': 1,
+        'completed': 1 if root.get('status') == TaskStatus.COMPLETED.value else 0,
+        'progress': float(root.get('progress') or 0),
+        'estimated_hours': float(root.get('estimated_hours') or 0),
+        'actual_hours': float(root.get('actual_hours') or 0),
+    }
+    return [data]
@@ -0,0 +1,123 @@
+"""
+Idempotency stores for client_token-based create deduplication.
+
+A client attaches a random client_token to a create request; retrying the
+same request returns the resource created by the first attempt instead of a
+duplicate. Two backends share the same get/put/discard/purge_expired
+interface:
+
+* MemoryIdempotencyStore keeps tokens in an LRU-ordered dict bounded by
+  IDEMPOTENCY_MAX_ENTRIES. It is per process, so it only dedupes retries that
+  reach the same worker (and is what SKIP_DB dev mode uses).
+* DatabaseIdempotencyStore keeps tokens in the idempotency_keys table. put()
+  adds the row to the caller's session, so the token commits atomically with
+  the resource; a concurrent duplicate on another worker fails on the unique
+  token with an IntegrityError and can then read the winner with get().
+
+Entries expire after IDEMPOTENCY_TTL_SECONDS. Expired rows are ignored on
+read and removed by purge_expired(): from cron with purge_idempotency_keys.py,
+or in process every IDEMPOTENCY_PURGE_INTERVAL_SECONDS when that is set.
+"""
+import os
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta
+
+from config import db
+from models import IdempotencyKey
+
+IDEMPOTENCY_BACKENDS = ('database', 'memory')
+
+
+class MemoryIdempotencyStore:
+    def __init__(self, ttl=86400, max_entries=10000):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries = OrderedDict()  # token -> (expires_at, value), oldest use first
+        self._lock = threading.Lock()
+
+    def get(self, token):
+        with self._lock:
+            entry = self._entries.get(token)
+            if entry is None:
+                return None
+            if entry[0] <= time.monotonic():
+                del self._entries[token]
+                return None
+            self._entries.move_to_end(token)
+            return entry[1]
+
+    def put(self, token, value):
+        with self._lock:
+            self._entries[token] = (time.monotonic() + self.ttl, value)
+            self._entries.move_to_end(token)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def discard(self, token):
+        with self._lock:
+            self._entries.pop(token, None)
+
+    def purge_expired(self):
+        now = time.monotonic()
+        with self._lock:
+            expired = [token for token, (expires_at, _) in self._entries.items() if expires_at <= now]
+            for token in expired:
+                del self._entries[token]
+        return len(expired)
+
+    def __len__(self):
+        return len(self._entries)
+
+
+class DatabaseIdempotencyStore:
+    def __init__(self, ttl=86400):
+        self.ttl = ttl
+
+    def get(self, token):
+        return (
+            db.session.query(IdempotencyKey.resource_id)
+            .filter(IdempotencyKey.token == token, IdempotencyKey.expires_at > datetime.utcnow())
+            .scalar()
+        )
+
+    def put(self, token, value):
+        """Record token -> resource id in the current transaction; the caller commits."""
+        # An expired row that has not been purged yet would still hold the unique token
+        db.session.query(IdempotencyKey).filter(
+            IdempotencyKey.token == token, IdempotencyKey.expires_at <= datetime.utcnow()
+        ).delete(synchronize_session=False)
+        db.session.add(IdempotencyKey(
+            token=token, resource_id=value, expires_at=datetime.utcnow() + timedelta(seconds=self.ttl)))
+
+    def discard(self, token):
+        """Forget a token in the current transaction; the caller commits."""
+        db.session.query(IdempotencyKey).filter(IdempotencyKey.token == token).delete(synchronize_session=False)
+
+    def purge_expired(self):
+        deleted = (
+            db.session.query(IdempotencyKey)
+            .filter(IdempotencyKey.expires_at <= datetime.utcnow())
+            .delete(synchronize_session=False)
+        )
+        db.session.commit()
+        return deleted
+
+    def __len__(self):
+        return db.session.query(IdempotencyKey).count()
+
+
+def init_idempotency(app):
+    """Create the configured store and register it on the app."""
+    backend = app.config.get('IDEMPOTENCY_STORE', 'database')
+    if backend not in IDEMPOTENCY_BACKENDS:
+        raise ValueError(f"Unknown IDEMPOTENCY_STORE: {backend}")
+    ttl = app.config.get('IDEMPOTENCY_TTL_SECONDS', 86400)
+    # Dev mode has no database to share tokens through
+    if backend == 'memory' or os.getenv('SKIP_DB') == '1':
+        store = MemoryIdempotencyStore(ttl, app.config.get('IDEMPOTENCY_MAX_ENTRIES', 10000))
+    else:
+        store = DatabaseIdempotencyStore(ttl)
+    app.extensions['taskwise_idempotency'] = store
+    return store
@@ -43,11 +43,19 @@ class User(db.Model):
             'created_at': self.created_at.isoformat() if self.created_at else None
         }
 # Import all models
-from .base import Project, Task, Activity
-from .progress_tracking import TimeEntry, Subtask, TaskDependency, ProgressSnapshot
+from .base import (Project, Task, Activity, ActivityArchive, RetentionRun, CollectionVersion, IdempotencyKey,
+                   Notification, NotificationCounter, NotificationScan)
+from .progress_tracking import (TimeEntry, Subtask, TaskDependency, ProgressSnapshot, SnapshotRun,
+                                SnapshotChange, calculate_task_progress, calculate_progress_batch)
+from .queries import task_load_options, load_tasks, load_task, serialize_tasks
+from .rollups import recompute_task_rollups
 
 __all__ = [
     'Project', 'Task', 'TimeEntry', 'Subtask', 'TaskDependency', 
-    'User',
-    'ProgressSnapshot', 'TaskStatus', 'Priority', 'Activity'
+    'User', 'IdempotencyKey',
+    'ProgressSnapshot', 'SnapshotRun', 'SnapshotChange', 'TaskStatus', 'Priority', 'Activity',
+    'ActivityArchive', 'RetentionRun', 'CollectionVersion', 'Notification',
+    'NotificationCounter', 'NotificationScan',
+    'task_load_options', 'load_tasks', 'load_task', 'serialize_tasks', 'recompute_task_rollups',
+    'calculate_task_progress', 'calculate_progress_batch'
 ]
\ No newline at end of file
@@ -29,8 +29,51 @@ class Project(db.Model):
             'task_count': len(self.tasks)
         }
 
+# Every key Task.to_dict() can emit, in output order
+TASK_FIELDS = (
+    'id', 'title', 'description', 'status', 'priority', 'progress', 'card_color',
+    'due_date', 'created_at', 'updated_at', 'completed_at',
+    'project_id', 'project_name', 'project_color',
+    'estimated_hours', 'actual_hours', 'start_date', 'is_tracking', 'last_tracked',
+    'total_time_spent', 'time_entries',
+    'subtasks', 'subtask_count', 'completed_subtasks', 'subtask_progress',
+    'dependencies', 'dependent_tasks',
+    'parent_task_id',
+    'calculated_progress',
+)
+
+# Named field sets accepted through ?view=
+TASK_VIEWS = {
+    'compact': ('id', 'title', 'status', 'priority', 'due_date', 'card_color'),
+    'calendar': ('id', 'title', 'description', 'status', 'priority', 'progress', 'card_color',
+                 'due_date', 'completed_at', 'project_id', 'estimated_hours'),
+    'full': TASK_FIELDS,
+}
+
+# Relationships each serialized field needs loaded
+TASK_FIELD_RELATIONSHIPS = {
+    'project_name': ('project',),
+    'project_color': ('project',),
+    'time_entries': ('time_entries',),
+    'subtasks': ('subtasks',),
+    'dependencies': ('dependencies',),
+    'dependent_tasks': ('dependent_tasks',),
+}
+
 class Task(db.Model):
     __tablename__ = 'tasks'
+    __table_args__ = (
+        # Calendar range scans: due_date BETWEEN ... optionally narrowed by status
+        db.Index('ix_tasks_due_date_status', 'due_date', 'status'),
+        # Newest-first listings and keyset pages (the primary key rides along as the tiebreaker)
+        db.Index('ix_tasks_created_at', 'created_at'),
+        db.Index('ix_tasks_updated_at', 'updated_at'),
+        # Filtered listings ordered by creation time
+        db.Index('ix_tasks_status_created_at', 'status', 'created_at'),
+        db.Index('ix_tasks_project_created_at', 'project_id', 'created_at'),
+        # Children of a task, followed by the recursive hierarchy queries (hierarchy.py)
+        db.Index('ix_tasks_parent_task_id', 'parent_task_id'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     title = db.Column(db.String(200), nullable=False)
@@ -50,6 +93,11 @@ class Task(db.Model):
     start_date = db.Column(db.DateTime)    # When work actually started
     last_tracked = db.Column(db.DateTime)  # Last time tracking entry
     is_tracking = db.Column(db.Boolean, default=False)  # Currently tracking time
+
+    # Denormalized rollups, maintained by models/rollups.py on subtask / time entry writes
+    subtask_total = db.Column(db.Integer, default=0, server_default='0', nullable=False)
+    subtask_completed = db.Column(db.Integer, default=0, server_default='0', nullable=False)
+    tracked_seconds = db.Column(db.Float, default=0.0, server_default='0', nullable=False)
     
     # Foreign Keys and Relationships
     project_id = db.Column(db.Integer, db.ForeignKey('projects.id'))
@@ -69,22 +117,17 @@ class Task(db.Model):
     def __repr__(self):
         return f'<Task {self.title}>'
     
-    def to_dict(self):
-        # Get time tracking stats
-        total_time = timedelta()
-        for entry in self.time_entries:
-            if entry.duration:
-                total_time += entry.duration
-                
-        # Calculate subtask progress
-        subtask_count = len(self.subtasks) if hasattr(self, 'subtasks') else 0
-        completed_subtasks = sum(1 for subtask in self.subtasks if subtask.completed) if hasattr(self, 'subtasks') else 0
-        subtask_progress = (completed_subtasks / subtask_count * 100) if subtask_count > 0 else 0
-        
-        # Get progress calculator
-        calculate_progress = get_progress_calculator()
-        
-        return {
+    def to_dict(self, fields=None, calculated_progress=None):
+        """Serialize the task.
+
+        ``fields`` limits the output to the given keys (see TASK_FIELDS). Only
+        the relationships those keys depend on are touched, so a compact
+        serialization never loads subtasks, time entries or dependencies.
+        ``calculated_progress`` passes in a value already computed in a batch
+        (see serialize_tasks()).
+        """
+        wanted = set(TASK_FIELDS if fields is None else fields)
+        data = {
             'id': self.id,
             'title': self.title,
             'description': self.description,
@@ -97,37 +140,50 @@ class Task(db.Model):
             'updated_at': self.updated_at.isoformat() if self.updated_at else None,
             'completed_at': self.completed_at.isoformat() if self.completed_at else None,
             'project_id': self.project_id,
-            'project_name': self.project.name if self.project else None,
-            'project_color': self.project.color if self.project else '#667eea',
-            
+
             # Progress tracking data
             'estimated_hours': self.estimated_hours,
             'actual_hours': self.actual_hours,
             'start_date': self.start_date.isoformat() if self.start_date else None,
             'is_tracking': self.is_tracking,
             'last_tracked': self.last_tracked.isoformat() if self.last_tracked else None,
-            
-            # Time tracking stats
-            'total_time_spent': str(total_time),
-            'time_entries': [entry.to_dict() for entry in self.time_entries] if hasattr(self, 'time_entries') else [],
-            
-            # Subtask information
-            'subtasks': [subtask.to_dict() for subtask in self.subtasks] if hasattr(self, 'subtasks') else [],
-            'subtask_count': subtask_count,
-            'completed_subtasks': completed_subtasks,
-            'subtask_progress': subtask_progress,
-            
-            # Dependencies
-            'dependencies': [task.id for task in self.dependencies] if hasattr(self, 'dependencies') else [],
-            'dependent_tasks': [task.id for task in self.dependent_tasks] if hasattr(self, 'dependent_tasks') else [],
-            
+
             # Task hierarchy
             'parent_task_id': self.parent_task_id,
-            
-            # Calculated overall progress
-            'calculated_progress': calculate_progress(self)
         }
-    
+
+        if wanted & {'project_name', 'project_color'}:
+            data['project_name'] = self.project.name if self.project else None
+            data['project_color'] = self.project.color if self.project else '#667eea'
+
+        # Time tracking stats (from the tracked_seconds rollup)
+        data['total_time_spent'] = str(timedelta(seconds=self.tracked_seconds or 0))
+        if 'time_entries' in wanted:
+            data['time_entries'] = [entry.to_dict() for entry in self.time_entries]
+
+        # Subtask information (counts come from the subtask rollups)
+        subtask_count = self.subtask_total or 0
+        completed_subtasks = self.subtask_completed or 0
+        if 'subtasks' in wanted:
+            data['subtasks'] = [subtask.to_dict() for subtask in self.subtasks]
+        data['subtask_count'] = subtask_count
+        data['completed_subtasks'] = completed_subtasks
+        data['subtask_progress'] = (completed_subtasks / subtask_count * 100) if subtask_count > 0 else 0
+
+        # Dependencies
+        if 'dependencies' in wanted:
+            data['dependencies'] = [task.id for task in self.dependencies]
+        if 'dependent_tasks' in wanted:
+            data['dependent_tasks'] = [task.id for task in self.dependent_tasks]
+
+        # Calculated overall progress
+        if 'calculated_progress' in wanted:
+            if calculated_progress is None:
+                calculated_progress = get_progress_calculator()(self)
+            data['calculated_progress'] = calculated_progress
+
+        return {key: data[key] for key in TASK_FIELDS if key in wanted}
+
     def mark_completed(self):
         self.status = TaskStatus.COMPLETED
         self.progress = 100
@@ -142,6 +198,9 @@ class Task(db.Model):
 
 class Activity(db.Model):
     __tablename__ = 'activities'
+    __table_args__ = (
+        db.Index('ix_activities_created_at', 'created_at'),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     event_type = db.Column(db.String(50), nullable=False)  # e.g., task_created, task_updated, subtask_created
@@ -160,6 +219,125 @@ class Activity(db.Model):
             'created_at': self.created_at.isoformat() if self.created_at else None
         }
 
+
+class ActivityArchive(db.Model):
+    """A batch of activities moved out of the hot table, as gzip-compressed NDJSON (see retention.py)"""
+    __tablename__ = 'activity_archives'
+
+    id = db.Column(db.Integer, primary_key=True)
+    first_activity_id = db.Column(db.Integer, nullable=False)
+    last_activity_id = db.Column(db.Integer, nullable=False)
+    first_created_at = db.Column(db.DateTime)
+    last_created_at = db.Column(db.DateTime, index=True)
+    row_count = db.Column(db.Integer, nullable=False)
+    payload = db.Column(db.LargeBinary, nullable=False)
+    archived_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    def activities(self):
+        """Decompress the archived activity dicts"""
+        import gzip
+        import json
+        return [json.loads(line) for line in gzip.decompress(self.payload).splitlines() if line]
+
+
+class RetentionRun(db.Model):
+    """One execution of the activity retention job"""
+    __tablename__ = 'retention_runs'
+
+    id = db.Column(db.Integer, primary_key=True)
+    started_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    finished_at = db.Column(db.DateTime)
+    cutoff = db.Column(db.DateTime, nullable=False)  # Activities created before this were retired
+    policy = db.Column(db.String(20), nullable=False)  # table, file or delete
+    batches = db.Column(db.Integer, default=0)
+    rows_archived = db.Column(db.Integer, default=0)
+    rows_deleted = db.Column(db.Integer, default=0)
+    archive_bytes = db.Column(db.Integer, default=0)
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'started_at': self.started_at.isoformat() if self.started_at else None,
+            'finished_at': self.finished_at.isoformat() if self.finished_at else None,
+            'cutoff': self.cutoff.isoformat() if self.cutoff else None,
+            'policy': self.policy,
+            'batches': self.batches,
+            'rows_archived': self.rows_archived,
+            'rows_deleted': self.rows_deleted,
+            'archive_bytes': self.archive_bytes
+        }
+
+
+class CollectionVersion(db.Model):
+    """Write counter per API collection, bumped in every transaction that changes it (see versions.py)"""
+    __tablename__ = 'collection_versions'
+
+    name = db.Column(db.String(50), primary_key=True)
+    version = db.Column(db.Integer, nullable=False, default=0)
+
+
+class IdempotencyKey(db.Model):
+    """A client_token already used to create a resource (see idempotency.py)"""
+    __tablename__ = 'idempotency_keys'
+
+    id = db.Column(db.Integer, primary_key=True)
+    token = db.Column(db.String(128), unique=True, nullable=False)
+    resource_id = db.Column(db.Integer, nullable=False)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    expires_at = db.Column(db.DateTime, nullable=False, index=True)
+
+
+class Notification(db.Model):
+    """An in-app notification for one user (user_id is NULL on installs without accounts)"""
+    __tablename__ = 'notifications'
+    __table_args__ = (
+        # Unread badge and "unread only" pages; the full list pages on the second index
+        db.Index('ix_notifications_user_read_created', 'user_id', 'read', 'created_at'),
+        db.Index('ix_notifications_user_created', 'user_id', 'created_at'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=True)
+    task_id = db.Column(db.Integer, db.ForeignKey('tasks.id', ondelete='SET NULL'), nullable=True)
+    kind = db.Column(db.String(20), nullable=False, default='message')  # message, due_day, due_hour, overdue
+    title = db.Column(db.String(200), nullable=False)
+    message = db.Column(db.Text, default='')
+    read = db.Column(db.Boolean, nullable=False, default=False)
+    # Generated notifications carry "<user>:<task>:<kind>:<due date>" so each is created only once
+    dedupe_key = db.Column(db.String(100), unique=True)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'title': self.title,
+            'message': self.message or '',
+            'read': bool(self.read),
+            'kind': self.kind,
+            'task_id': self.task_id,
+            'time': self.created_at.isoformat() + 'Z' if self.created_at else None
+        }
+
+
+class NotificationCounter(db.Model):
+    """Unread notifications per user, kept in step by notifications.py so the badge is one key lookup"""
+    __tablename__ = 'notification_counters'
+
+    user_key = db.Column(db.Integer, primary_key=True)  # users.id, or 0 for notifications without a user
+    unread = db.Column(db.Integer, nullable=False, default=0)
+
+
+class NotificationScan(db.Model):
+    """One pass of the due-date notification scanner (see due_notifications.py)"""
+    __tablename__ = 'notification_scans'
+
+    id = db.Column(db.Integer, primary_key=True)
+    started_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    window_start = db.Column(db.DateTime, nullable=False)
+    scanned_until = db.Column(db.DateTime, nullable=False, index=True)  # Windows entered up to here are notified
+    tasks_matched = db.Column(db.Integer, default=0)
+    notifications_created = db.Column(db.Integer, default=0)
+
 # Function to handle circular imports
 def get_progress_calculator():
     from models.progress_tracking import calculate_task_progress
@@ -1,9 +1,16 @@
 from config import db
 from datetime import datetime, timedelta
+from sqlalchemy import case, func, select
+from sqlalchemy.orm import Query
+
 from models import Task  # Import Task model for relationships
+from models.sqlfuncs import interval_seconds
 
 class TimeEntry(db.Model):
     __tablename__ = 'time_entries'
+    __table_args__ = (
+        db.Index('ix_time_entries_task_id', 'task_id'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     task_id = db.Column(db.Integer, db.ForeignKey('tasks.id'), nullable=False)
@@ -24,6 +31,10 @@ class TimeEntry(db.Model):
 
 class Subtask(db.Model):
     __tablename__ = 'subtasks'
+    __table_args__ = (
+        # A task's subtasks in display order without a sort step
+        db.Index('ix_subtasks_parent_task_id_order', 'parent_task_id', 'order'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     parent_task_id = db.Column(db.Integer, db.ForeignKey('tasks.id'), nullable=False)
@@ -54,6 +65,12 @@ class Subtask(db.Model):
 
 class TaskDependency(db.Model):
     __tablename__ = 'task_dependencies'
+    __table_args__ = (
+        # Covering in both directions: what a task depends on, and what depends on it;
+        # the first also keeps each edge unique
+        db.Index('uq_task_dependencies_edge', 'task_id', 'depends_on_id', unique=True),
+        db.Index('ix_task_dependencies_depends_on_id', 'depends_on_id', 'task_id'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     task_id = db.Column(db.Integer, db.ForeignKey('tasks.id'), nullable=False)
@@ -63,6 +80,9 @@ class TaskDependency(db.Model):
 class ProgressSnapshot(db.Model):
     """Stores daily progress snapshots for analytics"""
     __tablename__ = 'progress_snapshots'
+    __table_args__ = (
+        db.Index('ix_progress_snapshots_project_date', 'project_id', 'date'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     date = db.Column(db.Date, nullable=False)
@@ -83,6 +103,36 @@ class ProgressSnapshot(db.Model):
             'completion_rate': self.completion_rate
         }
 
+class SnapshotRun(db.Model):
+    """One execution of the snapshot builder (see snapshots.py)"""
+    __tablename__ = 'snapshot_runs'
+
+    id = db.Column(db.Integer, primary_key=True)
+    started_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    finished_at = db.Column(db.DateTime)
+    watermark = db.Column(db.DateTime, nullable=False)  # Changes up to here are reflected in snapshots
+    first_day = db.Column(db.Date)
+    last_day = db.Column(db.Date)
+    rows_written = db.Column(db.Integer, default=0)
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'started_at': self.started_at.isoformat() if self.started_at else None,
+            'finished_at': self.finished_at.isoformat() if self.finished_at else None,
+            'watermark': self.watermark.isoformat() if self.watermark else None,
+            'first_day': self.first_day.isoformat() if self.first_day else None,
+            'last_day': self.last_day.isoformat() if self.last_day else None,
+            'rows_written': self.rows_written
+        }
+
+class SnapshotChange(db.Model):
+    """A day changed by a committed write, and when it last was; read by the incremental snapshot refresh (see snapshots.py)"""
+    __tablename__ = 'snapshot_changes'
+
+    day = db.Column(db.Date, primary_key=True)
+    recorded_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow, index=True)
+
 # Add relationships to Task model
 from models import Task
 
@@ -96,29 +146,100 @@ Task.dependencies = db.relationship(
     backref=db.backref('dependent_tasks', lazy=True)
 )
 
-def calculate_task_progress(task):
-    """Calculate task progress based on multiple factors"""
-    weights = {
-        'subtasks': 0.4,      # 40% weight for subtasks completion
-        'time_spent': 0.3,    # 30% weight for time spent vs estimated
-        'manual': 0.3         # 30% weight for manual progress setting
-    }
-    
+# Share of each factor in the calculated progress
+PROGRESS_WEIGHTS = {
+    'subtasks': 0.4,      # 40% weight for subtasks completion
+    'time_spent': 0.3,    # 30% weight for time spent vs estimated
+    'manual': 0.3         # 30% weight for manual progress setting
+}
+
+# Task ids per statement when calculate_progress_batch() is given an id list
+PROGRESS_BATCH_SIZE = 500
+
+
+def weighted_progress(manual, estimated_hours, subtask_total, subtask_completed, tracked_seconds):
+    """Calculated progress (0-100) from a task's figures; shared by the per-task and batch paths"""
     progress = 0
-    
+
     # Calculate subtasks progress
-    if task.subtasks:
-        completed_subtasks = sum(1 for subtask in task.subtasks if subtask.completed)
-        subtask_progress = (completed_subtasks / len(task.subtasks)) * 100
-        progress += subtask_progress * weights['subtasks']
-    
+    if subtask_total:
+        subtask_progress = ((subtask_completed or 0) / subtask_total) * 100
+        progress += subtask_progress * PROGRESS_WEIGHTS['subtasks']
+
     # Calculate time-based progress
-    if task.estimated_hours and task.time_entries:
-        total_time = sum((entry.duration.total_seconds() / 3600) for entry in task.time_entries if entry.duration)
-        time_progress = min((total_time / task.estimated_hours) * 100, 100)
-        progress += time_progress * weights['time_spent']
-    
+    if estimated_hours and tracked_seconds:
+        total_time = tracked_seconds / 3600
+        time_progress = min((total_time / estimated_hours) * 100, 100)
+        progress += time_progress * PROGRESS_WEIGHTS['time_spent']
+
     # Include manual progress setting
-    progress += task.progress * weights['manual']
-    
-    return min(round(progress), 100)  # Ensure progress doesn't exceed 100%
\ No newline at end of file
+    progress += (manual or 0) * PROGRESS_WEIGHTS['manual']
+
+    return min(round(progress), 100)  # Ensure progress doesn't exceed 100%
+
+
+def calculate_task_progress(task):
+    """Calculate task progress based on multiple factors
+
+    Subtask and time figures come from the rollup columns on Task (see
+    models/rollups.py), so no collection is loaded.
+    """
+    return weighted_progress(task.progress, task.estimated_hours, task.subtask_total,
+                             task.subtask_completed, task.tracked_seconds)
+
+
+def _aggregate_progress(ids):
+    """{task id: progress} for the ids selected by the CTE ids, in one statement.
+
+    Subtask counts and tracked time come from two GROUP BY aggregates over the
+    subtasks and time_entries tables (not the rollup columns), each limited to
+    the selected tasks and left-joined onto them.
+    """
+    tasks = Task.__table__
+    subtasks = Subtask.__table__
+    entries = TimeEntry.__table__
+    subtask_counts = (
+        select(subtasks.c.parent_task_id.label('task_id'), func.count().label('total'),
+               func.sum(case((subtasks.c.completed.is_(True), 1), else_=0)).label('completed'))
+        .join(ids, ids.c.id == subtasks.c.parent_task_id)
+        .group_by(subtasks.c.parent_task_id)
+        .subquery('subtask_counts')
+    )
+    tracked = (
+        select(entries.c.task_id, func.sum(interval_seconds(entries.c.duration)).label('seconds'))
+        .join(ids, ids.c.id == entries.c.task_id)
+        .group_by(entries.c.task_id)
+        .subquery('tracked')
+    )
+    stmt = (
+        select(tasks.c.id, tasks.c.progress, tasks.c.estimated_hours,
+               subtask_counts.c.total, subtask_counts.c.completed, tracked.c.seconds)
+        .join(ids, ids.c.id == tasks.c.id)
+        .outerjoin(subtask_counts, subtask_counts.c.task_id == tasks.c.id)
+        .outerjoin(tracked, tracked.c.task_id == tasks.c.id)
+    )
+    return {row.id: weighted_progress(row.progress, row.estimated_hours, row.total, row.completed, row.seconds)
+            for row in db.session.execute(stmt)}
+
+
+def calculate_progress_batch(source):
+    """{task id: calculated progress} for many tasks at once, equal to calculate_task_progress().
+
+    source is one of:
+    * loaded Task instances: computed from their rollup columns, no query,
+    * a Task query (filters, ordering and limit are kept): one statement,
+    * task ids: one statement per PROGRESS_BATCH_SIZE ids.
+    The last two read the subtasks and time_entries tables directly, so the
+    result does not depend on the rollup columns being in step.
+    """
+    if isinstance(source, Query):
+        return _aggregate_progress(source.with_entities(Task.id).cte('progress_ids'))
+    items = list(source)
+    if items and isinstance(items[0], Task):
+        return {task.id: calculate_task_progress(task) for task in items}
+    tasks = Task.__table__
+    progress = {}
+    for start in range(0, len(items), PROGRESS_BATCH_SIZE):
+        chunk = items[start:start + PROGRESS_BATCH_SIZE]
+        progress.update(_aggregate_progress(select(tasks.c.id).where(tasks.c.id.in_(chunk)).cte('progress_ids')))
+    return progress
@@ -0,0 +1,81 @@
+"""
+Shared query helpers for loading tasks with their relationships.
+
+Task.to_dict() touches project, time_entries, subtasks, dependencies and
+dependent_tasks. Loading those lazily costs one SELECT per relationship per
+row, so every endpoint that serializes tasks should go through these helpers
+instead of calling .all() on a plain query.
+"""
+from sqlalchemy.orm import selectinload, joinedload
+
+from models.base import Task, TASK_FIELDS, TASK_VIEWS, TASK_FIELD_RELATIONSHIPS
+
+# Loader option for each relationship Task.to_dict() can serialize
+_RELATIONSHIP_LOADERS = {
+    'project': lambda: joinedload(Task.project),
+    'time_entries': lambda: selectinload(Task.time_entries),
+    'subtasks': lambda: selectinload(Task.subtasks),
+    'dependencies': lambda: selectinload(Task.dependencies),
+    'dependent_tasks': lambda: selectinload(Task.dependent_tasks),
+}
+
+
+def resolve_task_fields(fields=None, view=None):
+    """Turn ``?fields=`` / ``?view=`` request arguments into a field tuple.
+
+    Returns None for the full representation. Raises ValueError for an unknown
+    view or field name so the caller can answer with a 400.
+    """
+    if fields:
+        requested = [f.strip() for f in fields.split(',') if f.strip()]
+        unknown = [f for f in requested if f not in TASK_FIELDS]
+        if unknown:
+            raise ValueError(f"Unknown fields: {', '.join(unknown)}")
+        if 'id' not in requested:
+            requested.insert(0, 'id')
+        return tuple(requested)
+    if view:
+        if view not in TASK_VIEWS:
+            raise ValueError(f"Unknown view: {view}")
+        return None if view == 'full' else TASK_VIEWS[view]
+    return None
+
+
+def task_load_options(fields=None):
+    """Loader options that batch-load the relationships used by Task.to_dict(fields).
+
+    selectinload issues one extra ``SELECT ... WHERE id IN (...)`` per
+    relationship regardless of how many tasks were returned, so the total
+    query count stays fixed as the list grows. Relationships the requested
+    fields do not need are left unloaded.
+    """
+    wanted = TASK_FIELDS if fields is None else fields
+    relationships = []
+    for field in wanted:
+        for name in TASK_FIELD_RELATIONSHIPS.get(field, ()):
+            if name not in relationships:
+                relationships.append(name)
+    return [_RELATIONSHIP_LOADERS[name]() for name in relationships]
+
+
+def serialize_tasks(tasks, fields=None):
+    """to_dict(fields) for a list of tasks, with calculated_progress computed for all of them in one batch."""
+    from models.progress_tracking import calculate_progress_batch
+    wanted = TASK_FIELDS if fields is None else fields
+    progress = calculate_progress_batch(tasks) if 'calculated_progress' in wanted else {}
+    return [task.to_dict(fields, calculated_progress=progress.get(task.id)) for task in tasks]
+
+
+def load_tasks(query, fields=None):
+    """Execute a Task query with the serialized relationships eager-loaded."""
+    return query.options(*task_load_options(fields)).all()
+
+
+def load_task(task_id, fields=None):
+    """Load a single task with its relationships, or None if it does not exist."""
+    return (
+        Task.query
+        .options(*task_load_options(fields))
+        .filter(Task.id == task_id)
+        .one_or_none()
+    )
@@ -0,0 +1,141 @@
+"""
+Denormalized per-task rollups: subtask totals and tracked time.
+
+Task.subtask_total, Task.subtask_completed and Task.tracked_seconds are kept
+in step with the subtasks and time_entries tables by a session listener that
+turns every flushed Subtask / TimeEntry change into a relative UPDATE on the
+parent task, inside the same transaction as the change itself. Reading the
+counts is then O(1) per task instead of loading both collections.
+
+recompute_task_rollups() rebuilds the columns from scratch and is what the
+repair_task_rollups.py script runs.
+"""
+from collections import defaultdict
+
+from sqlalchemy import event, func, select, update
+from sqlalchemy.orm import Session
+
+from config import db
+from models.base import Task
+from models.progress_tracking import Subtask, TimeEntry
+from models.sqlfuncs import interval_seconds
+
+
+def _seconds(duration):
+    return duration.total_seconds() if duration else 0.0
+
+
+def _original(obj, attr):
+    """Value of an attribute as it was loaded from the database."""
+    history = db.inspect(obj).attrs[attr].history
+    if history.deleted:
+        return history.deleted[0]
+    if history.unchanged:
+        return history.unchanged[0]
+    return None
+
+
+def _collect_deltas(session):
+    """Turn pending Subtask / TimeEntry changes into per-task counter deltas."""
+    deltas = defaultdict(lambda: [0, 0, 0.0])  # task_id -> [total, completed, seconds]
+
+    for obj in session.new:
+        if isinstance(obj, Subtask):
+            deltas[obj.parent_task_id][0] += 1
+            deltas[obj.parent_task_id][1] += 1 if obj.completed else 0
+        elif isinstance(obj, TimeEntry):
+            deltas[obj.task_id][2] += _seconds(obj.duration)
+
+    for obj in session.deleted:
+        if isinstance(obj, Subtask):
+            task_id = _original(obj, 'parent_task_id')
+            deltas[task_id][0] -= 1
+            deltas[task_id][1] -= 1 if _original(obj, 'completed') else 0
+        elif isinstance(obj, TimeEntry):
+            deltas[_original(obj, 'task_id')][2] -= _seconds(_original(obj, 'duration'))
+
+    for obj in session.dirty:
+        if not session.is_modified(obj, include_collections=False):
+            continue
+        if isinstance(obj, Subtask):
+            old_task, old_completed = _original(obj, 'parent_task_id'), _original(obj, 'completed')
+            if old_task != obj.parent_task_id:
+                deltas[old_task][0] -= 1
+                deltas[obj.parent_task_id][0] += 1
+            deltas[old_task][1] -= 1 if old_completed else 0
+            deltas[obj.parent_task_id][1] += 1 if obj.completed else 0
+        elif isinstance(obj, TimeEntry):
+            deltas[_original(obj, 'task_id')][2] -= _seconds(_original(obj, 'duration'))
+            deltas[obj.task_id][2] += _seconds(obj.duration)
+
+    return {task_id: d for task_id, d in deltas.items() if task_id is not None and any(d)}
+
+
+# Rollup-relevant attributes keep their previous value when overwritten, even
+# if the instance was expired (e.g. after a commit), so deltas can be computed.
+for _attribute in (Subtask.parent_task_id, Subtask.completed, TimeEntry.task_id, TimeEntry.duration):
+    event.listen(_attribute, 'set', lambda target, value, oldvalue, initiator: value,
+                 active_history=True, retval=True)
+
+
+@event.listens_for(Session, 'before_flush')
+def _load_deleted_rollup_sources(session, flush_context, instances):
+    # Rows being deleted cannot be read after the flush, so make sure their
+    # counted attributes are loaded while they still exist.
+    for obj in session.deleted:
+        if isinstance(obj, Subtask):
+            obj.parent_task_id, obj.completed
+        elif isinstance(obj, TimeEntry):
+            obj.task_id, obj.duration
+
+
+@event.listens_for(Session, 'after_flush')
+def _apply_rollup_deltas(session, flush_context):
+    # Pending collections and attribute history still reflect the flushed
+    # changes here, and foreign keys of new rows have been populated.
+    deltas = _collect_deltas(session)
+    if not deltas:
+        return
+    tasks = Task.__table__
+    connection = session.connection()
+    for task_id, (total, completed, seconds) in deltas.items():
+        connection.execute(
+            update(tasks)
+            .where(tasks.c.id == task_id)
+            .values(
+                subtask_total=tasks.c.subtask_total + total,
+                subtask_completed=tasks.c.subtask_completed + completed,
+                tracked_seconds=tasks.c.tracked_seconds + seconds,
+            )
+        )
+        # Make loaded Task instances re-read the counters on next access
+        task = session.identity_map.get(db.inspect(Task).identity_key_from_primary_key((task_id,)))
+        if task is not None and task not in session.deleted:
+            session.expire(task, ['subtask_total', 'subtask_completed', 'tracked_seconds'])
+
+
+def recompute_task_rollups(task_ids=None):
+    """Rebuild the rollup columns from the subtasks and time_entries tables.
+
+    Runs as a single correlated UPDATE; pass task_ids to limit it to some tasks.
+    Returns the number of task rows updated. The caller commits.
+    """
+    tasks = Task.__table__
+    subtasks = Subtask.__table__
+    entries = TimeEntry.__table__
+    stmt = update(tasks).values(
+        subtask_total=select(func.count(subtasks.c.id))
+        .where(subtasks.c.parent_task_id == tasks.c.id)
+        .scalar_subquery(),
+        subtask_completed=select(func.count(subtasks.c.id))
+        .where(subtasks.c.parent_task_id == tasks.c.id, subtasks.c.completed.is_(True))
+        .scalar_subquery(),
+        tracked_seconds=select(func.coalesce(func.sum(interval_seconds(entries.c.duration)), 0.0))
+        .where(entries.c.task_id == tasks.c.id)
+        .scalar_subquery(),
+    )
+    if task_ids is not None:
+        stmt = stmt.where(tasks.c.id.in_(list(task_ids)))
+    result = db.session.execute(stmt)
+    db.session.expire_all()
+    return result.rowcount
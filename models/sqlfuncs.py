@@ -0,0 +1,107 @@
+"""
+Portable SQL expressions for date arithmetic.
+
+SQLite and MySQL have no common spelling for "seconds in an interval",
+"start of the week" or "seconds between two timestamps". Each helper is a
+FunctionElement compiled per dialect so queries can stay backend agnostic.
+"""
+from sqlalchemy import Float, String
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.sql.expression import FunctionElement
+
+
+class interval_seconds(FunctionElement):
+    """Seconds held by an Interval column, as a float.
+
+    Interval is not native on SQLite or MySQL; SQLAlchemy stores it as a
+    DATETIME offset from the epoch, so the conversion is dialect specific.
+    """
+    type = Float()
+    name = 'interval_seconds'
+    inherit_cache = True
+
+
+@compiles(interval_seconds)
+def _interval_seconds_default(element, compiler, **kw):
+    return "EXTRACT(EPOCH FROM %s)" % compiler.process(element.clauses, **kw)
+
+
+@compiles(interval_seconds, 'sqlite')
+def _interval_seconds_sqlite(element, compiler, **kw):
+    arg = compiler.process(element.clauses, **kw)
+    # %s has whole-second precision; %f - %S adds the fractional part
+    return ("(CAST(strftime('%%s', %(a)s) AS REAL) + "
+            "(strftime('%%f', %(a)s) - CAST(strftime('%%S', %(a)s) AS INTEGER)))") % {'a': arg}
+
+
+@compiles(interval_seconds, 'mysql')
+def _interval_seconds_mysql(element, compiler, **kw):
+    arg = compiler.process(element.clauses, **kw)
+    return "(TIMESTAMPDIFF(MICROSECOND, '1970-01-01 00:00:00', %s) / 1000000.0)" % arg
+
+
+class seconds_between(FunctionElement):
+    """Seconds elapsed from the first timestamp to the second, as a float."""
+    type = Float()
+    name = 'seconds_between'
+    inherit_cache = True
+
+
+@compiles(seconds_between)
+def _seconds_between_default(element, compiler, **kw):
+    start, end = list(element.clauses)
+    return "EXTRACT(EPOCH FROM (%s - %s))" % (compiler.process(end, **kw), compiler.process(start, **kw))
+
+
+@compiles(seconds_between, 'sqlite')
+def _seconds_between_sqlite(element, compiler, **kw):
+    start, end = list(element.clauses)
+    return "((julianday(%s) - julianday(%s)) * 86400.0)" % (compiler.process(end, **kw), compiler.process(start, **kw))
+
+
+@compiles(seconds_between, 'mysql')
+def _seconds_between_mysql(element, compiler, **kw):
+    start, end = list(element.clauses)
+    return "TIMESTAMPDIFF(SECOND, %s, %s)" % (compiler.process(start, **kw), compiler.process(end, **kw))
+
+
+class day_bucket(FunctionElement):
+    """Calendar day of a timestamp as 'YYYY-MM-DD'."""
+    type = String()
+    name = 'day_bucket'
+    inherit_cache = True
+
+
+@compiles(day_bucket)
+def _day_bucket_default(element, compiler, **kw):
+    return "CAST(DATE(%s) AS CHAR(10))" % compiler.process(element.clauses, **kw)
+
+
+@compiles(day_bucket, 'sqlite')
+def _day_bucket_sqlite(element, compiler, **kw):
+    return "date(%s)" % compiler.process(element.clauses, **kw)
+
+
+class week_bucket(FunctionElement):
+    """Monday of the ISO week containing a timestamp, as 'YYYY-MM-DD'."""
+    type = String()
+    name = 'week_bucket'
+    inherit_cache = True
+
+
+@compiles(week_bucket)
+def _week_bucket_default(element, compiler, **kw):
+    arg = compiler.process(element.clauses, **kw)
+    return "CAST(DATE(%s - ((EXTRACT(ISODOW FROM %s) - 1) * INTERVAL '1 day')) AS CHAR(10))" % (arg, arg)
+
+
+@compiles(week_bucket, 'sqlite')
+def _week_bucket_sqlite(element, compiler, **kw):
+    # 'weekday 0' moves forward to Sunday (or stays), six days back is Monday
+    return "date(%s, 'weekday 0', '-6 days')" % compiler.process(element.clauses, **kw)
+
+
+@compiles(week_bucket, 'mysql')
+def _week_bucket_mysql(element, compiler, **kw):
+    arg = compiler.process(element.clauses, **kw)
+    return "CAST(DATE(DATE_SUB(%s, INTERVAL WEEKDAY(%s) DAY)) AS CHAR(10))" % (arg, arg)
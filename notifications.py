@@ -0,0 +1,106 @@
+"""
+Notification storage helpers.
+
+Every write to the notifications table goes through this module so the
+per-user unread counter (NotificationCounter) moves in the same
+transaction: the badge is then one primary-key read instead of a COUNT.
+Helpers only stage changes on db.session; the caller commits.
+
+A counter row is created by the first write for a user, seeded from the
+user's rows at that point. Until it exists unread_count() counts the
+unread slice of ix_notifications_user_read_created instead.
+"""
+from collections import Counter
+
+from sqlalchemy import false, insert, select, update
+
+from config import db
+from models import Notification, NotificationCounter
+
+MAX_BULK_IDS = 500
+
+
+def user_key(user_id):
+    return user_id or 0
+
+
+def owned_by(user_id):
+    """Criterion for the notifications of user_id (None: notifications without a user)"""
+    return Notification.user_id == user_id if user_id else Notification.user_id.is_(None)
+
+
+def user_notifications(user_id, unread_only=False):
+    query = Notification.query.filter(owned_by(user_id))
+    if unread_only:
+        query = query.filter(Notification.read == false())
+    return query
+
+
+def _count_unread(user_id):
+    return user_notifications(user_id, unread_only=True).order_by(None).count()
+
+
+def _adjust_unread(user_id, delta):
+    if not delta:
+        return
+    table = NotificationCounter.__table__
+    key = user_key(user_id)
+    result = db.session.execute(update(table).where(table.c.user_key == key).values(unread=table.c.unread + delta))
+    if result.rowcount == 0:
+        # The change is already applied in this transaction, so the count includes it
+        db.session.execute(insert(table).values(user_key=key, unread=_count_unread(user_id)))
+
+
+def add_notifications(notifications):
+    """Stage new notifications and count the unread ones"""
+    db.session.add_all(notifications)
+    db.session.flush()
+    for user_id, count in Counter(n.user_id for n in notifications if not n.read).items():
+        _adjust_unread(user_id, count)
+
+
+def unread_count(user_id):
+    table = NotificationCounter.__table__
+    unread = db.session.execute(select(table.c.unread).where(table.c.user_key == user_key(user_id))).scalar()
+    return unread if unread is not None else _count_unread(user_id)
+
+
+def mark_read(user_id, ids=None):
+    """Mark the user's notifications read (all of them, or only ids); returns how many changed"""
+    query = user_notifications(user_id, unread_only=True)
+    if ids is not None:
+        query = query.filter(Notification.id.in_(ids))
+    changed = query.update({'read': True}, synchronize_session=False)
+    _adjust_unread(user_id, -changed)
+    return changed
+
+
+def delete_notifications(user_id, ids=None, read=None):
+    """Delete the user's notifications: all, only ids, and/or only read (True) or unread (False) ones"""
+    removed = 0
+    for state in (False, True) if read is None else (bool(read),):
+        query = user_notifications(user_id).filter(Notification.read == state)
+        if ids is not None:
+            query = query.filter(Notification.id.in_(ids))
+        count = query.delete(synchronize_session=False)
+        if not state:
+            _adjust_unread(user_id, -count)
+        removed += count
+    return removed
+
+
+def parse_ids(data):
+    """ids targeted by a bulk request body: {"id": 1}, {"ids": [1, 2]} or {"all": true} (None)"""
+    if data.get('all'):
+        return None
+    ids = data.get('ids')
+    if ids is None and data.get('id') is not None:
+        ids = [data['id']]
+    if not isinstance(ids, list) or not ids:
+        raise ValueError('id, ids or all required')
+    if len(ids) > MAX_BULK_IDS:
+        raise ValueError(f'At most {MAX_BULK_IDS} ids per request')
+    try:
+        return [int(i) for i in ids]
+    except (TypeError, ValueError) as e:
+        raise ValueError('ids must be integers') from e
@@ -0,0 +1,114 @@
+"""
+Keyset (cursor) pagination helpers.
+
+Pages are ordered newest-first on a ``(timestamp, id)`` pair and the cursor
+records the last pair the client saw. The next page is fetched with a
+``WHERE (ts, id) < (:ts, :id)`` predicate, so every page is an index range
+scan of ``limit`` rows no matter how deep the client has paged, unlike OFFSET
+which has to walk and discard every earlier row.
+
+Rows whose timestamp is NULL come after every dated row, newest id first
+(where descending order puts NULLs on SQLite and MySQL), and their cursors
+store ``'t': null``. Once the dated rows run out, the page is topped up from
+an ``IS NULL`` lookup on the same index.
+"""
+import base64
+import json
+from datetime import datetime
+
+from sqlalchemy import or_
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 500
+
+
+class InvalidCursor(ValueError):
+    """Raised when a cursor cannot be decoded or belongs to another ordering."""
+
+
+def encode_cursor(sort, timestamp, row_id):
+    """Build an opaque cursor for the row at the end of a page."""
+    payload = {
+        's': sort,
+        't': timestamp.isoformat() if isinstance(timestamp, datetime) else timestamp,
+        'i': row_id,
+    }
+    raw = json.dumps(payload, separators=(',', ':')).encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii').rstrip('=')
+
+
+def decode_cursor(cursor, sort):
+    """Return the ``(timestamp, id)`` pair stored in a cursor for the given ordering."""
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')))
+        timestamp, row_id = payload['t'], int(payload['i'])
+    except (ValueError, KeyError, TypeError) as e:
+        raise InvalidCursor('Invalid cursor') from e
+    if timestamp is not None and not isinstance(timestamp, str):
+        raise InvalidCursor('Invalid cursor')
+    if payload.get('s') != sort:
+        raise InvalidCursor('Cursor does not match the requested sort order')
+    return timestamp, row_id
+
+
+def parse_page_size(value, default=DEFAULT_PAGE_SIZE):
+    """Clamp a ``?limit=`` argument to ``1..MAX_PAGE_SIZE``; raises ValueError if it is not an integer."""
+    if value in (None, ''):
+        return default
+    try:
+        size = int(value)
+    except (TypeError, ValueError) as e:
+        raise ValueError('limit must be an integer') from e
+    return max(1, min(size, MAX_PAGE_SIZE))
+
+
+def keyset_page(query, timestamp_column, id_column, sort, cursor=None, limit=DEFAULT_PAGE_SIZE):
+    """Apply newest-first keyset pagination to a query.
+
+    Returns ``(rows, next_cursor)``; ``next_cursor`` is None on the last page.
+    One extra row is fetched to detect whether another page exists.
+    """
+    timestamp, row_id = decode_cursor(cursor, sort) if cursor else (None, None)
+    if cursor and timestamp is None:
+        # Already past the dated rows
+        rows = []
+    else:
+        dated = query
+        if cursor:
+            try:
+                timestamp = datetime.fromisoformat(timestamp)
+            except ValueError as e:
+                raise InvalidCursor('Invalid cursor') from e
+            # The redundant upper bound lets the database seek into the timestamp index
+            dated = dated.filter(
+                timestamp_column <= timestamp,
+                or_(timestamp_column < timestamp, id_column < row_id),
+            )
+        rows = dated.order_by(timestamp_column.desc(), id_column.desc()).limit(limit + 1).all()
+    if cursor and len(rows) <= limit:
+        # Without a cursor the query above already reached the NULL rows; after one its bounds skip them
+        undated = query.filter(timestamp_column.is_(None))
+        if timestamp is None:
+            undated = undated.filter(id_column < row_id)
+        rows += undated.order_by(id_column.desc()).limit(limit + 1 - len(rows)).all()
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        last = rows[-1]
+        next_cursor = encode_cursor(sort, getattr(last, timestamp_column.key), getattr(last, id_column.key))
+    return rows, next_cursor
+
+
+def keyset_page_list(items, timestamp_key, sort, cursor=None, limit=DEFAULT_PAGE_SIZE):
+    """Same contract as keyset_page() for dev-mode lists of dicts."""
+    ordered = sorted(items, key=lambda x: (x.get(timestamp_key) or '', x.get('id') or 0), reverse=True)
+    if cursor:
+        timestamp, row_id = decode_cursor(cursor, sort)
+        ordered = [x for x in ordered if ((x.get(timestamp_key) or ''), (x.get('id') or 0)) < (timestamp or '', row_id)]
+    page = ordered[:limit]
+    next_cursor = None
+    if len(ordered) > limit:
+        last = page[-1]
+        next_cursor = encode_cursor(sort, last.get(timestamp_key) or '', last.get('id') or 0)
+    return page, next_cursor
@@ -0,0 +1,36 @@
+"""
+Archive and delete old activity rows according to the retention settings.
+
+Usage:
+    python prune_activity.py                          # ACTIVITY_RETENTION_DAYS / ACTIVITY_ARCHIVE from config
+    python prune_activity.py --days 30 --policy file --archive-dir /var/backups/taskwise
+    python prune_activity.py --days 365 --policy delete --batch-size 200
+"""
+import argparse
+
+from config import create_app
+from retention import RETENTION_POLICIES, apply_activity_retention
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--days', type=int, help='keep this many days of activity in the hot table')
+    parser.add_argument('--policy', choices=RETENTION_POLICIES, help='where retired rows go')
+    parser.add_argument('--archive-dir', help='directory for the file policy')
+    parser.add_argument('--batch-size', type=int, help='rows retired per transaction')
+    args = parser.parse_args()
+
+    app = create_app()
+    with app.app_context():
+        run = apply_activity_retention(
+            args.days if args.days is not None else app.config['ACTIVITY_RETENTION_DAYS'],
+            args.policy or app.config['ACTIVITY_ARCHIVE'],
+            args.batch_size or app.config['ACTIVITY_RETENTION_BATCH'],
+            args.archive_dir or app.config['ACTIVITY_ARCHIVE_DIR'],
+        )
+        print(f"✅ Retired {run.rows_deleted} activit{'y' if run.rows_deleted == 1 else 'ies'} older than "
+              f"{run.cutoff:%Y-%m-%d} in {run.batches} batch(es), {run.rows_archived} archived ({run.policy})")
+
+
+if __name__ == "__main__":
+    main()
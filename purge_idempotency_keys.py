@@ -0,0 +1,23 @@
+"""
+Delete expired client_token rows from the idempotency_keys table.
+
+Usage:
+    python purge_idempotency_keys.py        # run from cron, e.g. hourly
+
+Workers can do the same in process by setting IDEMPOTENCY_PURGE_INTERVAL_SECONDS.
+"""
+from config import create_app
+from idempotency import DatabaseIdempotencyStore
+
+
+def main():
+    app = create_app()
+    store = app.extensions['taskwise_idempotency']
+    if not isinstance(store, DatabaseIdempotencyStore):
+        raise SystemExit("❌ IDEMPOTENCY_STORE is not 'database': tokens live in each worker's memory")
+    with app.app_context():
+        print(f"✅ Purged {store.purge_expired()} expired idempotency key(s)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,39 @@
+"""
+Add the task rollup columns if missing and recompute them from subtasks and time entries.
+
+Usage:
+    python repair_task_rollups.py              # every task
+    python repair_task_rollups.py 12 15 42     # only these task ids
+"""
+import sys
+
+from sqlalchemy import inspect, text
+
+from config import create_app, db
+from models import recompute_task_rollups
+
+ROLLUP_COLUMNS = {
+    'subtask_total': "INTEGER NOT NULL DEFAULT 0",
+    'subtask_completed': "INTEGER NOT NULL DEFAULT 0",
+    'tracked_seconds': "FLOAT NOT NULL DEFAULT 0",
+}
+
+
+def add_missing_columns():
+    existing = {column['name'] for column in inspect(db.engine).get_columns('tasks')}
+    with db.engine.connect() as conn:
+        for name, ddl in ROLLUP_COLUMNS.items():
+            if name not in existing:
+                conn.execute(text(f"ALTER TABLE tasks ADD COLUMN {name} {ddl}"))
+                print(f"➕ Added tasks.{name}")
+        conn.commit()
+
+
+if __name__ == "__main__":
+    task_ids = [int(arg) for arg in sys.argv[1:]] or None
+    app = create_app()
+    with app.app_context():
+        add_missing_columns()
+        updated = recompute_task_rollups(task_ids)
+        db.session.commit()
+        print(f"✅ Recomputed rollups for {updated} task(s)")
@@ -0,0 +1,134 @@
+"""
+Read-replica routing (DATABASE_REPLICA_URLS).
+
+Each replica URI gets its own engine with the same engine options and
+connect hooks as the primary. The engines live in app.extensions rather than
+SQLALCHEMY_BINDS, so db.create_all() and the shared metadata never see them.
+db.session is a RoutingSession whose get_bind() sends a statement to a replica only when all of these hold:
+
+* it runs inside a GET/HEAD request under /api/ (background jobs, CLI
+  scripts and every write request use the primary),
+* the request carries no read-your-writes cookie: after a successful write
+  request the client gets PRIMARY_COOKIE for READ_YOUR_WRITES_SECONDS, so
+  its next reads see its own changes even if the replicas lag behind,
+* the session has not written anything yet: a flush or bulk statement moves
+  the session to the primary for the rest of the request.
+
+One replica is picked per request, so all reads of a response come from the
+same snapshot. Replication itself is up to the database (MySQL replicas, or
+sync_sqlite_replica.py for two local SQLite files).
+"""
+import logging
+import os
+import random
+import time
+
+from flask import current_app, g, has_request_context, request
+from flask_sqlalchemy.session import Session
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import make_url
+
+logger = logging.getLogger(__name__)
+
+READ_METHODS = frozenset({'GET', 'HEAD'})
+# Methods that never mark the client as a writer (CORS preflights included)
+SAFE_METHODS = READ_METHODS | {'OPTIONS'}
+PRIMARY_COOKIE = 'tw_primary_until'
+
+# session.info key set once the session has written through the primary
+_WROTE = 'taskwise_wrote'
+
+
+def replica_urls(value):
+    """Split a comma-separated DATABASE_REPLICA_URLS value"""
+    return [url.strip() for url in (value or '').split(',') if url.strip()]
+
+
+class RoutingSession(Session):
+    """db.session class choosing between the primary and the request's replica"""
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if bind is None and not self._flushing and not self.info.get(_WROTE):
+            replica = g.get('db_replica') if has_request_context() else None
+            if replica is not None:
+                return replica
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+
+def read_source(session):
+    """'primary', or the URL of the replica session reads from in this request.
+
+    Part of the key of anything cached from query results, so that a result
+    read from a lagging replica is never served to a read-your-writes client.
+    """
+    bind = session.get_bind()
+    replicas = current_app.extensions.get('taskwise_replicas') or ()
+    if bind not in replicas:
+        return 'primary'
+    return bind.url.render_as_string(hide_password=True)
+
+
+@event.listens_for(RoutingSession, 'after_flush')
+def _flushed(session, flush_context):
+    session.info[_WROTE] = True
+
+
+@event.listens_for(RoutingSession, 'do_orm_execute')
+def _bulk_statement(orm_execute_state):
+    if orm_execute_state.is_update or orm_execute_state.is_delete or orm_execute_state.is_insert:
+        # Runs before the statement picks its bind, so the write itself goes to the primary
+        orm_execute_state.session.info[_WROTE] = True
+
+
+@event.listens_for(RoutingSession, 'after_commit')
+def _committed(session):
+    if session.info.get(_WROTE) and has_request_context():
+        g.db_committed_write = True
+
+
+def _replica_url(app, url):
+    """Resolve relative SQLite paths against the instance folder, like the primary URI"""
+    url = make_url(url)
+    if url.get_backend_name() == 'sqlite' and url.database and url.database != ':memory:' \
+            and not url.database.startswith('file:') and not os.path.isabs(url.database):
+        url = url.set(database=os.path.join(app.instance_path, url.database))
+    return url
+
+
+def create_replica_engines(app):
+    """Build the engines for DATABASE_REPLICA_URLS; call after apply_engine_profile(app)."""
+    options = app.config.get('SQLALCHEMY_ENGINE_OPTIONS') or {}
+    engines = [create_engine(_replica_url(app, url), **options)
+               for url in replica_urls(app.config.get('DATABASE_REPLICA_URLS'))]
+    app.extensions['taskwise_replicas'] = engines
+    if engines:
+        logger.info("Routing read-only API requests to %d replica(s)", len(engines))
+    return engines
+
+
+def _reads_own_writes():
+    try:
+        return float(request.cookies.get(PRIMARY_COOKIE, 0)) > time.time()
+    except ValueError:
+        return False
+
+
+def init_replica_routing(app):
+    """Pick the replica for each read-only API request and flag clients that just wrote."""
+    engines = app.extensions.get('taskwise_replicas')
+    if not engines:
+        return
+    window = app.config['READ_YOUR_WRITES_SECONDS']
+
+    @app.before_request
+    def _choose_replica():
+        if request.method in READ_METHODS and request.path.startswith('/api/') and not _reads_own_writes():
+            g.db_replica = random.choice(engines)
+
+    @app.after_request
+    def _flag_writer(response):
+        wrote = request.method not in SAFE_METHODS and response.status_code < 400
+        if (wrote or g.get('db_committed_write')) and window > 0:
+            response.set_cookie(PRIMARY_COOKIE, str(int(time.time() + window) + 1), max_age=window + 1,
+                                httponly=True, samesite='Lax')
+        return response
@@ -0,0 +1,101 @@
+"""
+Retention for the activities table.
+
+Activities older than ACTIVITY_RETENTION_DAYS are retired oldest first, in
+batches of ACTIVITY_RETENTION_BATCH rows. Each batch is its own short
+transaction, so the table is never locked for long. What happens to a retired
+batch depends on the ACTIVITY_ARCHIVE policy:
+
+* 'table': stored as one gzip-compressed NDJSON blob in activity_archives,
+  in the same transaction as the delete.
+* 'file': written to ACTIVITY_ARCHIVE_DIR as activities-<first>-<last>.ndjson.gz
+  before the delete commits (a crash in between can leave a duplicate file,
+  never a lost row).
+* 'delete': dropped without archiving.
+
+Every run is recorded as a RetentionRun row.
+"""
+import gzip
+import json
+import os
+from datetime import datetime, timedelta
+
+from sqlalchemy import delete
+
+from config import db
+from models import Activity, ActivityArchive, RetentionRun
+
+RETENTION_POLICIES = ('table', 'file', 'delete')
+DEFAULT_BATCH_SIZE = 500
+
+
+def _compress(activities):
+    lines = (json.dumps(a.to_dict(), separators=(',', ':')) + '\n' for a in activities)
+    return gzip.compress(''.join(lines).encode('utf-8'))
+
+
+def _write_file(archive_dir, batch, payload):
+    os.makedirs(archive_dir, exist_ok=True)
+    path = os.path.join(archive_dir, f'activities-{batch[0].id}-{batch[-1].id}.ndjson.gz')
+    with open(path, 'wb') as f:
+        f.write(payload)
+        f.flush()
+        os.fsync(f.fileno())
+    return path
+
+
+def apply_activity_retention(days, policy='table', batch_size=DEFAULT_BATCH_SIZE, archive_dir=None, now=None):
+    """Retire activities older than `days` days; returns the RetentionRun."""
+    if policy not in RETENTION_POLICIES:
+        raise ValueError(f"Unknown retention policy: {policy}")
+    if policy == 'file' and not archive_dir:
+        raise ValueError('archive_dir is required for the file policy')
+    cutoff = (now or datetime.utcnow()) - timedelta(days=days)
+    run = RetentionRun(cutoff=cutoff, policy=policy, batches=0, rows_archived=0, rows_deleted=0, archive_bytes=0)
+    db.session.add(run)
+    db.session.commit()
+
+    while True:
+        # Oldest first through ix_activities_created_at
+        batch = (
+            Activity.query.filter(Activity.created_at < cutoff)
+            .order_by(Activity.created_at, Activity.id)
+            .limit(batch_size)
+            .all()
+        )
+        if not batch:
+            break
+        if policy != 'delete':
+            payload = _compress(batch)
+            if policy == 'table':
+                db.session.add(ActivityArchive(
+                    first_activity_id=batch[0].id, last_activity_id=batch[-1].id,
+                    first_created_at=batch[0].created_at, last_created_at=batch[-1].created_at,
+                    row_count=len(batch), payload=payload,
+                ))
+            else:
+                _write_file(archive_dir, batch, payload)
+            run.rows_archived += len(batch)
+            run.archive_bytes += len(payload)
+        ids = [a.id for a in batch]
+        db.session.execute(delete(Activity).where(Activity.id.in_(ids)), execution_options={'synchronize_session': False})
+        run.rows_deleted += len(ids)
+        run.batches += 1
+        db.session.commit()
+        # The rows are gone; keep the identity map from growing with them
+        for activity in batch:
+            db.session.expunge(activity)
+
+    run.finished_at = datetime.utcnow()
+    db.session.commit()
+    return run
+
+
+def retain_activities(app):
+    """Apply the retention policy configured on app"""
+    return apply_activity_retention(
+        app.config['ACTIVITY_RETENTION_DAYS'],
+        app.config['ACTIVITY_ARCHIVE'],
+        app.config['ACTIVITY_RETENTION_BATCH'],
+        app.config['ACTIVITY_ARCHIVE_DIR'],
+    )
@@ -1,56 +1,107 @@
-from flask import request, jsonify, render_template, session, redirect, url_for, flash
+from flask import request, jsonify, render_template, session, redirect, url_for, flash, Response, stream_with_context
 from config import db
-from models import Task, Project, TaskStatus, Priority, User, Subtask, Activity
-from datetime import datetime
+from models import (Task, Project, TaskStatus, Priority, User, Subtask, Activity, Notification, load_tasks, load_task,
+                    serialize_tasks)
+from models.queries import resolve_task_fields, task_load_options
+import analytics as aggregates
+from cache import stats_cache
+from replicas import read_source
+from idempotency import init_idempotency
+from versions import get_versions, make_etag, not_modified, with_etag
+from activity_log import init_activity_recorder
+from events import broadcaster
+from dev_store import init_dev_store
+from notifications import (add_notifications, delete_notifications, mark_read as mark_notifications_read,
+                           parse_ids as parse_notification_ids, unread_count as notification_unread_count,
+                           user_notifications)
+from batch import BatchError, parse_operations, apply_task_batch, task_values
+from export import EXPORT_FORMATS, iter_task_chunks, iter_dev_task_chunks, ndjson_lines, csv_lines
+from snapshots import snapshot_series
+from search import SEARCH_PAGE_SIZE, SEARCH_WINDOW, dev_search_tasks, parse_page, search_tasks
+from hierarchy import ancestors, dev_subtree, is_descendant, parse_max_depth, subtree
+from dependencies import (DependencyCycleError, add_dependency, dependency_graph, dev_dependency_graph,
+                          remove_dependency)
+from pagination import InvalidCursor, keyset_page, keyset_page_list, parse_page_size
+from sqlalchemy.exc import IntegrityError
+from datetime import datetime, timedelta, timezone
 import json
 import os
 from types import SimpleNamespace
 
 def register_routes(app):
     skip_db = os.getenv('SKIP_DB') == '1'
-    # In-memory idempotency map for task creation: client_token -> task (or task id)
+    stats_cache.ttl = app.config['STATS_CACHE_TTL']
+    # Idempotency store for task creation: client_token -> task id (or task dict in dev mode)
     # This prevents duplicate tasks when client retries/create is called multiple times.
-    idempotency_map = {}
-    # Helper utilities for in-memory session-backed dev data when SKIP_DB is enabled
-    def _ensure_dev_data():
-        """Ensure that session has sample projects and tasks for dev mode."""
-        if 'dev_tasks' not in session:
-            now = datetime.utcnow().isoformat() + 'Z'
-            session.setdefault('dev_projects', [
-                {'id': 1, 'name': 'Sample Project', 'description': 'Dev project', 'color': '#667eea'}
-            ])
-            session.setdefault('dev_tasks', [
-                {
-                    'id': 1,
-                    'title': 'Sample Task',
-                    'description': 'This is a sample task to get you started.',
-                    'status': 'todo',
-                    'priority': 'medium',
-                    'project_id': 1,
-                    'progress': 0,
-                    'due_date': None,
-                    'created_at': now,
-                    'updated_at': now
-                }
-            ])
+    idempotency = init_idempotency(app)
+    # Activity events are recorded with the change and written off the request path
+    activity = init_activity_recorder(app)
+    # Server-side dev data when SKIP_DB is enabled (see dev_store.py)
+    dev_store = init_dev_store(app) if skip_db else None
+
+    if skip_db:
+        @app.before_request
+        def _drop_cookie_dev_data():
+            """Older versions kept the dev dataset in the session cookie; stop sending it back"""
+            legacy = [key for key in session if key in ('dev_tasks', 'dev_projects', 'activity_log', 'notifications')
+                      or key.startswith('subtasks_')]
+            for key in legacy:
+                session.pop(key)
 
     def _get_dev_tasks():
-        _ensure_dev_data()
-        return session.get('dev_tasks', [])
+        return dev_store.list_tasks()
 
-    def _save_dev_tasks(tasks):
-        session['dev_tasks'] = tasks
+    def _get_dev_projects():
+        return dev_store.list_projects()
 
-    def _next_dev_task_id():
-        tasks = _get_dev_tasks()
-        return max((t.get('id', 0) for t in tasks), default=0) + 1
+    # Orderings accepted by ?sort= on /api/tasks; also the keyset pagination columns
+    task_sort_columns = {'created': Task.created_at, 'updated': Task.updated_at}
 
-    def _get_dev_projects():
-        _ensure_dev_data()
-        return session.get('dev_projects', [])
+    def _requested_task_fields():
+        """Read ?fields= / ?view= from the request; None means the full task."""
+        return resolve_task_fields(request.args.get('fields'), request.args.get('view'))
+
+    def _datetime_arg(name):
+        """Parse an ISO-8601 query argument into a naive UTC datetime (None if absent)"""
+        value = request.args.get(name)
+        if not value:
+            return None
+        try:
+            parsed = datetime.fromisoformat(value.replace('Z', '+00:00'))
+        except ValueError:
+            raise ValueError(f"{name} must be an ISO-8601 date or datetime")
+        if parsed.tzinfo is not None:
+            parsed = parsed.astimezone(timezone.utc).replace(tzinfo=None)
+        return parsed
+
+    def _task_date_filters():
+        """Resolve due_from/due_to/updated_since, with ?month=YYYY-MM as a due-date shorthand"""
+        due_from, due_to = _datetime_arg('due_from'), _datetime_arg('due_to')
+        month = request.args.get('month')
+        if month:
+            try:
+                due_from = datetime.strptime(month, '%Y-%m')
+            except ValueError:
+                raise ValueError("month must be formatted as YYYY-MM")
+            due_to = (due_from + timedelta(days=32)).replace(day=1)
+        return due_from, due_to, _datetime_arg('updated_since')
+
+    def _parse_dev_datetime(value):
+        if not value:
+            return None
+        try:
+            parsed = datetime.fromisoformat(value.replace('Z', '+00:00'))
+        except (AttributeError, ValueError):
+            return None
+        if parsed.tzinfo is not None:
+            parsed = parsed.astimezone(timezone.utc).replace(tzinfo=None)
+        return parsed
 
-    def _save_dev_projects(projects):
-        session['dev_projects'] = projects
+    def _select_dev_fields(task, fields):
+        """Apply a sparse fieldset to a dev store task dict."""
+        if fields is None:
+            return task
+        return {field: task.get(field) for field in fields}
 
     # Simple login_required decorator
     def login_required(fn):
@@ -206,12 +257,36 @@ def register_routes(app):
             return render_template('index.html')
 
     # API Routes for Tasks
+    def _collection_etag(*names, extra=()):
+        """ETag for this request from the collection write counters (None if unavailable)"""
+        versions = get_versions(*names)
+        return make_etag(versions, *extra) if versions is not None else None
+
+    def _etagged(response, etag):
+        return with_etag(response, etag) if etag else response
+
     @app.route('/api/tasks', methods=['GET'])
     def get_tasks():
         """Get all tasks with optional filtering"""
+        try:
+            fields = _requested_task_fields()
+            due_from, due_to, updated_since = _task_date_filters()
+            if fields is None and request.args.get('month') and not request.args.get('view'):
+                # Month view defaults to the fields the calendar renders
+                fields = resolve_task_fields(view='calendar')
+            # Keyset pagination is opt-in: without ?limit= or ?cursor= the full list is returned
+            sort = request.args.get('sort', 'created')
+            if sort not in task_sort_columns:
+                raise ValueError(f"Unknown sort: {sort}")
+            paginate = 'limit' in request.args or 'cursor' in request.args
+            limit = parse_page_size(request.args.get('limit'))
+            cursor = request.args.get('cursor')
+            include_total = request.args.get('include_total') in ('1', 'true')
+        except ValueError as e:
+            return jsonify({'success': False, 'error': str(e)}), 400
         try:
             if skip_db:
-                # Use session-backed dev tasks
+                # Use dev store tasks
                 tasks = _get_dev_tasks()
                 # Apply simple filtering
                 status = request.args.get('status')
@@ -225,17 +300,36 @@ def register_routes(app):
                         return False
                     if project_id and str(t.get('project_id')) != str(project_id):
                         return False
+                    if due_from or due_to:
+                        due = _parse_dev_datetime(t.get('due_date'))
+                        if due is None or (due_from and due < due_from) or (due_to and due >= due_to):
+                            return False
+                    if updated_since:
+                        updated = _parse_dev_datetime(t.get('updated_at'))
+                        if updated is None or updated <= updated_since:
+                            return False
                     return True
 
                 filtered = [t for t in tasks if match(t)]
+                if paginate:
+                    page, next_cursor = keyset_page_list(filtered, f'{sort}_at', sort, cursor, limit)
+                    payload = {'success': True, 'tasks': [_select_dev_fields(t, fields) for t in page], 'count': len(page), 'next_cursor': next_cursor}
+                    if include_total:
+                        payload['total'] = len(filtered)
+                    return jsonify(payload)
                 # sort by created_at desc if available
                 try:
-                    filtered.sort(key=lambda x: x.get('created_at') or '', reverse=True)
+                    filtered.sort(key=lambda x: x.get(f'{sort}_at') or '', reverse=True)
                 except Exception:
                     pass
-                return jsonify({'success': True, 'tasks': filtered, 'count': len(filtered)})
+                return jsonify({'success': True, 'tasks': [_select_dev_fields(t, fields) for t in filtered], 'count': len(filtered)})
 
             # DB-backed path
+            # Unchanged collection: answer before querying or serializing any task
+            etag = _collection_etag('tasks')
+            unchanged = not_modified(etag)
+            if unchanged:
+                return unchanged
             # Get query parameters
             status = request.args.get('status')
             priority = request.args.get('priority')
@@ -249,26 +343,82 @@ def register_routes(app):
                 query = query.filter(Task.priority == Priority(priority))
             if project_id:
                 query = query.filter(Task.project_id == project_id)
+            # Date ranges are half-open: due_from <= due_date < due_to
+            if due_from:
+                query = query.filter(Task.due_date >= due_from)
+            if due_to:
+                query = query.filter(Task.due_date < due_to)
+            if updated_since:
+                query = query.filter(Task.updated_at > updated_since)
             
-            # Order by created_at desc
-            tasks = query.order_by(Task.created_at.desc()).all()
+            sort_column = task_sort_columns[sort]
+            if paginate:
+                page, next_cursor = keyset_page(query.options(*task_load_options(fields)), sort_column, Task.id, sort, cursor, limit)
+                payload = {'success': True, 'tasks': serialize_tasks(page, fields), 'count': len(page), 'next_cursor': next_cursor}
+                if include_total:
+                    payload['total'] = query.order_by(None).count()
+                return _etagged(jsonify(payload), etag)
+
+            # Order by created_at desc (id breaks ties so the order matches the paginated one)
+            tasks = load_tasks(query.order_by(sort_column.desc(), Task.id.desc()), fields)
             
-            return jsonify({'success': True, 'tasks': [task.to_dict() for task in tasks], 'count': len(tasks)})
+            return _etagged(jsonify({'success': True, 'tasks': serialize_tasks(tasks, fields), 'count': len(tasks)}), etag)
+        except InvalidCursor as e:
+            return jsonify({'success': False, 'error': str(e)}), 400
         except Exception as e:
             return jsonify({'success': False, 'error': str(e)}), 500
 
     @app.route('/api/activity', methods=['GET'])
     def get_activity():
         try:
-            limit = int(request.args.get('limit', 50))
+            limit = parse_page_size(request.args.get('limit'))
+        except ValueError as e:
+            return jsonify({'success': False, 'error': str(e)}), 400
+        cursor = request.args.get('cursor')
+        try:
             if skip_db:
-                logs = session.get('activity_log', [])
-                return jsonify({'success': True, 'activities': logs[:limit]})
-            acts = Activity.query.order_by(Activity.created_at.desc()).limit(limit).all()
-            return jsonify({'success': True, 'activities': [a.to_dict() for a in acts]})
+                logs = dev_store.list_activity()
+                page, next_cursor = keyset_page_list(logs, 'created_at', 'activity', cursor, limit)
+                return jsonify({'success': True, 'activities': page, 'next_cursor': next_cursor})
+            # Make events still waiting in the buffer visible to the feed
+            activity.flush()
+            etag = _collection_etag('activity')
+            unchanged = not_modified(etag)
+            if unchanged:
+                return unchanged
+            acts, next_cursor = keyset_page(Activity.query, Activity.created_at, Activity.id, 'activity', cursor, limit)
+            payload = {'success': True, 'activities': [a.to_dict() for a in acts], 'next_cursor': next_cursor}
+            if request.args.get('include_total') in ('1', 'true'):
+                payload['total'] = Activity.query.count()
+            return _etagged(jsonify(payload), etag)
+        except InvalidCursor as e:
+            return jsonify({'success': False, 'error': str(e)}), 400
         except Exception as e:
             return jsonify({'success': False, 'error': str(e)}), 500
 
+    @app.route('/api/events', methods=['GET'])
+    def event_stream():
+        """Server-Sent Events feed of committed changes made through this worker (see events.py)"""
+        # EventSource sends Last-Event-ID on reconnect; the query param lets a page resume explicitly
+        last_event_id = request.headers.get('Last-Event-ID') or request.args.get('last_event_id')
+        # Every open stream holds a worker thread; past the cap pages rely on their poll
+        if broadcaster.subscribers >= app.config.get('EVENTS_MAX_STREAMS', 8):
+            return jsonify({'success': False, 'error': 'Too many open event streams'}), 503
+        # The generator never touches the database, so the connection is not held open
+        return Response(
+            broadcaster.stream(last_event_id, user_id=session.get('user_id'),
+                               duration=app.config.get('EVENTS_STREAM_SECONDS', 300)),
+            mimetype='text/event-stream',
+            headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+        )
+
+    def _idempotent_task_response(task_id):
+        """Response replaying an earlier create, or None if that task no longer exists"""
+        task = db.session.get(Task, int(task_id))
+        if task is None:
+            return None
+        return jsonify({'success': True, 'message': 'Task created (idempotent)', 'task': task.to_dict()}), 200
+
     @app.route('/api/tasks', methods=['POST'])
     def create_task():
         """Create a new task"""
@@ -280,60 +430,27 @@ def register_routes(app):
             # return the previous result to avoid duplicates
             client_token = data.get('client_token')
             if client_token:
-                prev = idempotency_map.get(client_token)
+                prev = idempotency.get(client_token)
                 if prev:
-                    # prev may be a dict (dev) or a task id (db)
+                    # prev is the task dict (dev) or the task id (db)
                     if skip_db:
                         return jsonify({'success': True, 'message': 'Task created (dev, idempotent)', 'task': prev}), 200
-                    else:
-                        # return the stored task representation if we cached it, else fetch from DB by id
-                        if isinstance(prev, dict):
-                            return jsonify({'success': True, 'message': 'Task created (idempotent)', 'task': prev}), 200
-                        else:
-                            try:
-                                task = Task.query.get(int(prev))
-                                if task:
-                                    return jsonify({'success': True, 'message': 'Task created (idempotent)', 'task': task.to_dict()}), 200
-                            except Exception:
-                                pass
+                    replay = _idempotent_task_response(prev)
+                    if replay:
+                        return replay
+                    # The earlier task was deleted since; the token is reused for a new one
+                    idempotency.discard(client_token)
             # Validate required fields
             if not data.get('title'):
                 return jsonify({'success': False, 'error': 'Title is required'}), 400
 
             if skip_db:
-                tasks = _get_dev_tasks()
-                now = datetime.utcnow().isoformat() + 'Z'
-                task = {
-                    'id': _next_dev_task_id(),
-                    'title': data['title'],
-                    'description': data.get('description', ''),
-                    'priority': data.get('priority', 'medium'),
-                    'project_id': data.get('project_id'),
-                    'progress': data.get('progress', 0),
-                    'status': data.get('status', 'todo'),
-                    'due_date': data.get('due_date'),
-                    'card_color': data.get('card_color', '#fecaca'),
-                    'created_at': now,
-                    'updated_at': now
-                }
-                tasks.append(task)
-                # record activity in dev session
-                notifs = session.get('activity_log', [])
-                notifs.insert(0, {
-                    'id': len(notifs) + 1,
-                    'event_type': 'task_created',
-                    'message': f"Task created: {task['title']}",
-                    'task_id': task['id'],
-                    'created_at': now
-                })
-                session['activity_log'] = notifs
+                with dev_store.transaction():
+                    task = dev_store.create_task(data)
+                    dev_store.record_activity('task_created', f"Task created: {task['title']}", task['id'])
                 # store idempotency mapping for dev mode
                 if client_token:
-                    try:
-                        idempotency_map[client_token] = task
-                    except Exception:
-                        pass
-                _save_dev_tasks(tasks)
+                    idempotency.put(client_token, task)
                 return jsonify({'success': True, 'message': 'Task created (dev)', 'task': task}), 201
 
             # DB-backed path
@@ -348,20 +465,21 @@ def register_routes(app):
             if data.get('due_date'):
                 task.due_date = datetime.fromisoformat(data['due_date'].replace('Z', '+00:00'))
             db.session.add(task)
-            db.session.commit()
-            # record activity in DB
+            db.session.flush()
+            if client_token:
+                # The token is stored in the same transaction as the task, so a
+                # concurrent retry on another worker fails on the unique token
+                idempotency.put(client_token, task.id)
+            activity.record('task_created', f"Task created: {task.title}", task_id=task.id)
             try:
-                act = Activity(event_type='task_created', message=f"Task created: {task.title}", task_id=task.id)
-                db.session.add(act)
                 db.session.commit()
-            except Exception:
+            except IntegrityError:
                 db.session.rollback()
-            # record idempotency mapping for DB-backed mode
-            if client_token:
-                try:
-                    idempotency_map[client_token] = task.id
-                except Exception:
-                    pass
+                prev = idempotency.get(client_token) if client_token else None
+                replay = _idempotent_task_response(prev) if prev else None
+                if replay:
+                    return replay
+                raise
             return jsonify({'success': True, 'message': 'Task created successfully', 'task': task.to_dict()}), 201
         except Exception as e:
             if not skip_db:
@@ -371,16 +489,21 @@ def register_routes(app):
     @app.route('/api/tasks/<int:task_id>', methods=['GET'])
     def get_task(task_id):
         """Get a specific task"""
+        try:
+            fields = _requested_task_fields()
+        except ValueError as e:
+            return jsonify({'success': False, 'error': str(e)}), 400
         try:
             if skip_db:
-                tasks = _get_dev_tasks()
-                for t in tasks:
-                    if int(t.get('id')) == int(task_id):
-                        return jsonify({'success': True, 'task': t})
-                return jsonify({'success': False, 'error': 'Not found'}), 404
+                task = dev_store.get_task(task_id)
+                if task is None:
+                    return jsonify({'success': False, 'error': 'Not found'}), 404
+                return jsonify({'success': True, 'task': _select_dev_fields(task, fields)})
 
-            task = Task.query.get_or_404(task_id)
-            return jsonify({'success': True, 'task': task.to_dict()})
+            task = load_task(task_id, fields)
+            if not task:
+                return jsonify({'success': False, 'error': 'Not found'}), 404
+            return jsonify({'success': True, 'task': task.to_dict(fields)})
         except Exception as e:
             return jsonify({'success': False, 'error': str(e)}), 500
 
@@ -390,31 +513,11 @@ def register_routes(app):
         try:
             data = request.get_json() or {}
             if skip_db:
-                tasks = _get_dev_tasks()
-                found = False
-                for t in tasks:
-                    if int(t.get('id')) == int(task_id):
-                        found = True
-                        # Update allowed fields
-                        for field in ('title', 'description', 'status', 'priority', 'progress', 'project_id', 'due_date', 'card_color'):
-                            if field in data:
-                                t[field] = data[field]
-                        t['updated_at'] = datetime.utcnow().isoformat() + 'Z'
-                        break
-                if not found:
-                    return jsonify({'success': False, 'error': 'Not found'}), 404
-                _save_dev_tasks(tasks)
-                # record activity in dev session
-                notifs = session.get('activity_log', [])
-                now = datetime.utcnow().isoformat() + 'Z'
-                notifs.insert(0, {
-                    'id': len(notifs) + 1,
-                    'event_type': 'task_updated',
-                    'message': f"Task updated: {t.get('title')}",
-                    'task_id': t.get('id'),
-                    'created_at': now
-                })
-                session['activity_log'] = notifs
+                with dev_store.transaction():
+                    t = dev_store.update_task(task_id, data)
+                    if t is None:
+                        return jsonify({'success': False, 'error': 'Not found'}), 404
+                    dev_store.record_activity('task_updated', f"Task updated: {t.get('title')}", t.get('id'))
                 return jsonify({'success': True, 'message': 'Task updated (dev)', 'task': t})
 
             task = Task.query.get_or_404(task_id)
@@ -440,15 +543,18 @@ def register_routes(app):
                     task.due_date = datetime.fromisoformat(data['due_date'].replace('Z', '+00:00'))
                 else:
                     task.due_date = None
+            if 'parent_task_id' in data:
+                parent_id = data['parent_task_id']
+                if parent_id is not None:
+                    parent_id = int(parent_id)
+                    if db.session.get(Task, parent_id) is None:
+                        return jsonify({'success': False, 'error': 'Parent task not found'}), 400
+                    if is_descendant(task.id, parent_id):
+                        return jsonify({'success': False, 'error': 'A task cannot be moved under itself or its subtasks'}), 400
+                task.parent_task_id = parent_id
             task.updated_at = datetime.utcnow()
+            activity.record('task_updated', f"Task updated: {task.title}", task_id=task.id)
             db.session.commit()
-            # record activity
-            try:
-                act = Activity(event_type='task_updated', message=f"Task updated: {task.title}", task_id=task.id)
-                db.session.add(act)
-                db.session.commit()
-            except Exception:
-                db.session.rollback()
             return jsonify({'success': True, 'message': 'Task updated successfully', 'task': task.to_dict()})
         except Exception as e:
             if not skip_db:
@@ -460,40 +566,113 @@ def register_routes(app):
         """Delete a task"""
         try:
             if skip_db:
-                tasks = _get_dev_tasks()
-                new_tasks = [t for t in tasks if int(t.get('id')) != int(task_id)]
-                if len(new_tasks) == len(tasks):
-                    return jsonify({'success': False, 'error': 'Not found'}), 404
-                # record activity
-                now = datetime.utcnow().isoformat() + 'Z'
-                notifs = session.get('activity_log', [])
-                notifs.insert(0, {
-                    'id': len(notifs) + 1,
-                    'event_type': 'task_deleted',
-                    'message': f"Task deleted: {task_id}",
-                    'task_id': task_id,
-                    'created_at': now
-                })
-                session['activity_log'] = notifs
-                _save_dev_tasks(new_tasks)
+                with dev_store.transaction():
+                    if dev_store.delete_task(task_id) is None:
+                        return jsonify({'success': False, 'error': 'Not found'}), 404
+                    dev_store.record_activity('task_deleted', f"Task deleted: {task_id}", task_id)
                 return jsonify({'success': True, 'message': 'Task deleted (dev)'})
 
             task = Task.query.get_or_404(task_id)
+            # Child tasks move up to the top level, like batch deletes do
+            Task.query.filter_by(parent_task_id=task.id).update({'parent_task_id': None}, synchronize_session=False)
             db.session.delete(task)
+            # No task_id: the row would reference a task that no longer exists (and may be written after it is gone)
+            activity.record('task_deleted', f"Task deleted: {task.title} (#{task.id})")
             db.session.commit()
-            # record activity
-            try:
-                act = Activity(event_type='task_deleted', message=f"Task deleted: {task.title}", task_id=task.id)
-                db.session.add(act)
-                db.session.commit()
-            except Exception:
-                db.session.rollback()
             return jsonify({'success': True, 'message': 'Task deleted successfully'})
         except Exception as e:
             if not skip_db:
                 db.session.rollback()
             return jsonify({'success': False, 'error': str(e)}), 500
 
+    @app.route('/api/tasks/batch', methods=['POST'])
+    def batch_tasks():
+        """Apply many create/update/delete operations in one transaction"""
+        try:
+            data = request.get_json(silent=True) or {}
+            operations = parse_operations(data)
+            atomic = bool(data.get('atomic', False))
+        except BatchError as e:
+            return jsonify({'success': False, 'error': str(e)}), 400
+        try:
+            if skip_db:
+                results = _apply_dev_batch(operations, atomic)
+            else:
+                results, _ = apply_task_batch(operations, atomic, idempotency)
+            failed = sum(1 for r in results if not r['success'])
+            if atomic and failed:
+                return jsonify({'success': False, 'error': 'Batch rejected', 'results': results, 'applied': 0, 'failed': failed}), 400
+            return jsonify({'success': True, 'results': results, 'applied': len(results) - failed, 'failed': failed})
+        except IntegrityError:
+            db.session.rollback()
+            return jsonify({'success': False, 'error': 'Conflicting concurrent batch, retry'}), 409
+        except Exception as e:
+            if not skip_db:
+                db.session.rollback()
+            return jsonify({'success': False, 'error': str(e)}), 500
+
+    def _apply_dev_batch(operations, atomic):
+        now = datetime.utcnow().isoformat() + 'Z'
+        results, applied = [], []
+        with dev_store.transaction():
+            for index, operation in enumerate(operations):
+                op = operation.get('op') if isinstance(operation, dict) else None
+                result = {'index': index, 'op': op, 'id': None, 'success': True}
+                results.append(result)
+                try:
+                    if op not in ('create', 'update', 'delete'):
+                        raise ValueError('op must be one of create, update, delete')
+                    fields = operation.get('data') or {}
+                    task_values(fields, datetime.utcnow())
+                    if op == 'create':
+                        if not fields.get('title'):
+                            raise ValueError('Title is required')
+                    else:
+                        result['id'] = int(operation.get('id'))
+                        if dev_store.get_task(result['id']) is None:
+                            raise ValueError('Not found')
+                    applied.append((op, result, fields))
+                except (TypeError, ValueError) as e:
+                    result.update(success=False, error=str(e))
+            if atomic and any(not r['success'] for r in results):
+                return results
+            for op, result, fields in applied:
+                if op == 'create':
+                    result['id'] = dev_store.create_task(fields, now)['id']
+                elif op == 'update':
+                    dev_store.update_task(result['id'], fields, now)
+                else:
+                    dev_store.delete_task(result['id'])
+        return results
+
+    @app.route('/api/export', methods=['GET'])
+    def export_tasks():
+        """Stream all tasks with their subtasks and time entries as NDJSON or CSV"""
+        fmt = request.args.get('format', 'ndjson')
+        if fmt not in EXPORT_FORMATS:
+            return jsonify({'success': False, 'error': f"Unsupported format: {fmt}"}), 400
+        project_id = request.args.get('project_id', type=int)
+        status = request.args.get('status')
+        if status:
+            try:
+                TaskStatus(status)
+            except ValueError:
+                return jsonify({'success': False, 'error': f"Unknown status: {status}"}), 400
+
+        if skip_db:
+            tasks = [t for t in _get_dev_tasks()
+                     if (not project_id or t.get('project_id') == project_id) and (not status or t.get('status') == status)]
+            chunks = iter_dev_task_chunks(tasks, dev_store.list_subtasks)
+        else:
+            chunks = iter_task_chunks(project_id=project_id, status=status)
+
+        lines = ndjson_lines(chunks) if fmt == 'ndjson' else csv_lines(chunks)
+        return Response(
+            stream_with_context(lines),
+            mimetype=EXPORT_FORMATS[fmt],
+            headers={'Content-Disposition': f'attachment; filename=taskwise-export.{fmt}'}
+        )
+
     # API Routes for Projects
     @app.route('/api/projects', methods=['GET'])  
     def get_projects():
@@ -503,8 +682,12 @@ def register_routes(app):
                 projects = _get_dev_projects()
                 return jsonify({'success': True, 'projects': projects, 'count': len(projects)})
 
+            etag = _collection_etag('projects')
+            unchanged = not_modified(etag)
+            if unchanged:
+                return unchanged
             projects = Project.query.order_by(Project.name).all()
-            return jsonify({'success': True, 'projects': [project.to_dict() for project in projects], 'count': len(projects)})
+            return _etagged(jsonify({'success': True, 'projects': [project.to_dict() for project in projects], 'count': len(projects)}), etag)
         except Exception as e:
             return jsonify({'success': False, 'error': str(e)}), 500
 
@@ -517,11 +700,7 @@ def register_routes(app):
                 return jsonify({'success': False, 'error': 'Project name is required'}), 400
 
             if skip_db:
-                projects = _get_dev_projects()
-                new_id = max((p.get('id', 0) for p in projects), default=0) + 1
-                project = {'id': new_id, 'name': data['name'], 'description': data.get('description', ''), 'color': data.get('color', '#667eea')}
-                projects.append(project)
-                _save_dev_projects(projects)
+                project = dev_store.create_project(data)
                 return jsonify({'success': True, 'message': 'Project created (dev)', 'project': project}), 201
 
             project = Project(name=data['name'], description=data.get('description', ''), color=data.get('color', '#667eea'))
@@ -539,19 +718,10 @@ def register_routes(app):
         try:
             data = request.get_json() or {}
             if skip_db:
-                projects = _get_dev_projects()
-                found = False
-                for p in projects:
-                    if int(p.get('id')) == int(project_id):
-                        found = True
-                        p['name'] = data.get('name', p.get('name'))
-                        p['description'] = data.get('description', p.get('description'))
-                        p['color'] = data.get('color', p.get('color'))
-                        break
-                if not found:
+                project = dev_store.update_project(project_id, data)
+                if project is None:
                     return jsonify({'success': False, 'error': 'Not found'}), 404
-                _save_dev_projects(projects)
-                return jsonify({'success': True, 'message': 'Project updated (dev)', 'project': next((x for x in projects if int(x.get("id"))==int(project_id)), None)})
+                return jsonify({'success': True, 'message': 'Project updated (dev)', 'project': project})
 
             project = Project.query.get_or_404(project_id)
             if 'name' in data:
@@ -572,17 +742,9 @@ def register_routes(app):
         """Delete a project and disassociate its tasks"""
         try:
             if skip_db:
-                projects = _get_dev_projects()
-                new_projects = [p for p in projects if int(p.get('id')) != int(project_id)]
-                if len(new_projects) == len(projects):
-                    return jsonify({'success': False, 'error': 'Not found'}), 404
                 # Remove project and set tasks' project_id to None
-                tasks = _get_dev_tasks()
-                for t in tasks:
-                    if int(t.get('project_id') or 0) == int(project_id):
-                        t['project_id'] = None
-                _save_dev_projects(new_projects)
-                _save_dev_tasks(tasks)
+                if not dev_store.delete_project(project_id):
+                    return jsonify({'success': False, 'error': 'Not found'}), 404
                 return jsonify({'success': True, 'message': 'Project deleted (dev)'})
 
             project = Project.query.get_or_404(project_id)
@@ -601,40 +763,111 @@ def register_routes(app):
     def get_dashboard_stats():
         """Get dashboard statistics"""
         try:
+            project_id = request.args.get('project_id', type=int)
             if skip_db:
-                tasks = _get_dev_tasks()
-                total_tasks = len(tasks)
-                completed_tasks = len([t for t in tasks if t.get('status') == 'completed'])
-                in_progress_tasks = len([t for t in tasks if t.get('status') == 'in_progress'])
-                overdue_tasks = 0
-                now = datetime.utcnow()
-                for t in tasks:
-                    due = t.get('due_date')
-                    if due:
-                        try:
-                            dt = datetime.fromisoformat(due.replace('Z', '+00:00'))
-                            if dt < now and t.get('status') != 'completed':
-                                overdue_tasks += 1
-                        except Exception:
-                            pass
-                completion_rate = (completed_tasks / total_tasks * 100) if total_tasks > 0 else 0
-                return jsonify({'success': True, 'stats': {'total_tasks': total_tasks, 'completed_tasks': completed_tasks, 'in_progress_tasks': in_progress_tasks, 'overdue_tasks': overdue_tasks, 'completion_rate': round(completion_rate, 1), 'todo_tasks': total_tasks - completed_tasks - in_progress_tasks}})
-
-            total_tasks = Task.query.count()
-            completed_tasks = Task.query.filter(Task.status == TaskStatus.COMPLETED).count()
-            in_progress_tasks = Task.query.filter(Task.status == TaskStatus.IN_PROGRESS).count()
-            overdue_tasks = Task.query.filter(Task.due_date < datetime.utcnow(), Task.status != TaskStatus.COMPLETED).count()
-            completion_rate = (completed_tasks / total_tasks * 100) if total_tasks > 0 else 0
-            return jsonify({'success': True, 'stats': {'total_tasks': total_tasks, 'completed_tasks': completed_tasks, 'in_progress_tasks': in_progress_tasks, 'overdue_tasks': overdue_tasks, 'completion_rate': round(completion_rate, 1), 'todo_tasks': total_tasks - completed_tasks - in_progress_tasks}})
+                return jsonify({'success': True, 'stats': aggregates.dev_dashboard_stats(_get_dev_tasks(), project_id)})
+
+            # Keyed by read source: figures from a lagging replica must not reach clients reading the primary
+            stats = stats_cache.get_or_compute(('stats', project_id, read_source(db.session)),
+                                               lambda: aggregates.dashboard_stats(project_id))
+            # Overdue counts move with the clock, so the tag comes from the (cached) figures themselves
+            etag = make_etag(sorted(stats.items()))
+            unchanged = not_modified(etag)
+            if unchanged:
+                return unchanged
+            return with_etag(jsonify({'success': True, 'stats': stats}), etag)
         except Exception as e:
             return jsonify({'success': False, 'error': str(e)}), 500
 
+    @app.route('/api/stats/cache', methods=['GET'])
+    def get_stats_cache():
+        """Hit/miss counters for the dashboard statistics cache"""
+        return jsonify({'success': True, 'cache': stats_cache.stats()})
+
     
 
+    # Server-side analytics aggregates
+    def _analytics_days(default=30):
+        days = request.args.get('days', default, type=int)
+        return max(1, min(days or default, 366))
+
+    @app.route('/api/analytics/completions', methods=['GET'])
+    def get_completion_series():
+        """Completed tasks per day or week"""
+        try:
+            interval = request.args.get('interval', 'day')
+            if interval not in aggregates.BUCKETS:
+                return jsonify({'success': False, 'error': f"Unknown interval: {interval}"}), 400
+            days = _analytics_days()
+            project_id = request.args.get('project_id', type=int)
+            if skip_db:
+                series = aggregates.dev_completion_series(_get_dev_tasks(), interval, days, project_id)
+            else:
+                series = aggregates.completion_series(interval, days, project_id)
+            return jsonify({'success': True, 'interval': interval, 'days': days, 'series': series})
+        except Exception as e:
+            return jsonify({'success': False, 'error': str(e)}), 500
+
+    @app.route('/api/analytics/distribution', methods=['GET'])
+    def get_task_distribution():
+        """Task counts by status and by priority"""
+        try:
+            project_id = request.args.get('project_id', type=int)
+            if skip_db:
+                data = aggregates.dev_distribution(_get_dev_tasks(), project_id)
+            else:
+                data = aggregates.distribution(project_id)
+            return jsonify({'success': True, **data})
+        except Exception as e:
+            return jsonify({'success': False, 'error': str(e)}), 500
+
+    @app.route('/api/analytics/projects', methods=['GET'])
+    def get_project_throughput():
+        """Per-project task totals, completions and average cycle time"""
+        try:
+            days = _analytics_days()
+            if skip_db:
+                projects = aggregates.dev_project_throughput(_get_dev_tasks(), _get_dev_projects(), days)
+            else:
+                projects = aggregates.project_throughput(days)
+            return jsonify({'success': True, 'days': days, 'projects': projects})
+        except Exception as e:
+            return jsonify({'success': False, 'error': str(e)}), 500
+
+    @app.route('/api/analytics/cycle-time', methods=['GET'])
+    def get_cycle_time():
+        """Average hours from creation to completion"""
+        try:
+            days = request.args.get('days', type=int)
+            project_id = request.args.get('project_id', type=int)
+            if skip_db:
+                data = aggregates.dev_cycle_time(_get_dev_tasks(), project_id, days)
+            else:
+                data = aggregates.cycle_time(project_id, days)
+            return jsonify({'success': True, **data})
+        except Exception as e:
+            return jsonify({'success': False, 'error': str(e)}), 500
+
+    @app.route('/api/analytics/snapshots', methods=['GET'])
+    def get_progress_snapshots():
+        """Materialized daily progress per project (see snapshots.py)"""
+        try:
+            if skip_db:
+                return jsonify({'success': True, 'snapshots': []})
+            days = _analytics_days()
+            project_id = request.args.get('project_id', type=int)
+            return jsonify({'success': True, 'days': days, 'snapshots': snapshot_series(project_id, days)})
+        except Exception as e:
+            return jsonify({'success': False, 'error': str(e)}), 500
+
     # Recent tasks for dashboard
     @app.route('/api/tasks/recent', methods=['GET'])
     def get_recent_tasks():
         """Get recent tasks for dashboard"""
+        try:
+            fields = _requested_task_fields()
+        except ValueError as e:
+            return jsonify({'success': False, 'error': str(e)}), 400
         try:
             limit = request.args.get('limit', 6, type=int)
             if skip_db:
@@ -644,40 +877,82 @@ def register_routes(app):
                     tasks_sorted = sorted(tasks, key=lambda x: x.get('updated_at') or '', reverse=True)
                 except Exception:
                     tasks_sorted = tasks
-                return jsonify({'success': True, 'tasks': tasks_sorted[:limit]})
+                return jsonify({'success': True, 'tasks': [_select_dev_fields(t, fields) for t in tasks_sorted[:limit]]})
 
-            tasks = Task.query.order_by(Task.updated_at.desc()).limit(limit).all()
-            return jsonify({'success': True, 'tasks': [task.to_dict() for task in tasks]})
+            tasks = load_tasks(Task.query.order_by(Task.updated_at.desc()).limit(limit), fields)
+            return jsonify({'success': True, 'tasks': serialize_tasks(tasks, fields)})
         except Exception as e:
             return jsonify({'success': False, 'error': str(e)}), 500
 
-    # Simple notifications API (stored in session for demo)
+    # Notifications API: rows in the notifications table (the dev store in SKIP_DB mode)
+    def _notification_user():
+        """Current user id for notification queries; drops the list older versions kept in the cookie"""
+        if 'notifications' in session:
+            session.pop('notifications')
+        return session.get('user_id')
+
+    def _dev_notifications_matching(data):
+        """Dev-mode counterpart of notifications.parse_ids(): (all notifications, predicate)"""
+        ids = parse_notification_ids(data)
+        notifs = dev_store.list_notifications()
+        return notifs, (lambda n: True) if ids is None else (lambda n: n.get('id') in ids)
+
     @app.route('/api/notifications', methods=['GET'])
     def get_notifications():
+        """Newest-first page of notifications (?limit=&cursor=, ?unread=1 for unread only)"""
+        try:
+            limit = parse_page_size(request.args.get('limit'))
+        except ValueError as e:
+            return jsonify({'success': False, 'error': str(e)}), 400
+        cursor = request.args.get('cursor')
+        unread_only = request.args.get('unread') in ('1', 'true')
         try:
-            notifs = session.get('notifications')
-            if notifs is None:
-                # Initialize empty notifications list for new sessions
-                notifs = []
-                session['notifications'] = notifs
-            return jsonify({'success': True, 'notifications': notifs})
+            if skip_db:
+                notifs = dev_store.list_notifications()
+                visible = [n for n in notifs if not (unread_only and n.get('read'))]
+                page, next_cursor = keyset_page_list(visible, 'time', 'notifications', cursor, limit)
+                unread = sum(1 for n in notifs if not n.get('read'))
+                return jsonify({'success': True, 'notifications': page, 'next_cursor': next_cursor, 'unread': unread})
+            user_id = _notification_user()
+            notifs, next_cursor = keyset_page(user_notifications(user_id, unread_only), Notification.created_at,
+                                              Notification.id, 'notifications', cursor, limit)
+            return jsonify({'success': True, 'notifications': [n.to_dict() for n in notifs],
+                            'next_cursor': next_cursor, 'unread': notification_unread_count(user_id)})
+        except InvalidCursor as e:
+            return jsonify({'success': False, 'error': str(e)}), 400
+        except Exception as e:
+            return jsonify({'success': False, 'error': str(e)}), 500
+
+    @app.route('/api/notifications/unread_count', methods=['GET'])
+    def get_unread_notification_count():
+        """Badge count; the cheap call pages poll (or make when the change feed says so)"""
+        try:
+            if skip_db:
+                count = sum(1 for n in dev_store.list_notifications() if not n.get('read'))
+            else:
+                count = notification_unread_count(_notification_user())
+            return jsonify({'success': True, 'unread': count})
         except Exception as e:
             return jsonify({'success': False, 'error': str(e)}), 500
 
     @app.route('/api/notifications/mark_read', methods=['POST'])
     def mark_notification_read():
+        """Mark notifications read: {"id": 1}, {"ids": [1, 2]} or {"all": true}"""
         try:
             data = request.get_json() or {}
-            nid = data.get('id')
-            if not nid:
-                return jsonify({'success': False, 'error': 'id required'}), 400
-            notifs = session.get('notifications', [])
-            for n in notifs:
-                if n.get('id') == nid:
-                    n['read'] = True
-            session['notifications'] = notifs
-            return jsonify({'success': True})
+            if skip_db:
+                notifs, matches = _dev_notifications_matching(data)
+                changed = [dict(n, read=True) for n in notifs if matches(n) and not n.get('read')]
+                dev_store.save_notifications(changed)
+                return jsonify({'success': True, 'updated': len(changed)})
+            changed = mark_notifications_read(_notification_user(), parse_notification_ids(data))
+            db.session.commit()
+            return jsonify({'success': True, 'updated': changed})
+        except ValueError as e:
+            return jsonify({'success': False, 'error': str(e)}), 400
         except Exception as e:
+            if not skip_db:
+                db.session.rollback()
             return jsonify({'success': False, 'error': str(e)}), 500
 
     @app.route('/api/notifications/add', methods=['POST'])
@@ -687,42 +962,39 @@ def register_routes(app):
             title = data.get('title', 'Notification')
             message = data.get('message', '')
             read = data.get('read', False)
-            time = data.get('time', datetime.utcnow().isoformat() + 'Z')
-            
-            notifs = session.get('notifications', [])
-            # Generate new ID
-            new_id = max([n.get('id', 0) for n in notifs], default=0) + 1
-            
-            new_notif = {
-                'id': new_id,
-                'title': title,
-                'message': message,
-                'read': read,
-                'time': time
-            }
             
-            notifs.insert(0, new_notif)  # Add to beginning
-            session['notifications'] = notifs
-            
-            return jsonify({'success': True, 'notification': new_notif})
+            if skip_db:
+                new_notif = dev_store.add_notification(title, message, read, data.get('time'))
+                return jsonify({'success': True, 'notification': new_notif})
+
+            notif = Notification(user_id=_notification_user(), title=title, message=message, read=bool(read))
+            add_notifications([notif])
+            db.session.commit()
+            return jsonify({'success': True, 'notification': notif.to_dict()})
         except Exception as e:
+            if not skip_db:
+                db.session.rollback()
             return jsonify({'success': False, 'error': str(e)}), 500
 
     @app.route('/api/notifications/delete', methods=['POST'])
     def delete_notification():
+        """Delete notifications: {"id": 1}, {"ids": [...]} or {"all": true}, optionally only {"read": true}"""
         try:
             data = request.get_json() or {}
-            nid = data.get('id')
-            if not nid:
-                return jsonify({'success': False, 'error': 'id required'}), 400
-            
-            notifs = session.get('notifications', [])
-            # Remove the notification with matching id
-            notifs = [n for n in notifs if n.get('id') != nid]
-            session['notifications'] = notifs
-            
-            return jsonify({'success': True})
+            read = data.get('read')
+            if skip_db:
+                notifs, matches = _dev_notifications_matching(data)
+                doomed = [n['id'] for n in notifs if matches(n) and (read is None or bool(n.get('read')) == bool(read))]
+                dev_store.remove_notifications(doomed)
+                return jsonify({'success': True, 'deleted': len(doomed)})
+            removed = delete_notifications(_notification_user(), parse_notification_ids(data), read)
+            db.session.commit()
+            return jsonify({'success': True, 'deleted': removed})
+        except ValueError as e:
+            return jsonify({'success': False, 'error': str(e)}), 400
         except Exception as e:
+            if not skip_db:
+                db.session.rollback()
             return jsonify({'success': False, 'error': str(e)}), 500
 
     # ============ SUBTASK ROUTES ============
@@ -732,8 +1004,7 @@ def register_routes(app):
         """Get all subtasks for a task"""
         try:
             if skip_db:
-                # Dev mode - return from session
-                subtasks = session.get(f'subtasks_{task_id}', [])
+                subtasks = dev_store.list_subtasks(task_id)
                 return jsonify({'success': True, 'subtasks': subtasks})
             
             from models import Subtask
@@ -752,30 +1023,9 @@ def register_routes(app):
                 return jsonify({'success': False, 'error': 'Title is required'}), 400
             
             if skip_db:
-                # Dev mode
-                subtasks = session.get(f'subtasks_{task_id}', [])
-                new_id = max([s.get('id', 0) for s in subtasks], default=0) + 1
-                subtask = {
-                    'id': new_id,
-                    'task_id': task_id,
-                    'title': data['title'],
-                    'completed': False,
-                    'order': len(subtasks),
-                    'created_at': datetime.utcnow().isoformat() + 'Z'
-                }
-                subtasks.append(subtask)
-                session[f'subtasks_{task_id}'] = subtasks
-                # record activity
-                now = datetime.utcnow().isoformat() + 'Z'
-                notifs = session.get('activity_log', [])
-                notifs.insert(0, {
-                    'id': len(notifs) + 1,
-                    'event_type': 'subtask_created',
-                    'message': f"Subtask created for task {task_id}: {subtask['title']}",
-                    'task_id': task_id,
-                    'created_at': now
-                })
-                session['activity_log'] = notifs
+                with dev_store.transaction():
+                    subtask = dev_store.create_subtask(task_id, data['title'])
+                    dev_store.record_activity('subtask_created', f"Subtask created for task {task_id}: {subtask['title']}", task_id)
                 return jsonify({'success': True, 'subtask': subtask}), 201
             
             task = Task.query.get_or_404(task_id)
@@ -784,20 +1034,16 @@ def register_routes(app):
             subtask = Subtask()
             subtask.parent_task_id = task_id
             subtask.title = data['title']
-            subtask.order = len(task.subtasks)
+            subtask.order = task.subtask_total
             
             db.session.add(subtask)
-            db.session.commit()
+            # Flushing bumps the task's subtask rollups in this transaction
+            db.session.flush()
             
             # Update task progress based on subtasks
             update_task_progress_from_subtasks(task)
-            # record activity
-            try:
-                act = Activity(event_type='subtask_created', message=f"Subtask created for task {task.id}: {subtask.title}", task_id=task.id)
-                db.session.add(act)
-                db.session.commit()
-            except Exception:
-                db.session.rollback()
+            activity.record('subtask_created', f"Subtask created for task {task.id}: {subtask.title}", task_id=task.id)
+            db.session.commit()
             
             return jsonify({'success': True, 'subtask': subtask.to_dict()}), 201
         except Exception as e:
@@ -810,47 +1056,24 @@ def register_routes(app):
         """Toggle subtask completion status"""
         try:
             if skip_db:
-                # Dev mode
-                for key in session.keys():
-                    if key.startswith('subtasks_'):
-                        subtasks = session[key]
-                        for s in subtasks:
-                            if s.get('id') == subtask_id:
-                                s['completed'] = not s.get('completed', False)
-                                if s['completed']:
-                                    s['completed_at'] = datetime.utcnow().isoformat() + 'Z'
-                                else:
-                                    s['completed_at'] = None
-                                session[key] = subtasks
-                                # record activity
-                                now = datetime.utcnow().isoformat() + 'Z'
-                                notifs = session.get('activity_log', [])
-                                notifs.insert(0, {
-                                    'id': len(notifs) + 1,
-                                    'event_type': 'subtask_toggled',
-                                    'message': f"Subtask toggled for task {s.get('task_id')}: {s.get('title')}",
-                                    'task_id': s.get('task_id'),
-                                    'created_at': now
-                                })
-                                session['activity_log'] = notifs
-                                return jsonify({'success': True, 'subtask': s})
-                return jsonify({'success': False, 'error': 'Subtask not found'}), 404
+                with dev_store.transaction():
+                    subtask = dev_store.toggle_subtask(subtask_id)
+                    if subtask is None:
+                        return jsonify({'success': False, 'error': 'Subtask not found'}), 404
+                    dev_store.record_activity('subtask_toggled', f"Subtask toggled for task {subtask.get('task_id')}: {subtask.get('title')}",
+                                              subtask.get('task_id'))
+                return jsonify({'success': True, 'subtask': subtask})
             
             subtask = Subtask.query.get_or_404(subtask_id)
             subtask.toggle_completed()
-            db.session.commit()
+            db.session.flush()
             
             # Update task progress
             task = Task.query.get(subtask.parent_task_id)
             if task:
                 update_task_progress_from_subtasks(task)
-            # record activity
-            try:
-                act = Activity(event_type='subtask_toggled', message=f"Subtask toggled for task {subtask.parent_task_id}: {subtask.title}", task_id=subtask.parent_task_id)
-                db.session.add(act)
-                db.session.commit()
-            except Exception:
-                db.session.rollback()
+            activity.record('subtask_toggled', f"Subtask toggled for task {subtask.parent_task_id}: {subtask.title}", task_id=subtask.parent_task_id)
+            db.session.commit()
 
             return jsonify({'success': True, 'subtask': subtask.to_dict()})
         except Exception as e:
@@ -863,22 +1086,19 @@ def register_routes(app):
         """Delete a subtask"""
         try:
             if skip_db:
-                # Dev mode
-                for key in session.keys():
-                    if key.startswith('subtasks_'):
-                        subtasks = session[key]
-                        session[key] = [s for s in subtasks if s.get('id') != subtask_id]
+                dev_store.delete_subtask(subtask_id)
                 return jsonify({'success': True})
             
             subtask = Subtask.query.get_or_404(subtask_id)
             task_id = subtask.parent_task_id
             db.session.delete(subtask)
-            db.session.commit()
+            db.session.flush()
             
             # Update task progress
             task = Task.query.get(task_id)
             if task:
                 update_task_progress_from_subtasks(task)
+            db.session.commit()
             
             return jsonify({'success': True})
         except Exception as e:
@@ -887,10 +1107,128 @@ def register_routes(app):
             return jsonify({'success': False, 'error': str(e)}), 500
 
     def update_task_progress_from_subtasks(task):
-        """Update task progress based on completed subtasks"""
+        """Update task progress from the subtask rollups; the caller commits"""
         if not skip_db:
-            subtask_count = len(task.subtasks)
+            subtask_count = task.subtask_total
             if subtask_count > 0:
-                completed_count = sum(1 for s in task.subtasks if s.completed)
-                task.progress = int((completed_count / subtask_count) * 100)
-                db.session.commit()
\ No newline at end of file
+                task.progress = int((task.subtask_completed / subtask_count) * 100)
+
+    # ============ SEARCH ROUTES ============
+
+    @app.route('/api/search', methods=['GET'])
+    def get_search_results():
+        """Ranked full-text search over task titles, descriptions and subtask titles (see search.py)"""
+        try:
+            text = request.args.get('q', '')
+            project_id = request.args.get('project_id', type=int)
+            status = request.args.get('status') or None
+            limit = parse_page_size(request.args.get('limit'), default=SEARCH_PAGE_SIZE)
+            page = parse_page(request.args.get('page'), limit)
+            if skip_db:
+                hits, has_more, limited = dev_search_tasks(_get_dev_tasks(), dev_store.list_subtasks, text,
+                                                           project_id, status, limit, (page - 1) * limit)
+            else:
+                hits, has_more, limited = search_tasks(text, project_id, status, limit, (page - 1) * limit)
+        except ValueError as e:
+            return jsonify({'success': False, 'error': str(e)}), 400
+        except Exception as e:
+            return jsonify({'success': False, 'error': str(e)}), 500
+        # limited: more than SEARCH_WINDOW tasks matched and only the newest of them were ranked
+        return jsonify({'success': True, 'query': text, 'page': page, 'limit': limit,
+                        'next_page': page + 1 if has_more else None,
+                        'ranking': {'window': SEARCH_WINDOW, 'limited': limited}, 'hits': hits})
+
+    # ============ HIERARCHY ROUTES ============
+
+    @app.route('/api/tasks/<int:task_id>/subtree', methods=['GET'])
+    def get_task_subtree(task_id):
+        """A task and its descendants (parent_task_id) with rollups per task, in one query"""
+        try:
+            max_depth = parse_max_depth(request.args.get('max_depth'))
+        except ValueError as e:
+            return jsonify({'success': False, 'error': str(e)}), 400
+        try:
+            tasks = dev_subtree(_get_dev_tasks(), task_id) if skip_db else subtree(task_id, max_depth)
+            if tasks is None:
+                return jsonify({'success': False, 'error': 'Not found'}), 404
+            return jsonify({'success': True, 'max_depth': max_depth, 'rollup': tasks[0]['rollup'], 'tasks': tasks})
+        except Exception as e:
+            return jsonify({'success': False, 'error': str(e)}), 500
+
+    @app.route('/api/tasks/<int:task_id>/ancestors', methods=['GET'])
+    def get_task_ancestors(task_id):
+        """The chain of parent tasks up to the root, parent first"""
+        try:
+            max_depth = parse_max_depth(request.args.get('max_depth'))
+        except ValueError as e:
+            return jsonify({'success': False, 'error': str(e)}), 400
+        try:
+            if skip_db:
+                chain = [] if dev_store.get_task(task_id) else None
+            else:
+                chain = ancestors(task_id, max_depth)
+            if chain is None:
+                return jsonify({'success': False, 'error': 'Not found'}), 404
+            return jsonify({'success': True, 'tasks': chain})
+        except Exception as e:
+            return jsonify({'success': False, 'error': str(e)}), 500
+
+    # ============ DEPENDENCY ROUTES ============
+
+    @app.route('/api/dependencies/graph', methods=['GET'])
+    def get_dependency_graph():
+        """Dependency graph of a project (or of all tasks) with order, blocked tasks and critical path"""
+        try:
+            project_id = request.args.get('project_id', type=int)
+            if skip_db:
+                graph = dev_dependency_graph(_get_dev_tasks(), project_id)
+            else:
+                graph = dependency_graph(project_id)
+            return jsonify({'success': True, 'project_id': project_id, 'graph': graph.to_dict()})
+        except Exception as e:
+            return jsonify({'success': False, 'error': str(e)}), 500
+
+    @app.route('/api/tasks/<int:task_id>/dependencies', methods=['POST'])
+    def add_task_dependency(task_id):
+        """Make a task depend on another one; rejects edges that would close a cycle"""
+        data = request.get_json(silent=True) or {}
+        try:
+            depends_on_id = int(data['depends_on_id'])
+        except (KeyError, TypeError, ValueError):
+            return jsonify({'success': False, 'error': 'depends_on_id is required'}), 400
+        if skip_db:
+            return jsonify({'success': False, 'error': 'Dependencies are not available without a database'}), 400
+        try:
+            # First in the transaction, so it can lock before anything is read (see add_dependency)
+            edge_id = add_dependency(task_id, depends_on_id).id
+            activity.record('dependency_added', f"Task {task_id} now depends on task {depends_on_id}", task_id=task_id)
+            db.session.commit()
+            return jsonify({'success': True, 'dependency': {'id': edge_id, 'task_id': task_id,
+                                                            'depends_on_id': depends_on_id}}), 201
+        except LookupError as e:
+            db.session.rollback()
+            return jsonify({'success': False, 'error': str(e)}), 404
+        except DependencyCycleError as e:
+            db.session.rollback()
+            return jsonify({'success': False, 'error': str(e), 'cycle': e.path}), 409
+        except ValueError as e:
+            db.session.rollback()
+            return jsonify({'success': False, 'error': str(e)}), 409
+        except Exception as e:
+            db.session.rollback()
+            return jsonify({'success': False, 'error': str(e)}), 500
+
+    @app.route('/api/tasks/<int:task_id>/dependencies/<int:depends_on_id>', methods=['DELETE'])
+    def remove_task_dependency(task_id, depends_on_id):
+        """Remove a dependency edge"""
+        if skip_db:
+            return jsonify({'success': False, 'error': 'Not found'}), 404
+        try:
+            if not remove_dependency(task_id, depends_on_id):
+                return jsonify({'success': False, 'error': 'Not found'}), 404
+            activity.record('dependency_removed', f"Task {task_id} no longer depends on task {depends_on_id}", task_id=task_id)
+            db.session.commit()
+            return jsonify({'success': True})
+        except Exception as e:
+            db.session.rollback()
+            return jsonify({'success': False, 'error': str(e)}), 500
@@ -0,0 +1,90 @@
+"""
+Minimal in-process periodic job runner.
+
+A single daemon thread runs each registered job inside an application
+context every `interval` seconds. Jobs are only registered when their
+interval is configured (> 0), and every interval defaults to 0, so a plain
+create_app() (tests, one-off scripts) starts no thread. The same jobs are
+available through the standalone scripts for cron (build_snapshots.py,
+prune_activity.py, purge_idempotency_keys.py).
+"""
+import logging
+import os
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+
+class Scheduler:
+    def __init__(self, app):
+        self.app = app
+        self.jobs = []
+        self._stop = threading.Event()
+        self._thread = None
+
+    def add_job(self, name, func, interval):
+        """Run func() every `interval` seconds; first run after one interval."""
+        self.jobs.append({'name': name, 'func': func, 'interval': interval, 'next_run': time.monotonic() + interval})
+
+    def run_pending(self):
+        now = time.monotonic()
+        for job in self.jobs:
+            if job['next_run'] > now:
+                continue
+            job['next_run'] = now + job['interval']
+            with self.app.app_context():
+                try:
+                    job['func']()
+                except Exception:
+                    logger.exception("Scheduled job %s failed", job['name'])
+                    from config import db
+                    db.session.rollback()
+
+    def _loop(self):
+        while not self._stop.is_set():
+            self.run_pending()
+            next_run = min(job['next_run'] for job in self.jobs)
+            self._stop.wait(max(0.05, next_run - time.monotonic()))
+
+    def start(self):
+        if self._thread is None and self.jobs:
+            self._thread = threading.Thread(target=self._loop, name='taskwise-scheduler', daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+            self._thread = None
+
+
+def init_scheduler(app):
+    """Register configured background jobs and start the scheduler thread."""
+    scheduler = Scheduler(app)
+
+    snapshot_interval = app.config.get('SNAPSHOT_INTERVAL_SECONDS', 0)
+    if snapshot_interval > 0:
+        from snapshots import refresh_snapshots
+        scheduler.add_job('progress_snapshots', refresh_snapshots, snapshot_interval)
+
+    retention_interval = app.config.get('ACTIVITY_RETENTION_INTERVAL_SECONDS', 0)
+    if retention_interval > 0:
+        from retention import retain_activities
+        scheduler.add_job('activity_retention', lambda: retain_activities(app), retention_interval)
+
+    idempotency = app.extensions.get('taskwise_idempotency')
+    purge_interval = app.config.get('IDEMPOTENCY_PURGE_INTERVAL_SECONDS', 0)
+    if idempotency is not None and purge_interval > 0:
+        scheduler.add_job('idempotency_purge', idempotency.purge_expired, purge_interval)
+
+    due_interval = app.config.get('DUE_NOTIFY_INTERVAL_SECONDS', 0)
+    if due_interval > 0 and os.getenv('SKIP_DB') != '1':
+        from datetime import timedelta
+        from due_notifications import scan_due_tasks
+        lookback = timedelta(hours=app.config.get('DUE_NOTIFY_LOOKBACK_HOURS', 24))
+        scheduler.add_job('due_notifications', lambda: scan_due_tasks(lookback=lookback), due_interval)
+
+    app.extensions['taskwise_scheduler'] = scheduler
+    scheduler.start()
+    return scheduler
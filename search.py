@@ -0,0 +1,322 @@
+"""
+Full-text search over task titles, descriptions and subtask titles (/api/search).
+
+Both backends index the same document per task: its title, its description
+and the titles of its subtasks. A task matches when every word of the query
+occurs somewhere in that document; the last word also matches as a prefix,
+so results appear while typing.
+
+* SQLite: task_search is an FTS5 table (rowid = task id) ranked with a
+  column-weighted bm25().
+* MySQL: task_search is an InnoDB table (task_id) with FULLTEXT indexes,
+  ranked by MATCH ... AGAINST in boolean mode with a boost for title hits.
+  Words shorter than innodb_ft_min_token_size (3 by default) are not indexed.
+
+Triggers on tasks and subtasks keep task_search in step inside the writing
+transaction, so ORM flushes, bulk statements (batch.py) and raw SQL are all
+covered. Both are created with the tables (db.create_all());
+build_search_index.py adds them to an existing database and refills them.
+
+Ranking window: computing the score of every match of a word found in half
+of a million tasks takes seconds, so both backends rank only the newest
+SEARCH_WINDOW matching tasks (after the project/status filters). Queries with
+fewer matches are ranked in full; when the window was full, the response says
+so ('ranking': {'limited': true}) and a more specific query ranks everything.
+"""
+import re
+
+from sqlalchemy import DDL, column, event, func, literal_column, select, table
+from sqlalchemy.dialects.mysql import match
+
+from config import db
+from models import Task, Subtask, TaskStatus
+
+SEARCH_TABLE = 'task_search'
+
+# bm25() weights of the title, description and subtasks columns (SQLite)
+SEARCH_WEIGHTS = (10.0, 2.0, 4.0)
+# Extra weight of a title MATCH on top of the whole document's (MySQL)
+MYSQL_TITLE_BOOST = 2.0
+
+MAX_QUERY_TERMS = 16
+
+SEARCH_PAGE_SIZE = 20
+
+# Only the newest SEARCH_WINDOW matching tasks are ranked; it must cover
+# every page that can be requested (MAX_SEARCH_OFFSET plus the largest page)
+SEARCH_WINDOW = 2000
+MAX_SEARCH_OFFSET = 1000
+
+# Fields of each hit: the 'compact' task view plus project and score
+HIT_FIELDS = ('id', 'title', 'status', 'priority', 'due_date', 'card_color', 'project_id')
+
+_WORD_RE = re.compile(r'\w+', re.UNICODE)
+
+_SQLITE_SUBTASK_TITLES = "COALESCE((SELECT group_concat(title, ' ') FROM subtasks WHERE parent_task_id = {task}), '')"
+# GROUP_CONCAT is cut at group_concat_max_len (1024 bytes by default)
+_MYSQL_SUBTASK_TITLES = ("COALESCE((SELECT GROUP_CONCAT(title SEPARATOR ' ') FROM subtasks "
+                         "WHERE parent_task_id = {task}), '')")
+
+# The prefix indexes answer 2-4 letter prefixes (the last word while typing)
+# from one entry instead of merging every term that starts with them
+SQLITE_SEARCH_DDL = (
+    f"CREATE VIRTUAL TABLE IF NOT EXISTS {SEARCH_TABLE} "
+    "USING fts5(title, description, subtasks, tokenize = 'unicode61 remove_diacritics 2', prefix = '2 3 4')",
+    f"""CREATE TRIGGER IF NOT EXISTS tw_search_task_insert AFTER INSERT ON tasks BEGIN
+        INSERT INTO {SEARCH_TABLE} (rowid, title, description, subtasks)
+        VALUES (NEW.id, NEW.title, COALESCE(NEW.description, ''), {_SQLITE_SUBTASK_TITLES.format(task='NEW.id')});
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS tw_search_task_update AFTER UPDATE OF title, description ON tasks BEGIN
+        UPDATE {SEARCH_TABLE} SET title = NEW.title, description = COALESCE(NEW.description, '')
+        WHERE rowid = NEW.id;
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS tw_search_task_delete AFTER DELETE ON tasks BEGIN
+        DELETE FROM {SEARCH_TABLE} WHERE rowid = OLD.id;
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS tw_search_subtask_insert AFTER INSERT ON subtasks BEGIN
+        UPDATE {SEARCH_TABLE} SET subtasks = {_SQLITE_SUBTASK_TITLES.format(task='NEW.parent_task_id')}
+        WHERE rowid = NEW.parent_task_id;
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS tw_search_subtask_update AFTER UPDATE OF title, parent_task_id ON subtasks BEGIN
+        UPDATE {SEARCH_TABLE} SET subtasks = {_SQLITE_SUBTASK_TITLES.format(task='OLD.parent_task_id')}
+        WHERE rowid = OLD.parent_task_id;
+        UPDATE {SEARCH_TABLE} SET subtasks = {_SQLITE_SUBTASK_TITLES.format(task='NEW.parent_task_id')}
+        WHERE rowid = NEW.parent_task_id;
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS tw_search_subtask_delete AFTER DELETE ON subtasks BEGIN
+        UPDATE {SEARCH_TABLE} SET subtasks = {_SQLITE_SUBTASK_TITLES.format(task='OLD.parent_task_id')}
+        WHERE rowid = OLD.parent_task_id;
+    END""",
+)
+
+MYSQL_SEARCH_TABLE_DDL = f"""CREATE TABLE IF NOT EXISTS {SEARCH_TABLE} (
+    task_id INTEGER NOT NULL PRIMARY KEY,
+    title VARCHAR(200) NOT NULL,
+    description TEXT NOT NULL,
+    subtasks TEXT NOT NULL,
+    FULLTEXT INDEX ft_task_search (title, description, subtasks),
+    FULLTEXT INDEX ft_task_search_title (title)
+) ENGINE=InnoDB"""
+
+# MySQL has no CREATE TRIGGER IF NOT EXISTS before 8.0.29, so triggers are keyed by name
+MYSQL_SEARCH_TRIGGERS = {
+    'tw_search_task_insert': f"""CREATE TRIGGER tw_search_task_insert AFTER INSERT ON tasks FOR EACH ROW
+        INSERT INTO {SEARCH_TABLE} (task_id, title, description, subtasks)
+        VALUES (NEW.id, NEW.title, COALESCE(NEW.description, ''), {_MYSQL_SUBTASK_TITLES.format(task='NEW.id')})""",
+    'tw_search_task_update': f"""CREATE TRIGGER tw_search_task_update AFTER UPDATE ON tasks FOR EACH ROW
+        UPDATE {SEARCH_TABLE} SET title = NEW.title, description = COALESCE(NEW.description, '')
+        WHERE task_id = NEW.id AND NOT (NEW.title <=> OLD.title AND NEW.description <=> OLD.description)""",
+    'tw_search_task_delete': f"""CREATE TRIGGER tw_search_task_delete AFTER DELETE ON tasks FOR EACH ROW
+        DELETE FROM {SEARCH_TABLE} WHERE task_id = OLD.id""",
+    'tw_search_subtask_insert': f"""CREATE TRIGGER tw_search_subtask_insert AFTER INSERT ON subtasks FOR EACH ROW
+        UPDATE {SEARCH_TABLE} SET subtasks = {_MYSQL_SUBTASK_TITLES.format(task='NEW.parent_task_id')}
+        WHERE task_id = NEW.parent_task_id""",
+    'tw_search_subtask_update': f"""CREATE TRIGGER tw_search_subtask_update AFTER UPDATE ON subtasks FOR EACH ROW
+    BEGIN
+        IF NOT (NEW.title <=> OLD.title AND NEW.parent_task_id <=> OLD.parent_task_id) THEN
+            UPDATE {SEARCH_TABLE} SET subtasks = {_MYSQL_SUBTASK_TITLES.format(task='OLD.parent_task_id')}
+            WHERE task_id = OLD.parent_task_id;
+            UPDATE {SEARCH_TABLE} SET subtasks = {_MYSQL_SUBTASK_TITLES.format(task='NEW.parent_task_id')}
+            WHERE task_id = NEW.parent_task_id;
+        END IF;
+    END""",
+    'tw_search_subtask_delete': f"""CREATE TRIGGER tw_search_subtask_delete AFTER DELETE ON subtasks FOR EACH ROW
+        UPDATE {SEARCH_TABLE} SET subtasks = {_MYSQL_SUBTASK_TITLES.format(task='OLD.parent_task_id')}
+        WHERE task_id = OLD.parent_task_id""",
+}
+
+# Refill the index from the tables (build_search_index.py)
+SEARCH_REBUILD = {
+    'sqlite': (
+        f"DELETE FROM {SEARCH_TABLE}",
+        f"""INSERT INTO {SEARCH_TABLE} (rowid, title, description, subtasks)
+            SELECT id, title, COALESCE(description, ''), {_SQLITE_SUBTASK_TITLES.format(task='tasks.id')}
+            FROM tasks""",
+    ),
+    'mysql': (
+        f"DELETE FROM {SEARCH_TABLE}",
+        f"""INSERT INTO {SEARCH_TABLE} (task_id, title, description, subtasks)
+            SELECT id, title, COALESCE(description, ''), {_MYSQL_SUBTASK_TITLES.format(task='tasks.id')}
+            FROM tasks""",
+    ),
+}
+
+# Subtasks are created after tasks, so both tables exist for the triggers
+for _statement in SQLITE_SEARCH_DDL:
+    event.listen(Subtask.__table__, 'after_create', DDL(_statement).execute_if(dialect='sqlite'))
+for _statement in (MYSQL_SEARCH_TABLE_DDL, *MYSQL_SEARCH_TRIGGERS.values()):
+    event.listen(Subtask.__table__, 'after_create', DDL(_statement).execute_if(dialect='mysql'))
+# task_search is not part of the metadata, so drop_all() would leave it behind
+for _dialect in ('sqlite', 'mysql'):
+    event.listen(Task.__table__, 'after_drop', DDL(f"DROP TABLE IF EXISTS {SEARCH_TABLE}").execute_if(dialect=_dialect))
+
+
+def query_terms(text):
+    """Lower-cased words of a search string (at most MAX_QUERY_TERMS)"""
+    return _WORD_RE.findall((text or '').lower())[:MAX_QUERY_TERMS]
+
+
+def parse_page(value, limit=SEARCH_PAGE_SIZE):
+    """1-based ``?page=`` argument; pages starting past MAX_SEARCH_OFFSET hits are refused"""
+    if value in (None, ''):
+        return 1
+    try:
+        page = int(value)
+    except (TypeError, ValueError) as e:
+        raise ValueError('page must be an integer') from e
+    if page < 1:
+        raise ValueError('page must be at least 1')
+    if (page - 1) * limit >= MAX_SEARCH_OFFSET:
+        raise ValueError(f"Only the first {MAX_SEARCH_OFFSET} hits can be paged through; refine the search")
+    return page
+
+
+def fts5_query(terms):
+    """FTS5 MATCH expression: every term quoted, the last one also as a prefix"""
+    quoted = [f'"{term}"' for term in terms]
+    quoted[-1] += '*'
+    return ' '.join(quoted)
+
+
+def boolean_query(terms):
+    """MySQL boolean-mode expression with the same meaning as fts5_query()"""
+    required = [f'+{term}' for term in terms]
+    required[-1] += '*'
+    return ' '.join(required)
+
+
+def _ranked_window(task_key, score, matches, project_id, status):
+    """Rank the newest SEARCH_WINDOW tasks satisfying matches (and the filters) by score.
+
+    Both engines walk their full-text matches by task id, newest first, and
+    stop once the window is full, so scores are computed for at most
+    SEARCH_WINDOW rows however common a word is.
+    """
+    tasks = Task.__table__
+    window = select(*(tasks.c[name] for name in HIT_FIELDS), score.label('score')) \
+        .select_from(task_key.table) \
+        .join(tasks, tasks.c.id == task_key) \
+        .where(matches)
+    if project_id is not None:
+        window = window.where(tasks.c.project_id == project_id)
+    if status is not None:
+        window = window.where(tasks.c.status == status)
+    window = window.order_by(task_key.desc()).limit(SEARCH_WINDOW).subquery('matches')
+    return (
+        select(*(window.c[name] for name in HIT_FIELDS), window.c.score,
+               func.count().over().label('ranked'))
+        .order_by(window.c.score.desc(), window.c.id)
+    )
+
+
+def _sqlite_search(terms, project_id, status):
+    fts = table(SEARCH_TABLE, column('rowid'))
+    # bm25() is lower for better matches
+    score = -func.bm25(literal_column(SEARCH_TABLE), *SEARCH_WEIGHTS)
+    matches = literal_column(SEARCH_TABLE).op('MATCH')(fts5_query(terms))
+    return _ranked_window(fts.c.rowid, score, matches, project_id, status)
+
+
+def _mysql_search(terms, project_id, status):
+    documents = table(SEARCH_TABLE, column('task_id'), column('title'), column('description'), column('subtasks'))
+    expression = boolean_query(terms)
+    document = match(documents.c.title, documents.c.description, documents.c.subtasks,
+                     against=expression).in_boolean_mode()
+    title = match(documents.c.title, against=expression).in_boolean_mode()
+    return _ranked_window(documents.c.task_id, document + MYSQL_TITLE_BOOST * title, document, project_id, status)
+
+
+def _hit(row):
+    data = {name: getattr(row, name) for name in HIT_FIELDS}
+    for name in ('status', 'priority'):
+        data[name] = data[name].value if data[name] else None
+    data['due_date'] = data['due_date'].isoformat() if data['due_date'] else None
+    data['score'] = round(float(row.score or 0), 6)
+    return data
+
+
+def search_tasks(text, project_id=None, status=None, limit=SEARCH_PAGE_SIZE, offset=0):
+    """Search tasks; raises ValueError for an empty search string or an unknown status.
+
+    Returns (hits best first, whether more follow, whether the ranking window
+    was full, i.e. only the newest SEARCH_WINDOW matches were ranked).
+    """
+    terms = query_terms(text)
+    if not terms:
+        raise ValueError('q must contain at least one word')
+    if status is not None:
+        status = TaskStatus(status)
+    dialect = db.session.get_bind().dialect.name
+    if dialect == 'sqlite':
+        stmt = _sqlite_search(terms, project_id, status)
+    elif dialect == 'mysql':
+        stmt = _mysql_search(terms, project_id, status)
+    else:
+        raise RuntimeError(f"Full-text search is not available on {dialect}")
+    rows = db.session.execute(stmt.limit(limit + 1).offset(offset)).all()
+    limited = bool(rows) and rows[0].ranked >= SEARCH_WINDOW
+    return [_hit(row) for row in rows[:limit]], len(rows) > limit, limited
+
+
+def _dev_matches(terms, words):
+    """How many terms occur among words, the last one as a prefix"""
+    found = sum(1 for term in terms[:-1] if term in words)
+    return found + any(word.startswith(terms[-1]) for word in words)
+
+
+def dev_search_tasks(tasks, subtasks_for, text, project_id=None, status=None, limit=SEARCH_PAGE_SIZE, offset=0):
+    """SKIP_DB counterpart of search_tasks(): every term must occur in the task's text (the last as a prefix)"""
+    terms = query_terms(text)
+    if not terms:
+        raise ValueError('q must contain at least one word')
+    if status is not None:
+        TaskStatus(status)
+    hits = []
+    for task in tasks:
+        if project_id is not None and str(task.get('project_id')) != str(project_id):
+            continue
+        if status is not None and task.get('status') != status:
+            continue
+        words = query_terms(' '.join([task.get('title') or '', task.get('description') or '',
+                                      *(s.get('title') or '' for s in subtasks_for(task['id']))]))
+        if _dev_matches(terms, words) == len(terms):
+            hit = {name: task.get(name) for name in HIT_FIELDS}
+            # Terms found in the title stand in for the bm25() title weight
+            hit['score'] = float(_dev_matches(terms, query_terms(task.get('title'))))
+            hits.append(hit)
+    hits.sort(key=lambda hit: (-hit['score'], hit['id']))
+    page = hits[offset:offset + limit + 1]
+    return page[:limit], len(page) > limit, False
+
+
+def ensure_search_index(rebuild=False):
+    """Create the search index objects missing from an existing database; optionally refill the index.
+
+    Returns a list of what was done. The caller commits.
+    """
+    connection = db.session.connection()
+    dialect = connection.dialect.name
+    if dialect not in SEARCH_REBUILD:
+        raise RuntimeError(f"Full-text search is not available on {dialect}")
+    exists = db.inspect(connection).has_table(SEARCH_TABLE)
+    done = []
+    if dialect == 'sqlite':
+        for statement in SQLITE_SEARCH_DDL:
+            connection.exec_driver_sql(statement)
+        if not exists:
+            done.append(f"created {SEARCH_TABLE} and its triggers")
+    else:
+        connection.exec_driver_sql(MYSQL_SEARCH_TABLE_DDL)
+        if not exists:
+            done.append(f"created {SEARCH_TABLE}")
+        present = set(connection.exec_driver_sql(
+            "SELECT TRIGGER_NAME FROM information_schema.TRIGGERS WHERE TRIGGER_SCHEMA = DATABASE()").scalars())
+        for name, statement in MYSQL_SEARCH_TRIGGERS.items():
+            if name not in present:
+                connection.exec_driver_sql(statement)
+                done.append(f"created trigger {name}")
+    if rebuild or not exists:
+        for statement in SEARCH_REBUILD[dialect]:
+            connection.exec_driver_sql(statement)
+        done.append(f"indexed {connection.exec_driver_sql(f'SELECT count(*) FROM {SEARCH_TABLE}').scalar()} task(s)")
+    return done
@@ -0,0 +1,265 @@
+"""
+Materializes ProgressSnapshot rows: one per project per day.
+
+Each row holds the cumulative state of a project at the end of that day
+(tasks created so far, tasks completed so far, time tracked so far). A range
+of days is rebuilt from three grouped queries (tasks created per day, tasks
+completed per day, seconds tracked per day) plus the same three as a
+baseline before the range, then accumulated in Python.
+
+refresh_snapshots() is incremental: it finds the earliest day touched by
+changes since the previous run's watermark and rebuilds from there to today.
+Changes are tracked by write time: every flush that inserts, edits or
+deletes a task or time entry notes the earliest day it affects, old values
+included (a back-dated entry, an entry moved or deleted, a task taken out of
+completed); bulk statements note theirs through note_task_changes(). Just
+before the transaction commits, that day's SnapshotChange row (one per day)
+gets the current time. backfill_snapshots() rebuilds an arbitrary range in
+batches of days, committing after each batch.
+"""
+from datetime import date, datetime, timedelta
+
+from sqlalchemy import event, func, insert, inspect, update
+from sqlalchemy.orm import Session
+
+from config import db
+from models import Task, Project, TimeEntry, ProgressSnapshot, SnapshotRun, SnapshotChange, TaskStatus
+from models.sqlfuncs import day_bucket, interval_seconds
+
+DEFAULT_BATCH_DAYS = 31
+
+# session.info key: earliest day the session's transaction changed
+_PENDING_DAY = 'snapshot_changed_day'
+
+# Change rows this much older than the last run's watermark are pruned (a
+# write flushed just before a run may commit just after it)
+CHANGE_RETENTION = timedelta(days=1)
+
+# Per model: attributes whose change moves the snapshots, and the day columns they are counted on
+_TRACKED = {
+    Task: (('created_at', 'completed_at', 'status', 'project_id'), ('created_at', 'completed_at')),
+    TimeEntry: (('start_time', 'duration', 'task_id'), ('start_time',)),
+}
+
+
+def _as_date(value):
+    if value is None or isinstance(value, date) and not isinstance(value, datetime):
+        return value
+    if isinstance(value, datetime):
+        return value.date()
+    return date.fromisoformat(str(value)[:10])
+
+
+def _daily_counts(value, column, start_day, end_day, *criteria, join=None):
+    """Aggregate `value` per project bucketed by the day of `column`.
+
+    Returns ({(project_id, day): value} inside the range, {project_id: value} before it).
+    """
+    start = datetime.combine(start_day, datetime.min.time())
+    end = datetime.combine(end_day + timedelta(days=1), datetime.min.time())
+    bucket = day_bucket(column)
+
+    def query(*group):
+        q = db.session.query(Task.project_id, *group, value)
+        if join is not None:
+            q = q.join(*join)
+        return q.filter(column.isnot(None), *criteria)
+
+    in_range = {
+        (project_id, _as_date(day)): amount or 0
+        for project_id, day, amount in query(bucket)
+        .filter(column >= start, column < end)
+        .group_by(Task.project_id, bucket)
+    }
+    before = {
+        project_id: amount or 0
+        for project_id, amount in query().filter(column < start).group_by(Task.project_id)
+    }
+    return in_range, before
+
+
+def _series(start_day, end_day):
+    """Daily per-project metrics for the range, as {project_id: [(day, created, completed, seconds)]}"""
+    created, created_before = _daily_counts(
+        func.count(Task.id), Task.created_at, start_day, end_day)
+    completed, completed_before = _daily_counts(
+        func.count(Task.id), Task.completed_at, start_day, end_day,
+        Task.status == TaskStatus.COMPLETED)
+    tracked, tracked_before = _daily_counts(
+        func.sum(interval_seconds(TimeEntry.duration)), TimeEntry.start_time, start_day, end_day,
+        join=(TimeEntry, TimeEntry.task_id == Task.id))
+
+    project_ids = {p for (p,) in db.session.query(Project.id)}
+    project_ids.update(created_before)
+    project_ids.update(p for p, _ in created)
+
+    series = {}
+    for project_id in project_ids:
+        total = created_before.get(project_id, 0)
+        done = completed_before.get(project_id, 0)
+        seconds = tracked_before.get(project_id, 0.0)
+        rows = []
+        day = start_day
+        while day <= end_day:
+            total += created.get((project_id, day), 0)
+            done += completed.get((project_id, day), 0)
+            seconds += tracked.get((project_id, day), 0.0)
+            rows.append((day, total, done, seconds))
+            day += timedelta(days=1)
+        series[project_id] = rows
+    return series
+
+
+def build_snapshots(start_day, end_day):
+    """Replace the snapshots for every project between two days (inclusive).
+
+    Returns the number of rows written. The caller commits.
+    """
+    series = _series(start_day, end_day)
+    db.session.query(ProgressSnapshot).filter(
+        ProgressSnapshot.date >= start_day, ProgressSnapshot.date <= end_day
+    ).delete(synchronize_session=False)
+    rows = [
+        {
+            'date': day,
+            'project_id': project_id,
+            'total_tasks': total,
+            'completed_tasks': done,
+            'total_time_spent': timedelta(seconds=seconds),
+            'completion_rate': round(done / total * 100, 1) if total else 0.0,
+        }
+        for project_id, days in series.items()
+        for day, total, done, seconds in days
+    ]
+    if rows:
+        db.session.execute(ProgressSnapshot.__table__.insert(), rows)
+    return len(rows)
+
+
+def backfill_snapshots(start_day, end_day=None, batch_days=DEFAULT_BATCH_DAYS, watermark=None):
+    """Rebuild snapshots for a range in batches, committing after each batch"""
+    end_day = end_day or datetime.utcnow().date()
+    run = SnapshotRun(watermark=watermark or datetime.utcnow(), first_day=start_day, last_day=end_day, rows_written=0)
+    db.session.add(run)
+    db.session.commit()
+    batch_start = start_day
+    while batch_start <= end_day:
+        batch_end = min(batch_start + timedelta(days=batch_days - 1), end_day)
+        run.rows_written += build_snapshots(batch_start, batch_end)
+        db.session.commit()
+        batch_start = batch_end + timedelta(days=1)
+    run.finished_at = datetime.utcnow()
+    db.session.commit()
+    return run
+
+
+def _touched_days(obj, changed_only):
+    """Days obj counts on, before and after the pending change; [] if nothing tracked changed"""
+    watched, day_columns = _TRACKED[type(obj)]
+    state = inspect(obj)
+    if changed_only and not any(state.attrs[name].history.has_changes() for name in watched):
+        return []
+    values = []
+    for name in day_columns:
+        history = state.attrs[name].history
+        values.extend(history.deleted)
+        values.append(getattr(obj, name))
+    return [_as_date(value) for value in values if value is not None]
+
+
+def _note_day(session, days):
+    days = [day for day in days if day is not None]
+    # The day of the write itself is rebuilt by the next refresh anyway
+    if days and min(days) < datetime.utcnow().date():
+        pending = session.info.get(_PENDING_DAY)
+        session.info[_PENDING_DAY] = min(days) if pending is None else min(pending, *days)
+
+
+@event.listens_for(Session, 'before_flush')
+def _note_snapshot_changes(session, flush_context, instances):
+    days = []
+    for objects, changed_only in ((session.new, False), (session.dirty, True), (session.deleted, False)):
+        days.extend(day for obj in objects if type(obj) in _TRACKED for day in _touched_days(obj, changed_only))
+    _note_day(session, days)
+
+
+def note_task_changes(task_ids):
+    """Note the days a bulk update or delete of these tasks (and their time entries) is about to change"""
+    if not task_ids:
+        return
+    earliest = [
+        db.session.query(func.min(Task.created_at)).filter(Task.id.in_(task_ids)).scalar(),
+        db.session.query(func.min(TimeEntry.start_time)).filter(TimeEntry.task_id.in_(task_ids)).scalar(),
+    ]
+    _note_day(db.session, [_as_date(value) for value in earliest])
+
+
+@event.listens_for(Session, 'before_commit')
+def _record_snapshot_change(session):
+    session.flush()
+    day = session.info.pop(_PENDING_DAY, None)
+    if day is None:
+        return
+    # Last in the transaction, like the version bump, so the day's row is locked only until the commit
+    table = SnapshotChange.__table__
+    connection = session.connection()
+    now = datetime.utcnow()
+    if not connection.execute(update(table).where(table.c.day == day).values(recorded_at=now)).rowcount:
+        connection.execute(
+            insert(table).prefix_with('OR IGNORE', dialect='sqlite').prefix_with('IGNORE', dialect='mysql')
+            .values(day=day, recorded_at=now)
+        )
+
+
+@event.listens_for(Session, 'after_rollback')
+def _forget_rolled_back(session):
+    session.info.pop(_PENDING_DAY, None)
+
+
+def _earliest_touched_day(since):
+    """First day whose cumulative state changed after `since`, or None"""
+    candidates = []
+    recorded = db.session.query(func.min(SnapshotChange.day)).filter(SnapshotChange.recorded_at > since).scalar()
+    if recorded is not None:
+        candidates.append(datetime.combine(_as_date(recorded), datetime.min.time()))
+    task_row = (
+        db.session.query(func.min(Task.created_at), func.min(Task.completed_at))
+        .filter(Task.updated_at > since)
+        .one()
+    )
+    candidates.extend(value for value in task_row if value is not None)
+    return min(candidates).date() if candidates else None
+
+
+def refresh_snapshots(batch_days=DEFAULT_BATCH_DAYS):
+    """Incrementally bring snapshots up to date; backfills everything on the first run"""
+    now = datetime.utcnow()
+    today = now.date()
+    last = (
+        SnapshotRun.query.filter(SnapshotRun.finished_at.isnot(None))
+        .order_by(SnapshotRun.watermark.desc())
+        .first()
+    )
+    if last is None:
+        first = db.session.query(func.min(Task.created_at)).scalar()
+        start_day = first.date() if first else today
+    else:
+        touched = _earliest_touched_day(last.watermark)
+        # Today's row always moves forward, and so does the last run's day (writes made after it that
+        # only touched that same day are not recorded); earlier days only if something touched them
+        start_day = min(last.last_day + timedelta(days=1), last.watermark.date(), today)
+        if touched:
+            start_day = min(touched, start_day)
+        db.session.query(SnapshotChange).filter(
+            SnapshotChange.recorded_at < last.watermark - CHANGE_RETENTION
+        ).delete(synchronize_session=False)
+    return backfill_snapshots(start_day, today, batch_days, watermark=now)
+
+
+def snapshot_series(project_id=None, days=30):
+    """Stored snapshots for the last `days` days, oldest first"""
+    since = datetime.utcnow().date() - timedelta(days=days - 1)
+    query = ProgressSnapshot.query.filter(ProgressSnapshot.date >= since)
+    if project_id:
+        query = query.filter(ProgressSnapshot.project_id == project_id)
+    return [s.to_dict() for s in query.order_by(ProgressSnapshot.date, ProgressSnapshot.project_id)]
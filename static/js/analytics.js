@@ -1,9 +1,9 @@
-// analytics.js - fetches stats and tasks and renders charts + activity log
-// analytics.js - fetches stats and tasks and renders charts + activity log
+// analytics.js - fetches stats and server-side aggregates and renders charts + activity log
 // Also: notify user of new activity (in-app toast + optional desktop notifications)
 (async function(){
     const statsUrl = '/api/stats';
-    const tasksUrl = '/api/tasks';
+    const distributionUrl = '/api/analytics/distribution';
+    const projectsUrl = '/api/analytics/projects';
 
     function el(id){ return document.getElementById(id); }
 
@@ -25,38 +25,25 @@
 
     // No notifications: activity log should persist server-side and be displayed here
 
-    // Fetch tasks and render charts + activity
+    // Fetch server-side aggregates and render charts + activity
     async function loadTasksAndRender(){
         try{
-            const res = await fetch(tasksUrl);
-            const data = await res.json();
-            if (!data.success) throw new Error(data.error || 'Failed to load tasks');
-            const tasks = data.tasks || [];
-
-            // Status distribution - count all statuses including overdue
-            const now = new Date();
-            const statusCounts = {todo: 0, in_progress: 0, completed: 0, overdue: 0};
-            
-            tasks.forEach(t => {
-                const st = t.status || 'todo';
-                
-                // Count by status first
-                if (st === 'completed') {
-                    statusCounts.completed++;
-                } else if (st === 'in_progress') {
-                    statusCounts.in_progress++;
-                } else {
-                    statusCounts.todo++;
-                }
-                
-                // Additionally check if task is overdue (has due_date in the past and not completed)
-                if (t.due_date && st !== 'completed') {
-                    const dueDate = new Date(t.due_date);
-                    if (dueDate < now) {
-                        statusCounts.overdue++;
-                    }
-                }
-            });
+            const [distRes, projRes] = await Promise.all([
+                fetch(distributionUrl),
+                fetch(projectsUrl)
+            ]);
+            const dist = await distRes.json();
+            const proj = await projRes.json();
+            if (!dist.success) throw new Error(dist.error || 'Failed to load distribution');
+
+            // Status distribution - overdue is counted in addition to the status buckets
+            const counts = dist.status || {};
+            const statusCounts = {
+                todo: counts.todo || 0,
+                in_progress: counts.in_progress || 0,
+                completed: counts.completed || 0,
+                overdue: counts.overdue || 0
+            };
             
             const statuses = ['todo','in_progress','completed','overdue'];
             const statusValues = statuses.map(s=>statusCounts[s]||0);
@@ -68,31 +55,20 @@
             renderStatusPie(statussToLabels(statuses), statusValues);
 
             // Tasks by project
-            const projMap = {};
-            tasks.forEach(t=>{
-                const name = (t.project && t.project.name) || t.project_name || 'No Project';
-                projMap[name] = (projMap[name]||0)+1;
-            });
-            const projNames = Object.keys(projMap).slice(0,10);
-            const projCounts = projNames.map(n=>projMap[n]);
-            renderProjectBar(projNames, projCounts);
-
-            // Activity log: use updated_at desc
-            const sorted = tasks.slice().sort((a,b)=>{ const A=a.updated_at||a.created_at||''; const B=b.updated_at||b.created_at||''; return (B>A)?1:(B<A?-1:0); });
-
-            // Instead of deriving activity from tasks, fetch the persisted activity log
+            if (proj.success) {
+                const rows = (proj.projects || []).slice(0,10);
+                renderProjectBar(rows.map(r=>r.project_name), rows.map(r=>r.total_tasks));
+            }
+
+            // Activity log is persisted server-side
             try {
                 const actRes = await fetch('/api/activity?limit=50');
                 const actData = await actRes.json();
                 if (actData.success) {
                     renderActivityLog(actData.activities);
-                } else {
-                    // fallback: render from tasks as before
-                    renderActivityLog(sorted.slice(0,50));
                 }
             } catch (e) {
-                console.warn('Failed to load activity log, falling back to task-derived log', e);
-                renderActivityLog(sorted.slice(0,50));
+                console.warn('Failed to load activity log', e);
             }
 
         }catch(err){
@@ -203,6 +179,11 @@
     await loadStats();
     await loadTasksAndRender();
 
-    // refresh periodically
-    setInterval(async ()=>{ await loadStats(); await loadTasksAndRender(); }, 60_000);
+    // refresh promptly when this worker's change feed reports a change; the slow poll
+    // (cheap with ETags) catches writes served by other workers
+    async function refresh(){ await loadStats(); await loadTasksAndRender(); }
+    if (window.TaskWiseEvents){
+        TaskWiseEvents.on(['task', 'project', 'subtask', 'activity', 'reset'], TaskWiseEvents.debounce(refresh, 500));
+    }
+    setInterval(refresh, 60_000);
 })();
@@ -4,8 +4,8 @@ let tasks = [];
 let projects = [];
 
 document.addEventListener('DOMContentLoaded', function() {
+    // The calendar fetches the visible range itself once rendered
     initializeCalendar();
-    loadTasks();
     loadProjects();
     setupEventListeners();
 });
@@ -120,7 +120,13 @@ function renderEventContent(eventInfo) {
 // Data Fetching
 async function fetchEvents(info, successCallback, failureCallback) {
     try {
-        const response = await fetch('/api/tasks');
+        // Only ask for tasks due inside the visible range, with the fields the calendar renders
+        const params = new URLSearchParams({
+            view: 'calendar',
+            due_from: info.start.toISOString(),
+            due_to: info.end.toISOString()
+        });
+        const response = await fetch(`/api/tasks?${params}`);
         const data = await response.json();
         
         if (!data.success) {
@@ -185,19 +191,9 @@ async function fetchEvents(info, successCallback, failureCallback) {
 }
 
 async function loadTasks() {
-    try {
-        const response = await fetch('/api/tasks');
-        const data = await response.json();
-        
-        if (data.success) {
-            tasks = data.tasks;
-            calendar.refetchEvents();
-        } else {
-            throw new Error(data.error || 'Failed to load tasks');
-        }
-    } catch (error) {
-        console.error('Error loading tasks:', error);
-        showNotification('Failed to load tasks', 'error');
+    // Re-query the visible range; fetchEvents refreshes the task list
+    if (calendar) {
+        calendar.refetchEvents();
     }
 }
 
@@ -0,0 +1,55 @@
+// events.js - shared Server-Sent Events connection to /api/events
+// Pages subscribe with TaskWiseEvents.on(['task', 'project'], handler). The
+// browser's EventSource reconnects by itself and sends Last-Event-ID, so missed
+// changes are replayed; a 'reset' event means they could not be and the page
+// should refetch everything. The feed only carries changes made through the
+// worker serving the stream, so pages keep a slow poll running alongside it.
+window.TaskWiseEvents = (function(){
+    const handlers = {};
+    const RECONNECT_MS = 60000;
+    let source = null;
+
+    function connect(){
+        if (source || !window.EventSource) return;
+        source = new EventSource('/api/events');
+        source.addEventListener('error', () => {
+            // CLOSED means the browser gave up (e.g. the server is at its stream limit); try again later
+            if (source && source.readyState === EventSource.CLOSED){
+                source = null;
+                setTimeout(connect, RECONNECT_MS);
+            }
+        });
+        Object.keys(handlers).forEach(listen);
+    }
+
+    function listen(type){
+        if (!source) return;
+        source.addEventListener(type, (e) => {
+            let data = {};
+            try { data = JSON.parse(e.data || '{}'); } catch (err) { /* keep empty */ }
+            handlers[type].forEach(fn => fn(data, type));
+        });
+    }
+
+    function on(types, fn){
+        (Array.isArray(types) ? types : [types]).forEach(type => {
+            if (!handlers[type]){
+                handlers[type] = [];
+                listen(type);
+            }
+            handlers[type].push(fn);
+        });
+        connect();
+    }
+
+    // Collapse a burst of events (e.g. a batch update) into one refresh
+    function debounce(fn, wait){
+        let timer = null;
+        return function(){
+            clearTimeout(timer);
+            timer = setTimeout(fn, wait);
+        };
+    }
+
+    return { on, debounce };
+})();
@@ -16,7 +16,7 @@ document.addEventListener('DOMContentLoaded', () => {
       const data = await res.json();
       if (!data.success) return;
       const notifs = data.notifications || [];
-      const unreadCount = notifs.filter(n => !n.read).length;
+      const unreadCount = data.unread != null ? data.unread : notifs.filter(n => !n.read).length;
       badge.textContent = unreadCount;
       // Show/hide badge based on count
       badge.style.display = unreadCount > 0 ? 'block' : 'none';
@@ -102,18 +102,13 @@ document.addEventListener('DOMContentLoaded', () => {
 
   if (clearBtn) {
     clearBtn.addEventListener('click', async () => {
-      // Delete all notifications
-      const response = await fetch('/api/notifications');
-      const data = await response.json();
-      
-      if (data.success && data.notifications && data.notifications.length > 0) {
-        // Delete each notification
-        for (const notif of data.notifications) {
-          await deleteNotification(notif.id);
-        }
-        // Reload to update the UI
-        await loadNotifications();
-      }
+      // Delete all notifications in one request
+      await fetch('/api/notifications/delete', {
+        method: 'POST',
+        headers: {'Content-Type':'application/json'},
+        body: JSON.stringify({all: true})
+      });
+      await loadNotifications();
     });
   }
 
@@ -129,68 +124,51 @@ document.addEventListener('DOMContentLoaded', () => {
     }
   });
 
-  // initial load to set badge
-  loadNotifications();
-
-  // Check for due date notifications every minute
-  checkDueDateNotifications();
-  setInterval(checkDueDateNotifications, 60000); // Check every minute
-});
+  // Badge only: the full list is fetched when the dropdown opens
+  let unread = null;
+  const announced = new Set();
+  async function refreshBadge() {
+    try {
+      const res = await fetch('/api/notifications/unread_count');
+      const data = await res.json();
+      if (!data.success) return;
+      const grew = unread !== null && data.unread > unread;
+      unread = data.unread;
+      badge.textContent = unread;
+      badge.style.display = unread > 0 ? 'block' : 'none';
+      if (grew) await announceNew();
+      if (open) await loadNotifications();
+    } catch (e) {
+      console.error('Failed to load notification count', e);
+    }
+  }
 
-// Function to check for tasks that are due soon or overdue
-async function checkDueDateNotifications() {
-  try {
-    const response = await fetch('/api/tasks');
-    const data = await response.json();
-    
-    if (!data.success) return;
-    
-    const tasks = data.tasks || [];
-    const now = new Date();
-    const oneHourFromNow = new Date(now.getTime() + 60 * 60 * 1000);
-    const oneDayFromNow = new Date(now.getTime() + 24 * 60 * 60 * 1000);
-    
-    tasks.forEach(task => {
-      if (!task.due_date || task.status === 'completed') return;
-      
-      const dueDate = new Date(task.due_date);
-      const notificationKey = `notif_${task.id}_${task.due_date}`;
-      
-      // Check if we already notified for this task
-      if (localStorage.getItem(notificationKey)) return;
-      
-      // Task is overdue
-      if (dueDate < now) {
-        showDueDateNotification(
-          'Task Overdue! ⚠️',
-          `"${task.title}" is overdue! Please complete it as soon as possible.`,
-          'error'
-        );
-        localStorage.setItem(notificationKey, 'overdue');
-      }
-      // Task due within 1 hour
-      else if (dueDate <= oneHourFromNow) {
-        showDueDateNotification(
-          'Task Due Soon! ⏰',
-          `"${task.title}" is due in less than 1 hour!`,
-          'warning'
-        );
-        localStorage.setItem(notificationKey, '1hour');
-      }
-      // Task due within 24 hours
-      else if (dueDate <= oneDayFromNow) {
-        showDueDateNotification(
-          'Task Due Tomorrow 📅',
-          `"${task.title}" is due within 24 hours.`,
-          'info'
-        );
-        localStorage.setItem(notificationKey, '24hours');
-      }
+  // Toast the unread notifications that arrived since the page loaded
+  async function announceNew() {
+    const res = await fetch('/api/notifications?unread=1&limit=20');
+    const data = await res.json();
+    (data.notifications || []).filter(n => !announced.has(n.id)).forEach(n => {
+      announced.add(n.id);
+      showDueDateNotification(n.title, n.message, n.kind === 'overdue' ? 'error' : n.kind === 'due_hour' ? 'warning' : 'info');
     });
-  } catch (error) {
-    console.error('Error checking due date notifications:', error);
   }
-}
+
+  // initial load to set badge
+  refreshBadge().then(async () => {
+    if (unread) {
+      const res = await fetch('/api/notifications?unread=1&limit=20');
+      const data = await res.json();
+      (data.notifications || []).forEach(n => announced.add(n.id));
+    }
+  });
+
+  // Due-date notifications are generated by the server; the change feed announces the ones
+  // created through this worker, the slow poll picks up the rest
+  if (window.TaskWiseEvents) {
+    TaskWiseEvents.on(['notification', 'reset'], TaskWiseEvents.debounce(refreshBadge, 300));
+  }
+  setInterval(refreshBadge, 60000);
+});
 
 // Function to show browser notification and in-app notification
 async function showDueDateNotification(title, message, type = 'info') {
@@ -205,11 +183,8 @@ async function showDueDateNotification(title, message, type = 'info') {
     });
   }
   
-  // Show in-app toast notification
+  // Show in-app toast notification (the server already stored it in the notification center)
   showToastNotification(title, message, type);
-  
-  // Add to notification center only once
-  await addToNotificationCenter(title, message);
 }
 
 // Function to show toast notification
@@ -0,0 +1,56 @@
+"""
+Copy the primary SQLite database onto the SQLite replicas in DATABASE_REPLICA_URLS.
+
+Stands in for real replication when trying read-replica routing locally with
+two SQLite files (see replicas.py). Run it again, or with --every, to let the
+replicas catch up.
+
+Usage:
+    DATABASE_URL=sqlite:////tmp/primary.db DATABASE_REPLICA_URLS=sqlite:////tmp/replica.db python sync_sqlite_replica.py
+    ... python sync_sqlite_replica.py --every 5      # keep syncing, 5 seconds apart
+"""
+import argparse
+import time
+
+from config import create_app, db
+
+
+def sync_replicas(app):
+    """Back up the primary into every SQLite replica; returns the number of replicas synced."""
+    synced = 0
+    with app.app_context():
+        primary = db.engine
+        if primary.dialect.name != 'sqlite':
+            raise SystemExit("❌ The primary is not a SQLite database")
+        for replica in app.extensions['taskwise_replicas']:
+            if replica.dialect.name != 'sqlite':
+                print(f"⚠️  Skipping {replica.url.render_as_string()}: not a SQLite database")
+                continue
+            source, target = primary.raw_connection(), replica.raw_connection()
+            try:
+                source.driver_connection.backup(target.driver_connection)
+            finally:
+                source.close()
+                target.close()
+            synced += 1
+    return synced
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--every', type=float, metavar='SECONDS', help='repeat the copy until interrupted')
+    args = parser.parse_args()
+
+    app = create_app()
+    app.extensions['taskwise_scheduler'].stop()
+    if not app.extensions['taskwise_replicas']:
+        raise SystemExit("❌ DATABASE_REPLICA_URLS is not set")
+    while True:
+        print(f"✅ Synced {sync_replicas(app)} replica(s)")
+        if not args.every:
+            break
+        time.sleep(args.every)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,5 @@
+import os
+
+# Write activity rows in the request's own transaction, so tests can count them right away
+# (tests of the buffered mode build their own recorders); set before the app is imported
+os.environ.setdefault('ACTIVITY_MODE', 'sync')
@@ -0,0 +1,142 @@
+import time
+import unittest
+
+from flask import json
+from sqlalchemy import event
+
+from app import app
+from activity_log import ActivityRecorder
+from models import db, Task, Activity
+
+
+class TestActivityRecorder(unittest.TestCase):
+    def setUp(self):
+        app.config['TESTING'] = True
+        self.client = app.test_client()
+        with app.app_context():
+            db.create_all()
+
+    def tearDown(self):
+        with app.app_context():
+            db.session.remove()
+            db.drop_all()
+
+    def _buffered(self, **kwargs):
+        recorder = ActivityRecorder(app, mode='buffered', **kwargs)
+        self.addCleanup(recorder.close)
+        return recorder
+
+    def _count(self):
+        with app.app_context():
+            return Activity.query.count()
+
+    def test_routes_commit_activity_with_the_change(self):
+        commits = []
+        with app.app_context():
+            engine = db.engine
+        listener = lambda conn: commits.append(1)
+        event.listen(engine, 'commit', listener)
+        try:
+            response = self.client.post('/api/tasks', data=json.dumps({'title': 'Audited'}), content_type='application/json')
+        finally:
+            event.remove(engine, 'commit', listener)
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(len(commits), 1)
+        with app.app_context():
+            self.assertEqual([a.event_type for a in Activity.query], ['task_created'])
+
+    def test_buffered_events_wait_for_commit(self):
+        recorder = self._buffered(flush_interval_ms=60000)
+        with app.app_context():
+            recorder.record('task_updated', 'kept')
+            db.session.commit()
+            recorder.record('task_updated', 'rolled back')
+            db.session.rollback()
+        self.assertEqual(recorder.pending(), 1)
+        self.assertEqual(recorder.flush(), 1)
+        with app.app_context():
+            self.assertEqual([a.message for a in Activity.query], ['kept'])
+
+    def test_background_thread_flushes_in_batches(self):
+        recorder = self._buffered(batch_size=10, flush_interval_ms=20)
+        with app.app_context():
+            for i in range(25):
+                recorder.record('task_updated', f'event {i}')
+            db.session.commit()
+        deadline = time.monotonic() + 5
+        while self._count() < 25 and time.monotonic() < deadline:
+            time.sleep(0.02)
+        self.assertEqual(self._count(), 25)
+        self.assertEqual(recorder.written, 25)
+
+    def test_full_queue_falls_back_to_synchronous_write(self):
+        recorder = self._buffered(max_queue=1, flush_interval_ms=60000)
+        recorder._ensure_thread = lambda: None  # keep everything in the queue
+        with app.app_context():
+            for i in range(3):
+                recorder.record('task_updated', f'event {i}')
+            db.session.commit()
+        self.assertEqual(recorder.overflowed, 2)
+        self.assertEqual(self._count(), 2)
+        recorder.close()
+        self.assertEqual(self._count(), 3)
+
+    def _wait_for(self, condition):
+        deadline = time.monotonic() + 5
+        while not condition() and time.monotonic() < deadline:
+            time.sleep(0.02)
+
+    def test_failing_batch_is_split_and_bad_row_dead_lettered(self):
+        recorder = self._buffered(batch_size=10, flush_interval_ms=20, max_attempts=2)
+        with app.app_context():
+            for i in range(4):
+                recorder.record('task_updated', f'event {i}')
+            recorder.record('task_updated', None)  # violates NOT NULL
+            recorder.record('task_updated', 'after the bad one')
+            db.session.commit()
+        self._wait_for(lambda: recorder.dead_letters)
+        self._wait_for(lambda: self._count() == 5)
+        self.assertEqual(self._count(), 5)
+        self.assertEqual([row['message'] for row in recorder.dead_letters], [None])
+        # The thread keeps writing afterwards
+        with app.app_context():
+            recorder.record('task_updated', 'later')
+            db.session.commit()
+        self._wait_for(lambda: self._count() == 6)
+        self.assertEqual(self._count(), 6)
+
+    def test_failing_overflow_write_does_not_fail_the_commit(self):
+        recorder = self._buffered(max_queue=1, flush_interval_ms=60000)
+        recorder._ensure_thread = lambda: None
+        with app.app_context():
+            recorder.record('task_updated', 'queued')
+            recorder.record('task_updated', None)
+            recorder.record('task_updated', 'written now')
+            db.session.commit()
+        self.assertEqual(len(recorder.dead_letters), 1)
+        self.assertEqual(self._count(), 1)
+        recorder.close()
+        self.assertEqual(self._count(), 2)
+
+    def test_background_path_records_deletes_without_task_id(self):
+        recorder = app.extensions['taskwise_activity']
+        recorder._ensure_thread = lambda: None  # flushed below, by hand
+        self.addCleanup(delattr, recorder, '_ensure_thread')
+        self.addCleanup(setattr, recorder, 'mode', recorder.mode)
+        recorder.mode = 'buffered'
+        task_id = json.loads(self.client.post('/api/tasks', json={'title': 'Short lived'}).data)['task']['id']
+        self.assertEqual(self.client.delete(f'/api/tasks/{task_id}').status_code, 200)
+        self.assertEqual(self._count(), 0)  # nothing written on the request path
+        recorder.flush()
+        with app.app_context():
+            rows = {a.event_type: a for a in Activity.query}
+        self.assertEqual(set(rows), {'task_created', 'task_deleted'})
+        self.assertEqual(rows['task_deleted'].message, f'Task deleted: Short lived (#{task_id})')
+        # Written after the task was gone, so neither row may point at it
+        self.assertIsNone(rows['task_deleted'].task_id)
+        self.assertIsNone(rows['task_created'].task_id)
+        self.assertEqual(len(recorder.dead_letters), 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,92 @@
+import unittest
+from datetime import datetime, timedelta
+
+from flask import json
+
+from analytics import dev_distribution
+from app import app
+from models import db, Task, Project, TaskStatus, Priority
+
+
+class TestAnalyticsEndpoints(unittest.TestCase):
+    def setUp(self):
+        app.config['TESTING'] = True
+        self.client = app.test_client()
+        with app.app_context():
+            db.create_all()
+            project = Project(name='Alpha', color='#123456')
+            db.session.add(project)
+            db.session.flush()
+            self.project_id = project.id
+            now = datetime.utcnow().replace(microsecond=0)
+            # Two completions two days ago, one today; cycle times 10h, 20h, 30h
+            db.session.add_all([
+                Task(title='A', status=TaskStatus.COMPLETED, priority=Priority.HIGH, project_id=project.id,
+                     created_at=now - timedelta(days=2, hours=10), completed_at=now - timedelta(days=2)),
+                Task(title='B', status=TaskStatus.COMPLETED, priority=Priority.HIGH, project_id=project.id,
+                     created_at=now - timedelta(days=2, hours=20), completed_at=now - timedelta(days=2)),
+                Task(title='C', status=TaskStatus.COMPLETED, priority=Priority.LOW,
+                     created_at=now - timedelta(hours=30), completed_at=now),
+                Task(title='D', status=TaskStatus.TODO, due_date=now - timedelta(days=1)),
+                Task(title='E', status=TaskStatus.IN_PROGRESS, project_id=project.id),
+            ])
+            db.session.commit()
+
+    def tearDown(self):
+        with app.app_context():
+            db.session.remove()
+            db.drop_all()
+
+    def _get(self, url):
+        response = self.client.get(url)
+        data = json.loads(response.data)
+        self.assertEqual(response.status_code, 200, data)
+        return data
+
+    def test_completions_per_day(self):
+        series = self._get('/api/analytics/completions?days=7')['series']
+        self.assertEqual([point['completed'] for point in series], [2, 1])
+        self.assertEqual(len(series[0]['period']), 10)
+
+    def test_completions_per_week(self):
+        series = self._get('/api/analytics/completions?interval=week&days=30')['series']
+        self.assertEqual(sum(point['completed'] for point in series), 3)
+        for point in series:
+            self.assertEqual(datetime.strptime(point['period'], '%Y-%m-%d').weekday(), 0)
+
+    def test_unknown_interval(self):
+        self.assertEqual(self.client.get('/api/analytics/completions?interval=year').status_code, 400)
+
+    def test_distribution(self):
+        data = self._get('/api/analytics/distribution')
+        self.assertEqual(data['status'], {'todo': 1, 'in_progress': 1, 'completed': 3, 'overdue': 1})
+        self.assertEqual(data['priority'], {'low': 1, 'medium': 2, 'high': 2})
+
+    def test_stored_overdue_status_is_counted_once(self):
+        with app.app_context():
+            db.session.add(Task(title='F', status=TaskStatus.OVERDUE, due_date=datetime.utcnow() - timedelta(days=3)))
+            db.session.commit()
+        data = self._get('/api/analytics/distribution')
+        self.assertEqual(data['status'], {'todo': 2, 'in_progress': 1, 'completed': 3, 'overdue': 2})
+        dev_tasks = [{'status': 'overdue', 'due_date': (datetime.utcnow() - timedelta(days=3)).isoformat()},
+                     {'status': 'completed'}]
+        self.assertEqual(dev_distribution(dev_tasks)['status'],
+                         {'todo': 1, 'in_progress': 0, 'completed': 1, 'overdue': 1})
+
+    def test_project_throughput(self):
+        rows = self._get('/api/analytics/projects')['projects']
+        alpha = next(r for r in rows if r['project_id'] == self.project_id)
+        self.assertEqual(alpha['total_tasks'], 3)
+        self.assertEqual(alpha['completed_in_period'], 2)
+        self.assertAlmostEqual(alpha['average_cycle_hours'], 15.0, places=1)
+        unassigned = next(r for r in rows if r['project_id'] is None)
+        self.assertEqual(unassigned['project_name'], 'No Project')
+
+    def test_cycle_time(self):
+        data = self._get('/api/analytics/cycle-time')
+        self.assertEqual(data['completed_tasks'], 3)
+        self.assertAlmostEqual(data['average_cycle_hours'], 20.0, places=1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,129 @@
+import unittest
+
+from flask import json
+from sqlalchemy import event
+
+from app import app
+from models import db, Task, Subtask, Activity, TaskStatus
+
+
+class TestTaskBatch(unittest.TestCase):
+    def setUp(self):
+        app.config['TESTING'] = True
+        self.client = app.test_client()
+        with app.app_context():
+            db.create_all()
+            tasks = [Task(title=f'Card {i}') for i in range(5)]
+            db.session.add_all(tasks)
+            db.session.flush()
+            db.session.add(Subtask(parent_task_id=tasks[4].id, title='Child'))
+            db.session.commit()
+            self.ids = [t.id for t in tasks]
+
+    def tearDown(self):
+        with app.app_context():
+            db.session.remove()
+            db.drop_all()
+
+    def _batch(self, operations, **extra):
+        return self.client.post('/api/tasks/batch', data=json.dumps(dict(extra, operations=operations)),
+                                content_type='application/json')
+
+    def test_mixed_batch_applies_in_one_commit(self):
+        commits = []
+        with app.app_context():
+            engine = db.engine
+        listener = lambda conn: commits.append(1)
+        event.listen(engine, 'commit', listener)
+        try:
+            response = self._batch(
+                [{'op': 'update', 'id': task_id, 'data': {'status': 'completed'}} for task_id in self.ids[:3]]
+                + [{'op': 'create', 'data': {'title': 'New card', 'priority': 'high'}},
+                   {'op': 'delete', 'id': self.ids[4]}]
+            )
+        finally:
+            event.remove(engine, 'commit', listener)
+        data = json.loads(response.data)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual((data['applied'], data['failed']), (5, 0))
+        self.assertEqual(len(commits), 1)
+        with app.app_context():
+            done = Task.query.filter(Task.id.in_(self.ids[:3])).all()
+            self.assertTrue(all(t.status == TaskStatus.COMPLETED and t.progress == 100 and t.completed_at for t in done))
+            self.assertIsNone(db.session.get(Task, self.ids[4]))
+            self.assertEqual(Subtask.query.count(), 0)
+            self.assertEqual(Task.query.filter_by(title='New card').count(), 1)
+            self.assertEqual(Activity.query.count(), 5)
+
+    def test_uniform_move_is_a_single_update(self):
+        statements = []
+        with app.app_context():
+            engine = db.engine
+        listener = lambda conn, cursor, statement, *args: statements.append(statement)
+        event.listen(engine, 'before_cursor_execute', listener)
+        try:
+            self._batch([{'op': 'update', 'id': task_id, 'data': {'priority': 'low'}} for task_id in self.ids])
+        finally:
+            event.remove(engine, 'before_cursor_execute', listener)
+        self.assertEqual(len([s for s in statements if s.startswith('UPDATE tasks')]), 1)
+        self.assertEqual(len([s for s in statements if s.startswith('INSERT INTO activities')]), 1)
+
+    def test_per_item_errors(self):
+        response = self._batch([
+            {'op': 'update', 'id': self.ids[0], 'data': {'title': 'Renamed'}},
+            {'op': 'update', 'id': 9999, 'data': {'title': 'Ghost'}},
+            {'op': 'update', 'id': self.ids[1], 'data': {'status': 'bogus'}},
+            {'op': 'explode'},
+        ])
+        results = json.loads(response.data)['results']
+        self.assertEqual([r['success'] for r in results], [True, False, False, False])
+        self.assertEqual(results[1]['error'], 'Not found')
+        with app.app_context():
+            self.assertEqual(db.session.get(Task, self.ids[0]).title, 'Renamed')
+
+    def test_atomic_batch_rejects_everything_on_failure(self):
+        response = self._batch([
+            {'op': 'update', 'id': self.ids[0], 'data': {'title': 'Renamed'}},
+            {'op': 'delete', 'id': 9999},
+        ], atomic=True)
+        self.assertEqual(response.status_code, 400)
+        with app.app_context():
+            self.assertEqual(db.session.get(Task, self.ids[0]).title, 'Card 0')
+
+    def test_batch_create_honours_client_token(self):
+        operation = {'op': 'create', 'client_token': 'batch-tok', 'data': {'title': 'Once'}}
+        first = json.loads(self._batch([operation]).data)['results'][0]
+        second = json.loads(self._batch([operation]).data)['results'][0]
+        self.assertEqual(first['id'], second['id'])
+        self.assertTrue(second['idempotent'])
+
+    def test_repeated_client_token_in_one_batch_creates_once(self):
+        operation = {'op': 'create', 'client_token': 'twice', 'data': {'title': 'Once'}}
+        response = self._batch([operation, dict(operation), {'op': 'delete', 'id': 9999}])
+        self.assertEqual(response.status_code, 200)
+        first, second, _ = json.loads(response.data)['results']
+        self.assertTrue(first['success'] and second['success'])
+        self.assertEqual(first['id'], second['id'])
+        self.assertTrue(second['idempotent'])
+        with app.app_context():
+            self.assertEqual(Task.query.filter_by(title='Once').count(), 1)
+
+    def test_client_token_of_a_deleted_task_creates_it_again(self):
+        operation = {'op': 'create', 'client_token': 'recreate', 'data': {'title': 'Phoenix'}}
+        first = json.loads(self._batch([operation]).data)['results'][0]
+        self._batch([{'op': 'delete', 'id': first['id']}])
+        second = json.loads(self._batch([operation]).data)['results'][0]
+        self.assertTrue(second['success'])
+        self.assertNotIn('idempotent', second)
+        third = json.loads(self._batch([operation]).data)['results'][0]
+        self.assertEqual(third['id'], second['id'])
+        with app.app_context():
+            self.assertEqual(db.session.get(Task, second['id']).title, 'Phoenix')
+
+    def test_malformed_batch(self):
+        self.assertEqual(self._batch([]).status_code, 400)
+        self.assertEqual(self._batch([{'op': 'delete', 'id': 1}] * 501).status_code, 400)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,75 @@
+import unittest
+from datetime import datetime, timedelta
+
+from flask import json
+from sqlalchemy import text
+
+from app import app
+from models import db, Task, TaskStatus
+from models.base import TASK_VIEWS
+
+
+class TestCalendarQueries(unittest.TestCase):
+    def setUp(self):
+        app.config['TESTING'] = True
+        self.client = app.test_client()
+        with app.app_context():
+            db.create_all()
+            db.session.add_all([
+                Task(title='Before', due_date=datetime(2024, 2, 29, 23, 0)),
+                Task(title='Start', due_date=datetime(2024, 3, 1, 0, 0)),
+                Task(title='Middle', due_date=datetime(2024, 3, 15, 12, 0), status=TaskStatus.COMPLETED),
+                Task(title='After', due_date=datetime(2024, 4, 1, 0, 0)),
+                Task(title='Undated'),
+            ])
+            db.session.commit()
+
+    def tearDown(self):
+        with app.app_context():
+            db.session.remove()
+            db.drop_all()
+
+    def _titles(self, query):
+        response = self.client.get(f'/api/tasks?{query}')
+        self.assertEqual(response.status_code, 200)
+        return sorted(t['title'] for t in json.loads(response.data)['tasks'])
+
+    def test_due_range_is_half_open(self):
+        self.assertEqual(self._titles('due_from=2024-03-01&due_to=2024-04-01'), ['Middle', 'Start'])
+
+    def test_due_range_accepts_utc_offsets(self):
+        # 2024-03-01T01:00+01:00 is midnight UTC
+        self.assertEqual(self._titles('due_from=2024-03-01T01:00:00%2B01:00&due_to=2024-03-02T00:00:00Z'), ['Start'])
+
+    def test_due_range_combines_with_status(self):
+        self.assertEqual(self._titles('due_from=2024-03-01&due_to=2024-04-01&status=completed'), ['Middle'])
+
+    def test_month_mode_returns_calendar_fields(self):
+        response = self.client.get('/api/tasks?month=2024-03')
+        data = json.loads(response.data)
+        self.assertEqual(sorted(t['title'] for t in data['tasks']), ['Middle', 'Start'])
+        self.assertEqual(set(data['tasks'][0]), set(TASK_VIEWS['calendar']))
+
+    def test_updated_since(self):
+        with app.app_context():
+            task = Task.query.filter_by(title='After').one()
+            task.updated_at = datetime.utcnow() + timedelta(hours=1)
+            db.session.commit()
+        since = (datetime.utcnow() + timedelta(minutes=30)).isoformat()
+        self.assertEqual(self._titles(f'updated_since={since}'), ['After'])
+
+    def test_invalid_dates_are_rejected(self):
+        for query in ('due_from=yesterday', 'month=2024-13', 'updated_since=soon'):
+            response = self.client.get(f'/api/tasks?{query}')
+            self.assertEqual(response.status_code, 400, query)
+
+    def test_due_range_uses_index(self):
+        with app.app_context():
+            plan = db.session.execute(text(
+                "EXPLAIN QUERY PLAN SELECT id FROM tasks WHERE due_date >= :start AND due_date < :end"
+            ), {'start': '2024-03-01', 'end': '2024-04-01'}).all()
+        self.assertIn('ix_tasks_due_date_status', ' '.join(row[-1] for row in plan))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,166 @@
+import unittest
+
+from flask import json
+from sqlalchemy import event
+from sqlalchemy.exc import IntegrityError
+
+from app import app
+from dependencies import DependencyGraph, graph_cache, reachable_edges
+from models import db, Task, TaskDependency, Project, TaskStatus
+
+
+def _graph(hours, edges, completed=()):
+    nodes = {task_id: {'title': str(task_id), 'estimated_hours': h, 'project_id': 1, 'external': False,
+                       'status': 'completed' if task_id in completed else 'todo'}
+             for task_id, h in hours.items()}
+    return DependencyGraph(nodes, edges)
+
+
+class TestDependencyGraph(unittest.TestCase):
+    def test_order_and_critical_path(self):
+        # 4 needs 2 and 3, which both need 1; the 3-branch is longer
+        graph = _graph({1: 2, 2: 1, 3: 5, 4: None}, [(2, 1), (3, 1), (4, 2), (4, 3)])
+        order, cyclic = graph.topological_order()
+        self.assertEqual(order, [1, 2, 3, 4])
+        self.assertEqual(cyclic, [])
+        self.assertEqual(graph.critical_path(), {'task_ids': [1, 3, 4], 'hours': 7})
+
+    def test_cycle_detection(self):
+        graph = _graph({1: 1, 2: 1, 3: 1}, [(2, 1), (3, 2)])
+        self.assertEqual(graph.would_create_cycle(1, 3), [1, 3, 2, 1])
+        self.assertEqual(graph.would_create_cycle(1, 1), [1, 1])
+        self.assertIsNone(graph.would_create_cycle(3, 1))
+        looped = _graph({1: 1, 2: 1, 3: 1}, [(1, 2), (2, 1), (3, 1)])
+        self.assertEqual(looped.topological_order(), ([], [1, 2, 3]))
+
+    def test_blocked_and_unblocked(self):
+        graph = _graph({1: 1, 2: 1, 3: 1, 4: 1}, [(2, 1), (3, 2), (4, 1)], completed={1})
+        self.assertEqual(graph.unblocked(), [2, 4])
+        self.assertEqual(graph.blocked(), [3])
+
+    def test_long_chain(self):
+        size = 50000
+        graph = _graph({i: 1 for i in range(size)}, [(i, i - 1) for i in range(1, size)])
+        self.assertEqual(graph.critical_path()['hours'], size)
+        self.assertEqual(len(graph.would_create_cycle(0, size - 1)), size + 1)
+
+
+class TestDependencyRoutes(unittest.TestCase):
+    def setUp(self):
+        app.config['TESTING'] = True
+        self.client = app.test_client()
+        graph_cache.invalidate()
+        with app.app_context():
+            db.create_all()
+            project, other = Project(name='Graph'), Project(name='Other')
+            db.session.add_all([project, other])
+            db.session.flush()
+            tasks = [Task(title='Design', project_id=project.id, estimated_hours=3, status=TaskStatus.COMPLETED),
+                     Task(title='Build', project_id=project.id, estimated_hours=8),
+                     Task(title='Ship', project_id=project.id, estimated_hours=1),
+                     Task(title='Legal', project_id=other.id, estimated_hours=2)]
+            db.session.add_all(tasks)
+            db.session.commit()
+            self.project_id = project.id
+            self.design, self.build, self.ship, self.legal = (t.id for t in tasks)
+
+    def tearDown(self):
+        with app.app_context():
+            db.session.remove()
+            db.drop_all()
+
+    def _depend(self, task_id, depends_on_id):
+        response = self.client.post(f'/api/tasks/{task_id}/dependencies', json={'depends_on_id': depends_on_id})
+        return response, json.loads(response.data)
+
+    def _graph(self):
+        return json.loads(self.client.get(f'/api/dependencies/graph?project_id={self.project_id}').data)['graph']
+
+    def test_add_analyze_and_remove(self):
+        for task_id, depends_on_id in ((self.build, self.design), (self.ship, self.build), (self.ship, self.legal)):
+            self.assertEqual(self._depend(task_id, depends_on_id)[0].status_code, 201)
+
+        graph = self._graph()
+        self.assertEqual(graph['order'], [self.design, self.legal, self.build, self.ship])
+        self.assertEqual(graph['unblocked'], [self.build])
+        self.assertEqual(graph['blocked'], [self.ship])
+        self.assertEqual(graph['critical_path'], {'task_ids': [self.design, self.build, self.ship], 'hours': 12})
+        legal = next(t for t in graph['tasks'] if t['id'] == self.legal)
+        self.assertTrue(legal['external'])
+
+        with app.app_context():
+            self.assertEqual([t.id for t in db.session.get(Task, self.ship).dependencies], [self.build, self.legal])
+
+        self.assertEqual(self.client.delete(f'/api/tasks/{self.ship}/dependencies/{self.legal}').status_code, 200)
+        self.assertEqual(self.client.delete(f'/api/tasks/{self.ship}/dependencies/{self.legal}').status_code, 404)
+        self.assertEqual(self._graph()['blocked'], [self.ship])
+        self.assertNotIn(self.legal, [t['id'] for t in self._graph()['tasks']])
+
+    def test_cycles_and_duplicates_are_rejected(self):
+        self._depend(self.build, self.design)
+        self._depend(self.ship, self.build)
+        response, data = self._depend(self.design, self.ship)
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(data['cycle'], [self.design, self.ship, self.build, self.design])
+        self.assertEqual(self._depend(self.ship, self.build)[0].status_code, 409)
+        self.assertEqual(self._depend(self.ship, self.ship)[0].status_code, 409)
+        self.assertEqual(self._depend(self.ship, 999)[0].status_code, 404)
+        self.assertEqual(self._depend(self.ship, 'x')[0].status_code, 400)
+        self.assertEqual(len(self._graph()['edges']), 2)
+
+    def test_cycle_check_reads_only_reachable_edges(self):
+        self._depend(self.build, self.design)
+        statements = []
+        with app.app_context():
+            engine = db.engine
+        listener = lambda conn, cursor, statement, *args: statements.append(statement)
+        event.listen(engine, 'before_cursor_execute', listener)
+        try:
+            self.assertEqual(self._depend(self.ship, self.build)[0].status_code, 201)
+        finally:
+            event.remove(engine, 'before_cursor_execute', listener)
+        reads = [s for s in statements if s.lstrip().startswith(('SELECT', 'WITH')) and 'task_dependencies' in s]
+        self.assertEqual(len(reads), 1)
+        self.assertIn('WITH RECURSIVE', reads[0])
+        self.assertFalse([s for s in statements if 'collection_versions' in s and not s.startswith('UPDATE')])
+
+    def test_duplicate_edges_violate_the_schema(self):
+        self._depend(self.build, self.design)
+        with app.app_context():
+            db.session.add(TaskDependency(task_id=self.build, depends_on_id=self.design))
+            with self.assertRaises(IntegrityError):
+                db.session.commit()
+            db.session.rollback()
+
+    def test_reachable_edges_stop_on_existing_cycles(self):
+        with app.app_context():
+            db.session.add_all([TaskDependency(task_id=self.build, depends_on_id=self.design),
+                                TaskDependency(task_id=self.design, depends_on_id=self.build),
+                                TaskDependency(task_id=self.ship, depends_on_id=self.legal)])
+            db.session.commit()
+            self.assertEqual(sorted(reachable_edges(self.build)),
+                             sorted([(self.build, self.design), (self.design, self.build)]))
+
+    def test_graph_is_one_query_and_cached_until_a_write(self):
+        self._depend(self.build, self.design)
+        statements = []
+        with app.app_context():
+            engine = db.engine
+        listener = lambda conn, cursor, statement, *args: statements.append(statement)
+        event.listen(engine, 'before_cursor_execute', listener)
+        try:
+            self._graph()
+            first = [s for s in statements if 'collection_versions' not in s]
+            self._graph()
+            second = [s for s in statements if 'collection_versions' not in s]
+        finally:
+            event.remove(engine, 'before_cursor_execute', listener)
+        self.assertEqual(len(first), 1)
+        self.assertEqual(len(second), 1)
+
+        self._depend(self.ship, self.build)
+        self.assertEqual(self._graph()['blocked'], [self.ship])
+
+
+if __name__ == '__main__':
+    unittest.main()
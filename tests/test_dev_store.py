@@ -0,0 +1,176 @@
+import os
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+
+from flask import json
+
+from dev_store import DevStore, MemoryDevStore, SqliteDevStore
+
+
+class DevStoreContract:
+    """Behaviour both dev store backends must share"""
+
+    def make_store(self):
+        raise NotImplementedError
+
+    def setUp(self):
+        self.store = self.make_store()
+        self.store.seed()
+
+    def test_seed_once(self):
+        self.store.seed()
+        self.assertEqual([p['name'] for p in self.store.list_projects()], ['Sample Project'])
+        self.assertEqual([t['title'] for t in self.store.list_tasks()], ['Sample Task'])
+
+    def test_task_lifecycle_and_project_index(self):
+        task = self.store.create_task({'title': 'Write', 'project_id': '1'})
+        self.assertEqual(task['id'], 2)
+        self.assertEqual([t['id'] for t in self.store.list_tasks(project_id=1)], [1, 2])
+        self.store.update_task(2, {'project_id': None, 'status': 'in_progress', 'unknown': 'ignored'})
+        self.assertEqual([t['id'] for t in self.store.list_tasks(project_id=1)], [1])
+        self.assertEqual(self.store.get_task(2)['status'], 'in_progress')
+        self.assertNotIn('unknown', self.store.get_task(2))
+        self.assertIsNone(self.store.update_task(99, {'title': 'x'}))
+
+        self.assertTrue(self.store.delete_project(1))
+        self.assertFalse(self.store.delete_project(1))
+        self.assertEqual([t['project_id'] for t in self.store.list_tasks()], [None, None])
+
+    def test_returned_records_are_copies(self):
+        task = self.store.get_task(1)
+        task['title'] = 'Changed locally'
+        self.assertEqual(self.store.get_task(1)['title'], 'Sample Task')
+
+    def test_subtasks_by_task(self):
+        first = self.store.create_subtask(1, 'One')
+        self.store.create_subtask(1, 'Two')
+        other = self.store.create_task({'title': 'Other'})
+        self.store.create_subtask(other['id'], 'Elsewhere')
+        self.assertEqual([s['title'] for s in self.store.list_subtasks(1)], ['One', 'Two'])
+        self.assertTrue(self.store.toggle_subtask(first['id'])['completed'])
+        self.assertFalse(self.store.toggle_subtask(first['id'])['completed'])
+        self.assertIsNone(self.store.toggle_subtask(99))
+        self.store.delete_task(1)
+        self.assertEqual(self.store.list_subtasks(1), [])
+        self.assertEqual(len(self.store.list_subtasks(other['id'])), 1)
+
+    def test_activity_and_notifications_newest_first(self):
+        self.store.record_activity('task_created', 'a', 1)
+        self.store.record_activity('task_updated', 'b', 1)
+        self.assertEqual([a['message'] for a in self.store.list_activity()], ['b', 'a'])
+        first = self.store.add_notification('First')
+        self.store.add_notification('Second')
+        self.store.save_notifications([dict(first, read=True)])
+        self.assertEqual([(n['title'], n['read']) for n in self.store.list_notifications()],
+                         [('Second', False), ('First', True)])
+        self.store.remove_notifications([first['id']])
+        self.assertEqual(len(self.store.list_notifications()), 1)
+
+
+class TestMemoryDevStore(DevStoreContract, unittest.TestCase):
+    def make_store(self):
+        return MemoryDevStore()
+
+
+class TestIncompleteDevStore(unittest.TestCase):
+    def test_missing_primitive_fails_at_creation(self):
+        class NoRemove(DevStore):
+            _get = _all = _by = _save = _next_id = lambda self, *args: None
+
+        with self.assertRaisesRegex(TypeError, '_remove'):
+            NoRemove()
+
+
+class TestSqliteDevStore(DevStoreContract, unittest.TestCase):
+    def make_store(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        return SqliteDevStore(os.path.join(directory, 'dev.db'))
+
+    def test_failed_transaction_rolls_back(self):
+        with self.assertRaises(RuntimeError):
+            with self.store.transaction():
+                self.store.create_task({'title': 'Half done'})
+                raise RuntimeError
+        self.assertEqual(len(self.store.list_tasks()), 1)
+
+
+class TestDevModeRoutes(unittest.TestCase):
+    def setUp(self):
+        with mock.patch.dict(os.environ, {'SKIP_DB': '1'}):
+            from config import create_app
+            self.app = create_app()
+        self.app.config['TESTING'] = True
+        self.client = self.app.test_client()
+
+    def tearDown(self):
+        self.app.extensions['taskwise_scheduler'].stop()
+
+    def _send(self, method, url, payload=None):
+        response = self.client.open(url, method=method, data=json.dumps(payload or {}), content_type='application/json')
+        return response, json.loads(response.data)
+
+    def test_writes_stay_on_the_server(self):
+        response, data = self._send('POST', '/api/tasks', {'title': 'Dev task', 'project_id': 1})
+        self.assertEqual(response.status_code, 201)
+        task_id = data['task']['id']
+        # Nothing about the data goes into the cookie
+        self.assertNotIn('Set-Cookie', response.headers)
+        _, data = self._send('POST', f'/api/tasks/{task_id}/subtasks', {'title': 'Step'})
+        _, toggled = self._send('PUT', f"/api/subtasks/{data['subtask']['id']}/toggle")
+        self.assertTrue(toggled['subtask']['completed'])
+        self.assertEqual(len(self._send('GET', f'/api/tasks/{task_id}/subtasks')[1]['subtasks']), 1)
+        self.assertEqual([a['event_type'] for a in self._send('GET', '/api/activity')[1]['activities']],
+                         ['subtask_toggled', 'subtask_created', 'task_created'])
+
+        # Another client sees the same data, like with the database
+        other = self.app.test_client()
+        self.assertEqual(json.loads(other.get(f'/api/tasks/{task_id}').data)['task']['title'], 'Dev task')
+
+        self.assertEqual(self._send('DELETE', '/api/projects/1')[0].status_code, 200)
+        self.assertIsNone(self._send('GET', f'/api/tasks/{task_id}')[1]['task']['project_id'])
+        self.assertEqual(self._send('DELETE', f'/api/tasks/{task_id}')[0].status_code, 200)
+        self.assertEqual(self._send('GET', f'/api/tasks/{task_id}')[0].status_code, 404)
+
+    def test_batch_and_notifications(self):
+        _, data = self._send('POST', '/api/tasks/batch', {'operations': [
+            {'op': 'create', 'data': {'title': 'A'}},
+            {'op': 'update', 'id': 1, 'data': {'status': 'completed'}},
+            {'op': 'delete', 'id': 42},
+        ]})
+        self.assertEqual((data['applied'], data['failed']), (2, 1))
+        self.assertEqual(data['results'][0]['id'], 2)
+        self.assertEqual(self._send('GET', '/api/tasks/1')[1]['task']['status'], 'completed')
+
+        self._send('POST', '/api/notifications/add', {'title': 'Hello'})
+        self.assertEqual(self._send('GET', '/api/notifications/unread_count')[1]['unread'], 1)
+        self._send('POST', '/api/notifications/mark_read', {'all': True})
+        self.assertEqual(self._send('POST', '/api/notifications/delete', {'all': True, 'read': True})[1]['deleted'], 1)
+
+    def test_failed_notification_writes_leave_the_db_session_alone(self):
+        from config import db
+        store = self.app.extensions['taskwise_dev_store']
+        failing = mock.Mock(side_effect=RuntimeError('store unavailable'))
+        with mock.patch.object(store, 'add_notification', failing), \
+                mock.patch.object(store, 'save_notifications', failing), \
+                mock.patch.object(store, 'remove_notifications', failing), \
+                mock.patch.object(db.session, 'rollback') as rollback:
+            for url in ('/api/notifications/add', '/api/notifications/mark_read', '/api/notifications/delete'):
+                response, data = self._send('POST', url, {'all': True})
+                self.assertEqual((response.status_code, data['error']), (500, 'store unavailable'), url)
+        rollback.assert_not_called()
+
+    def test_legacy_cookie_data_is_dropped(self):
+        with self.client.session_transaction() as sess:
+            sess['user_id'] = 1
+            sess['dev_tasks'] = [{'id': 1}]
+            sess['subtasks_1'] = []
+        self.client.get('/api/tasks')
+        with self.client.session_transaction() as sess:
+            self.assertEqual(dict(sess), {'user_id': 1})
+
+
+if __name__ == '__main__':
+    unittest.main()
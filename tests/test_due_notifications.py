@@ -0,0 +1,132 @@
+import os
+import unittest
+from datetime import datetime, timedelta
+from unittest import mock
+
+from flask import json
+from sqlalchemy import event
+
+from app import app
+from due_notifications import scan_due_tasks
+from models import db, Task, TaskStatus, User, Notification, NotificationScan
+
+
+class TestDueNotifications(unittest.TestCase):
+    def setUp(self):
+        app.config['TESTING'] = True
+        self.client = app.test_client()
+        self.now = datetime(2024, 6, 1, 12, 0)
+        with app.app_context():
+            db.create_all()
+
+    def tearDown(self):
+        with app.app_context():
+            db.session.remove()
+            db.drop_all()
+
+    def _task(self, title, due_in, **kw):
+        task = Task(title=title, due_date=self.now + due_in, updated_at=self.now - timedelta(days=7), **kw)
+        db.session.add(task)
+        db.session.commit()
+        return task.id
+
+    def _kinds(self):
+        return sorted((n.task_id, n.kind) for n in Notification.query)
+
+    def test_first_scan_notifies_each_task_once_for_its_current_window(self):
+        with app.app_context():
+            overdue = self._task('Late', -timedelta(hours=2))
+            soon = self._task('Soon', timedelta(minutes=30))
+            tomorrow = self._task('Tomorrow', timedelta(hours=20))
+            self._task('Next week', timedelta(days=7))
+            self._task('Ancient', -timedelta(days=30))
+            self._task('Done', timedelta(minutes=10), status=TaskStatus.COMPLETED)
+
+            scan = scan_due_tasks(now=self.now)
+            self.assertEqual(scan.notifications_created, 3)
+            self.assertEqual(self._kinds(), sorted([(overdue, 'overdue'), (soon, 'due_hour'), (tomorrow, 'due_day')]))
+            self.assertEqual(Notification.query.filter_by(task_id=overdue).one().message,
+                             '"Late" is overdue! Please complete it as soon as possible.')
+
+            # Rescanning the same instant or a minute later creates nothing new
+            self.assertEqual(scan_due_tasks(now=self.now).notifications_created, 0)
+            self.assertEqual(scan_due_tasks(now=self.now + timedelta(minutes=1)).notifications_created, 0)
+
+    def test_later_scans_pick_up_tasks_entering_windows(self):
+        with app.app_context():
+            task_id = self._task('Approaching', timedelta(hours=1, minutes=30))
+            scan_due_tasks(now=self.now)
+            self.assertEqual(self._kinds(), [(task_id, 'due_day')])
+            scan_due_tasks(now=self.now + timedelta(minutes=45))
+            scan_due_tasks(now=self.now + timedelta(hours=2))
+            self.assertEqual(self._kinds(), [(task_id, 'due_day'), (task_id, 'due_hour'), (task_id, 'overdue')])
+            self.assertEqual(NotificationScan.query.count(), 3)
+
+    def test_moving_a_due_date_into_a_window_is_noticed(self):
+        with app.app_context():
+            task_id = self._task('Far away', timedelta(days=10))
+            scan_due_tasks(now=self.now)
+            task = db.session.get(Task, task_id)
+            task.due_date = self.now + timedelta(hours=3)
+            task.updated_at = self.now + timedelta(minutes=1)
+            db.session.commit()
+            scan_due_tasks(now=self.now + timedelta(minutes=2))
+            self.assertEqual(self._kinds(), [(task_id, 'due_day')])
+
+    def test_every_user_gets_a_copy(self):
+        with app.app_context():
+            for name in ('ann', 'bo'):
+                user = User(username=name, email=f'{name}@example.com')
+                user.set_password('x')
+                db.session.add(user)
+            self._task('Shared', -timedelta(minutes=5))
+            scan_due_tasks(now=self.now)
+            self.assertEqual(sorted(n.user_id for n in Notification.query), [1, 2])
+
+    def test_scan_is_one_task_query(self):
+        with app.app_context():
+            self._task('Late', -timedelta(hours=2))
+            statements = []
+            listener = lambda conn, cursor, statement, *args: statements.append(statement)
+            event.listen(db.engine, 'before_cursor_execute', listener)
+            try:
+                scan_due_tasks(now=self.now)
+            finally:
+                event.remove(db.engine, 'before_cursor_execute', listener)
+            task_selects = [s for s in statements if s.lstrip().startswith('SELECT') and 'FROM tasks' in s]
+            self.assertEqual(len(task_selects), 1)
+
+    def test_api_lists_counts_and_marks_read(self):
+        with app.app_context():
+            self._task('Late', -timedelta(hours=2))
+            scan_due_tasks(now=self.now)
+        count = json.loads(self.client.get('/api/notifications/unread_count').data)
+        self.assertEqual(count['unread'], 1)
+        (notif,) = json.loads(self.client.get('/api/notifications').data)['notifications']
+        self.assertEqual(notif['kind'], 'overdue')
+        self.client.post('/api/notifications/mark_read', data=json.dumps({'id': notif['id']}), content_type='application/json')
+        self.assertEqual(json.loads(self.client.get('/api/notifications/unread_count').data)['unread'], 0)
+        self.client.post('/api/notifications/delete', data=json.dumps({'id': notif['id']}), content_type='application/json')
+        self.assertEqual(json.loads(self.client.get('/api/notifications').data)['notifications'], [])
+
+
+class TestBackgroundJobs(unittest.TestCase):
+    def _jobs(self, **env):
+        with mock.patch.dict(os.environ, {'DATABASE_URL': 'sqlite://', **env}):
+            from config import create_app
+            scheduler = create_app().extensions['taskwise_scheduler']
+        scheduler.stop()
+        return [job['name'] for job in scheduler.jobs]
+
+    def test_plain_app_starts_no_scheduler_thread(self):
+        self.assertEqual(self._jobs(), [])
+        self.assertIsNone(app.extensions['taskwise_scheduler']._thread)
+
+    def test_scan_is_off_unless_configured(self):
+        self.assertNotIn('due_notifications', self._jobs())
+        self.assertIn('due_notifications', self._jobs(DUE_NOTIFY_INTERVAL_SECONDS='60'))
+
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,50 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+from flask import Flask
+from sqlalchemy import create_engine, text
+
+from engine_profiles import apply_engine_profile, install_connect_hooks, profile_settings
+
+
+class TestEngineProfiles(unittest.TestCase):
+    def _sqlite_engine(self, profile):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        url = f"sqlite:///{os.path.join(directory, 'profile.db')}"
+        engine = create_engine(url)
+        self.addCleanup(engine.dispose)
+        install_connect_hooks(engine, profile, profile_settings(profile, url))
+        return engine
+
+    def _pragmas(self, engine):
+        with engine.connect() as conn:
+            return {name: conn.execute(text(f'PRAGMA {name}')).scalar()
+                    for name in ('journal_mode', 'synchronous', 'busy_timeout')}
+
+    def test_sqlite_pragmas_applied_on_connect(self):
+        self.assertEqual(self._pragmas(self._sqlite_engine('balanced')),
+                         {'journal_mode': 'wal', 'synchronous': 1, 'busy_timeout': 5000})
+        self.assertEqual(self._pragmas(self._sqlite_engine('durable'))['synchronous'], 2)
+        self.assertEqual(self._pragmas(self._sqlite_engine('default'))['journal_mode'], 'delete')
+
+    def test_mysql_pool_options(self):
+        app = Flask(__name__)
+        app.config.update(SQLALCHEMY_DATABASE_URI='mysql+pymysql://u:p@localhost/taskwise',
+                          DB_ENGINE_PROFILE='balanced')
+        settings = apply_engine_profile(app)
+        options = app.config['SQLALCHEMY_ENGINE_OPTIONS']
+        self.assertEqual((options['pool_size'], options['max_overflow']), (10, 20))
+        self.assertTrue(options['pool_pre_ping'])
+        self.assertEqual(settings['session'], {'max_execution_time': 30000})
+        self.assertEqual(app.extensions['taskwise_engine_profile']['name'], 'balanced')
+
+    def test_unknown_profile(self):
+        with self.assertRaises(ValueError):
+            profile_settings('turbo', 'sqlite://')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,133 @@
+import unittest
+
+from flask import json
+from sqlalchemy import event
+
+from app import app
+from models import db, Task, Project, CollectionVersion
+
+
+class TestConditionalRequests(unittest.TestCase):
+    def setUp(self):
+        app.config['TESTING'] = True
+        self.client = app.test_client()
+        with app.app_context():
+            db.create_all()
+            project = Project(name='Versioned')
+            db.session.add(project)
+            db.session.flush()
+            task = Task(title='Watched', project_id=project.id)
+            db.session.add(task)
+            db.session.commit()
+            self.project_id, self.task_id = project.id, task.id
+
+    def tearDown(self):
+        with app.app_context():
+            db.session.remove()
+            db.drop_all()
+
+    def _revalidate(self, url):
+        first = self.client.get(url)
+        self.assertEqual(first.status_code, 200)
+        etag = first.headers['ETag']
+        return etag, self.client.get(url, headers={'If-None-Match': etag})
+
+    def test_unchanged_collections_answer_304(self):
+        for url in ('/api/tasks', '/api/projects', '/api/stats', '/api/activity'):
+            etag, second = self._revalidate(url)
+            self.assertEqual(second.status_code, 304, url)
+            self.assertEqual(second.data, b'')
+            self.assertEqual(second.headers['ETag'], etag)
+            self.assertEqual(second.headers['Cache-Control'], 'no-cache')
+
+    def test_304_reads_only_the_version_counter(self):
+        etag = self.client.get('/api/tasks').headers['ETag']
+        statements = []
+        with app.app_context():
+            engine = db.engine
+        listener = lambda conn, cursor, statement, *args: statements.append(statement)
+        event.listen(engine, 'before_cursor_execute', listener)
+        try:
+            response = self.client.get('/api/tasks', headers={'If-None-Match': etag})
+        finally:
+            event.remove(engine, 'before_cursor_execute', listener)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(len(statements), 1)
+        self.assertIn('collection_versions', statements[0])
+
+    def test_etag_depends_on_query(self):
+        self.assertNotEqual(self.client.get('/api/tasks').headers['ETag'],
+                            self.client.get('/api/tasks?status=todo').headers['ETag'])
+
+    def _changes_etag(self, url, write):
+        etag = self.client.get(url).headers['ETag']
+        write()
+        response = self.client.get(url, headers={'If-None-Match': etag})
+        self.assertEqual(response.status_code, 200, url)
+        self.assertNotEqual(response.headers['ETag'], etag)
+
+    def test_task_writes_change_tasks_and_projects(self):
+        update = lambda: self.client.put(f'/api/tasks/{self.task_id}', data=json.dumps({'title': 'Renamed'}),
+                                         content_type='application/json')
+        self._changes_etag('/api/tasks', update)
+        self._changes_etag('/api/projects', update)
+        self._changes_etag('/api/activity', update)
+
+    def test_related_writes_change_tasks(self):
+        self._changes_etag('/api/tasks', lambda: self.client.post(
+            f'/api/tasks/{self.task_id}/subtasks', data=json.dumps({'title': 'Step'}), content_type='application/json'))
+        self._changes_etag('/api/tasks', lambda: self.client.put(
+            f'/api/projects/{self.project_id}', data=json.dumps({'name': 'Renamed'}), content_type='application/json'))
+
+    def test_bulk_writes_change_tasks(self):
+        self._changes_etag('/api/tasks', lambda: self.client.post(
+            '/api/tasks/batch', data=json.dumps({'operations': [{'op': 'update', 'id': self.task_id, 'data': {'priority': 'high'}}]}),
+            content_type='application/json'))
+
+    def test_stats_etag_follows_figures(self):
+        etag = self.client.get('/api/stats').headers['ETag']
+        self.client.post('/api/tasks', data=json.dumps({'title': 'More'}), content_type='application/json')
+        response = self.client.get('/api/stats', headers={'If-None-Match': etag})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(json.loads(response.data)['stats']['total_tasks'], 2)
+
+    def test_counters_are_bumped_last_in_the_writing_transaction(self):
+        log = []
+        with app.app_context():
+            engine = db.engine
+        on_statement = lambda conn, cursor, statement, *args: log.append(statement.split()[0:2])
+        on_commit = lambda conn: log.append(['COMMIT'])
+        event.listen(engine, 'before_cursor_execute', on_statement)
+        event.listen(engine, 'commit', on_commit)
+        try:
+            self.client.put(f'/api/tasks/{self.task_id}', json={'title': 'Renamed'})
+        finally:
+            event.remove(engine, 'before_cursor_execute', on_statement)
+            event.remove(engine, 'commit', on_commit)
+        bumps = [i for i, entry in enumerate(log) if entry == ['UPDATE', 'collection_versions']]
+        self.assertTrue(bumps)
+        # One commit; the counter rows are locked only between the bumps and that commit
+        self.assertEqual(log.count(['COMMIT']), 1)
+        self.assertEqual(bumps, list(range(bumps[0], bumps[-1] + 1)))
+        self.assertEqual(log[bumps[-1] + 1], ['COMMIT'])
+
+    def test_rolled_back_write_bumps_nothing(self):
+        with app.app_context():
+            before = CollectionVersion.query.filter_by(name='tasks').one().version
+            db.session.get(Task, self.task_id).title = 'Abandoned'
+            db.session.flush()
+            db.session.rollback()
+            db.session.commit()
+            self.assertEqual(CollectionVersion.query.filter_by(name='tasks').one().version, before)
+
+    def test_missing_counter_disables_etags(self):
+        with app.app_context():
+            CollectionVersion.query.filter_by(name='tasks').delete()
+            db.session.commit()
+        response = self.client.get('/api/tasks')
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn('ETag', response.headers)
+
+
+if __name__ == '__main__':
+    unittest.main()
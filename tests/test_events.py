@@ -0,0 +1,136 @@
+import unittest
+
+from flask import json
+
+from app import app
+from events import EventBroadcaster, broadcaster
+from models import db, Task
+
+
+def _take(stream, count):
+    return [next(stream) for _ in range(count)]
+
+
+class TestEventBroadcaster(unittest.TestCase):
+    def test_resume_replays_missed_events(self):
+        hub = EventBroadcaster()
+        first = hub.publish('task', {'action': 'created', 'id': 1})
+        hub.publish('task', {'action': 'updated', 'id': 1})
+        stream = hub.stream(first)
+        retry, event = _take(stream, 2)
+        self.assertEqual(retry, 'retry: 3000\n\n')
+        self.assertEqual(event, f'id: {hub.epoch}-2\nevent: task\ndata: {{"action":"updated","id":1}}\n\n')
+        self.assertEqual(hub.subscribers, 1)
+        stream.close()
+        self.assertEqual(hub.subscribers, 0)
+
+    def test_new_connection_starts_at_the_head(self):
+        hub = EventBroadcaster()
+        hub.publish('task', {'action': 'created', 'id': 1})
+        stream = hub.stream(keepalive=0)
+        self.assertEqual(_take(stream, 2)[1], ': keepalive\n\n')
+        stream.close()
+
+    def test_unknown_epoch_or_evicted_events_reset(self):
+        hub = EventBroadcaster(buffer_size=2)
+        for i in range(4):
+            hub.publish('project', {'action': 'updated', 'id': i})
+        for last_event_id in ('stale-1', f'{hub.epoch}-1', f'{hub.epoch}-99'):
+            stream = hub.stream(last_event_id)
+            self.assertEqual(_take(stream, 2)[1], f'id: {hub.epoch}-4\nevent: reset\ndata: {{}}\n\n')
+            stream.close()
+        # Still in the buffer: replayed, no reset
+        stream = hub.stream(f'{hub.epoch}-2')
+        self.assertIn('event: project', _take(stream, 2)[1])
+        stream.close()
+
+    def test_notifications_only_reach_their_recipient(self):
+        hub = EventBroadcaster()
+        start = f'{hub.epoch}-0'
+        hub.publish('notification', {'action': 'created', 'id': 1, 'user_id': 2}, user_id=2)
+        hub.publish('task', {'action': 'created', 'id': 7})
+        for user_id, expected in ((2, ['notification', 'task']), (3, ['task']), (None, ['task'])):
+            stream = hub.stream(start, keepalive=0, user_id=user_id)
+            chunks = _take(stream, len(expected) + 1)[1:]
+            self.assertEqual([chunk.split('\n')[1] for chunk in chunks], [f'event: {kind}' for kind in expected])
+            stream.close()
+
+    def test_stream_ends_after_its_duration(self):
+        hub = EventBroadcaster()
+        hub.publish('task', {'action': 'created', 'id': 1})
+        chunks = list(hub.stream(f'{hub.epoch}-0', duration=0))
+        self.assertEqual(len(chunks), 2)
+        self.assertEqual(hub.subscribers, 0)
+
+
+class TestChangeEvents(unittest.TestCase):
+    def setUp(self):
+        app.config['TESTING'] = True
+        self.client = app.test_client()
+        with app.app_context():
+            db.create_all()
+
+    def tearDown(self):
+        with app.app_context():
+            db.session.remove()
+            db.drop_all()
+
+    def _published_since(self, seq):
+        return [(kind, json.loads(payload)) for s, kind, payload, _ in broadcaster._events if s > seq]
+
+    def test_commit_publishes_and_rollback_does_not(self):
+        start = broadcaster._seq
+        with app.app_context():
+            db.session.add(Task(title='Discarded'))
+            db.session.flush()
+            db.session.rollback()
+            self.assertEqual(self._published_since(start), [])
+            task = Task(title='Kept')
+            db.session.add(task)
+            db.session.commit()
+            task.title = 'Renamed'
+            db.session.commit()
+            db.session.delete(task)
+            db.session.commit()
+        events = self._published_since(start)
+        self.assertEqual([(kind, data['action']) for kind, data in events],
+                         [('task', 'created'), ('task', 'updated'), ('task', 'deleted')])
+        self.assertEqual({data['id'] for _, data in events}, {task.id})
+
+    def test_api_writes_publish_task_and_activity_events(self):
+        start = broadcaster._seq
+        response = self.client.post('/api/tasks', data=json.dumps({'title': 'Announced'}), content_type='application/json')
+        self.assertEqual(response.status_code, 201)
+        kinds = [kind for kind, _ in self._published_since(start)]
+        self.assertIn('task', kinds)
+        self.assertIn('activity', kinds)
+
+    def test_route_resumes_from_last_event_id(self):
+        last_event_id = f'{broadcaster.epoch}-{broadcaster._seq}'
+        self.client.post('/api/tasks', data=json.dumps({'title': 'Streamed'}), content_type='application/json')
+        response = self.client.get('/api/events', headers={'Last-Event-ID': last_event_id})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.mimetype, 'text/event-stream')
+        self.assertEqual(response.headers['Cache-Control'], 'no-cache')
+        chunks = iter(response.response)
+        try:
+            first, second = (next(chunks) for _ in range(2))
+        finally:
+            response.close()
+        self.assertEqual(first, b'retry: 3000\n\n')
+        self.assertIn(b'"action":"created"', second)
+
+    def test_streams_past_the_limit_are_refused(self):
+        app.config['EVENTS_MAX_STREAMS'] = 1
+        self.addCleanup(app.config.__setitem__, 'EVENTS_MAX_STREAMS', 8)
+        first = self.client.get('/api/events')
+        try:
+            next(iter(first.response))
+            self.assertEqual(self.client.get('/api/events').status_code, 503)
+        finally:
+            first.close()
+        self.assertEqual(broadcaster.subscribers, 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
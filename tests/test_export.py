@@ -0,0 +1,66 @@
+import csv
+import io
+import unittest
+from datetime import timedelta
+
+from flask import json
+
+from app import app
+from export import iter_task_chunks
+from models import db, Task, Subtask, TimeEntry, TaskStatus
+
+
+class TestExport(unittest.TestCase):
+    def setUp(self):
+        app.config['TESTING'] = True
+        self.client = app.test_client()
+        with app.app_context():
+            db.create_all()
+            for i in range(5):
+                task = Task(title=f'Export {i}', status=TaskStatus.COMPLETED if i % 2 else TaskStatus.TODO)
+                db.session.add(task)
+                db.session.flush()
+                db.session.add(Subtask(parent_task_id=task.id, title=f'Sub {i}'))
+                db.session.add(TimeEntry(task_id=task.id, duration=timedelta(minutes=30)))
+            db.session.commit()
+
+    def tearDown(self):
+        with app.app_context():
+            db.session.remove()
+            db.drop_all()
+
+    def test_ndjson_export_streams_one_line_per_task(self):
+        response = self.client.get('/api/export')
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.is_streamed)
+        self.assertEqual(response.mimetype, 'application/x-ndjson')
+
+        lines = response.get_data(as_text=True).splitlines()
+        self.assertEqual(len(lines), 5)
+        first = json.loads(lines[0])
+        self.assertEqual(first['title'], 'Export 0')
+        self.assertEqual(len(first['subtasks']), 1)
+        self.assertEqual(len(first['time_entries']), 1)
+
+    def test_csv_export_has_typed_rows(self):
+        response = self.client.get('/api/export?format=csv&status=completed')
+        self.assertEqual(response.mimetype, 'text/csv')
+        rows = list(csv.DictReader(io.StringIO(response.get_data(as_text=True))))
+        types = [row['record_type'] for row in rows]
+        self.assertEqual(types.count('task'), 2)
+        self.assertEqual(types.count('subtask'), 2)
+        self.assertEqual(types.count('time_entry'), 2)
+
+    def test_chunks_are_bounded(self):
+        with app.app_context():
+            chunks = list(iter_task_chunks(chunk_size=2))
+        self.assertEqual([len(c) for c in chunks], [2, 2, 1])
+        ids = [t['id'] for c in chunks for t in c]
+        self.assertEqual(ids, sorted(ids))
+
+    def test_unknown_format_is_rejected(self):
+        self.assertEqual(self.client.get('/api/export?format=xml').status_code, 400)
+
+
+if __name__ == '__main__':
+    unittest.main()
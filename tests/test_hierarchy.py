@@ -0,0 +1,99 @@
+import unittest
+
+from flask import json
+from sqlalchemy import event
+
+from app import app
+from models import db, Task, TaskStatus
+
+
+class TestTaskHierarchy(unittest.TestCase):
+    def setUp(self):
+        app.config['TESTING'] = True
+        self.client = app.test_client()
+        with app.app_context():
+            db.create_all()
+            self.ids = {}
+
+            def add(name, parent=None, **values):
+                task = Task(title=name, parent_task_id=self.ids.get(parent), **values)
+                db.session.add(task)
+                db.session.flush()
+                self.ids[name] = task.id
+
+            # epic ─┬─ design ─── mockups ─── review
+            #       └─ build
+            add('epic', estimated_hours=1, progress=0)
+            add('design', 'epic', estimated_hours=4, actual_hours=5, progress=100, status=TaskStatus.COMPLETED)
+            add('build', 'epic', estimated_hours=10, actual_hours=2, progress=20)
+            add('mockups', 'design', estimated_hours=2, progress=100, status=TaskStatus.COMPLETED)
+            add('review', 'mockups', progress=60)
+            add('unrelated', estimated_hours=50)
+            db.session.commit()
+
+    def tearDown(self):
+        with app.app_context():
+            db.session.remove()
+            db.drop_all()
+
+    def _get(self, url):
+        response = self.client.get(url)
+        return response.status_code, json.loads(response.data)
+
+    def test_subtree_with_rollups(self):
+        status, data = self._get(f"/api/tasks/{self.ids['epic']}/subtree")
+        self.assertEqual(status, 200)
+        by_title = {t['title']: t for t in data['tasks']}
+        self.assertEqual([t['title'] for t in data['tasks']], ['epic', 'design', 'build', 'mockups', 'review'])
+        self.assertEqual([t['depth'] for t in data['tasks']], [0, 1, 1, 2, 3])
+        self.assertEqual(data['rollup'], {'tasks': 5, 'completed': 2, 'progress': 56.0,
+                                          'estimated_hours': 17.0, 'actual_hours': 7.0})
+        self.assertEqual(by_title['design']['rollup'], {'tasks': 3, 'completed': 2, 'progress': 86.7,
+                                                        'estimated_hours': 6.0, 'actual_hours': 5.0})
+        self.assertEqual(by_title['review']['rollup']['tasks'], 1)
+        self.assertEqual(by_title['mockups']['parent_task_id'], self.ids['design'])
+
+    def test_depth_limit(self):
+        _, data = self._get(f"/api/tasks/{self.ids['epic']}/subtree?max_depth=1")
+        self.assertEqual([t['title'] for t in data['tasks']], ['epic', 'design', 'build'])
+        self.assertEqual(data['rollup']['tasks'], 3)
+        self.assertEqual(self._get(f"/api/tasks/{self.ids['epic']}/subtree?max_depth=-1")[0], 400)
+        self.assertEqual(self._get('/api/tasks/999/subtree')[0], 404)
+
+    def test_ancestors(self):
+        _, data = self._get(f"/api/tasks/{self.ids['review']}/ancestors")
+        self.assertEqual([(t['title'], t['depth']) for t in data['tasks']], [('mockups', 1), ('design', 2), ('epic', 3)])
+        _, data = self._get(f"/api/tasks/{self.ids['review']}/ancestors?max_depth=2")
+        self.assertEqual(len(data['tasks']), 2)
+        self.assertEqual(self._get(f"/api/tasks/{self.ids['epic']}/ancestors")[1]['tasks'], [])
+        self.assertEqual(self._get('/api/tasks/999/ancestors')[0], 404)
+
+    def test_subtree_is_one_query(self):
+        statements = []
+        with app.app_context():
+            engine = db.engine
+        listener = lambda conn, cursor, statement, *args: statements.append(statement)
+        event.listen(engine, 'before_cursor_execute', listener)
+        try:
+            self._get(f"/api/tasks/{self.ids['epic']}/subtree")
+        finally:
+            event.remove(engine, 'before_cursor_execute', listener)
+        self.assertEqual(len(statements), 1)
+        self.assertIn('WITH RECURSIVE', statements[0])
+
+    def test_reparenting_rejects_loops(self):
+        url = f"/api/tasks/{self.ids['design']}"
+        self.assertEqual(self.client.put(url, json={'parent_task_id': self.ids['review']}).status_code, 400)
+        self.assertEqual(self.client.put(url, json={'parent_task_id': self.ids['design']}).status_code, 400)
+        self.assertEqual(self.client.put(url, json={'parent_task_id': self.ids['unrelated']}).status_code, 200)
+        _, data = self._get(f"/api/tasks/{self.ids['unrelated']}/subtree")
+        self.assertEqual(data['rollup']['tasks'], 4)
+
+    def test_deleting_a_parent_detaches_children(self):
+        self.assertEqual(self.client.delete(f"/api/tasks/{self.ids['design']}").status_code, 200)
+        _, data = self._get(f"/api/tasks/{self.ids['mockups']}/ancestors")
+        self.assertEqual(data['tasks'], [])
+
+
+if __name__ == '__main__':
+    unittest.main()
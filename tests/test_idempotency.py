@@ -0,0 +1,88 @@
+import unittest
+from datetime import datetime, timedelta
+from unittest import mock
+
+from flask import json
+
+from app import app
+from idempotency import MemoryIdempotencyStore, DatabaseIdempotencyStore
+from models import db, Task, IdempotencyKey
+
+
+class TestMemoryIdempotencyStore(unittest.TestCase):
+    def test_lru_eviction_bounds_size(self):
+        store = MemoryIdempotencyStore(ttl=60, max_entries=2)
+        store.put('a', 1)
+        store.put('b', 2)
+        store.get('a')  # 'b' becomes least recently used
+        store.put('c', 3)
+        self.assertEqual(len(store), 2)
+        self.assertEqual(store.get('a'), 1)
+        self.assertIsNone(store.get('b'))
+
+    def test_expired_entries_are_ignored_and_purged(self):
+        store = MemoryIdempotencyStore(ttl=0)
+        store.put('a', 1)
+        self.assertIsNone(store.get('a'))
+        store.put('b', 2)
+        self.assertEqual(store.purge_expired(), 1)
+        self.assertEqual(len(store), 0)
+
+
+class TestIdempotentCreate(unittest.TestCase):
+    def setUp(self):
+        app.config['TESTING'] = True
+        self.client = app.test_client()
+        self.store = app.extensions['taskwise_idempotency']
+        with app.app_context():
+            db.create_all()
+
+    def tearDown(self):
+        with app.app_context():
+            db.session.remove()
+            db.drop_all()
+
+    def _create(self, token, title='Retried'):
+        return self.client.post('/api/tasks', data=json.dumps({'title': title, 'client_token': token}),
+                                content_type='application/json')
+
+    def test_retry_returns_original_task(self):
+        first = self._create('tok-1')
+        second = self._create('tok-1')
+        self.assertEqual(first.status_code, 201)
+        self.assertEqual(second.status_code, 200)
+        self.assertEqual(json.loads(first.data)['task']['id'], json.loads(second.data)['task']['id'])
+        with app.app_context():
+            self.assertEqual(Task.query.count(), 1)
+            self.assertEqual(IdempotencyKey.query.count(), 1)
+
+    def test_concurrent_duplicate_hits_unique_token(self):
+        # Simulate a retry on another worker that checked before the first one committed
+        first = json.loads(self._create('tok-race').data)['task']
+        with mock.patch.object(self.store, 'get', side_effect=[None, first['id']]):
+            response = self._create('tok-race')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(json.loads(response.data)['task']['id'], first['id'])
+        with app.app_context():
+            self.assertEqual(Task.query.count(), 1)
+
+    def test_token_of_deleted_task_can_be_reused(self):
+        task_id = json.loads(self._create('tok-2').data)['task']['id']
+        self.client.delete(f'/api/tasks/{task_id}')
+        response = self._create('tok-2', title='Again')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(json.loads(response.data)['task']['title'], 'Again')
+
+    def test_purge_removes_expired_tokens(self):
+        with app.app_context():
+            store = DatabaseIdempotencyStore(ttl=60)
+            store.put('live', 1)
+            db.session.add(IdempotencyKey(token='old', resource_id=2, expires_at=datetime.utcnow() - timedelta(seconds=1)))
+            db.session.commit()
+            self.assertIsNone(store.get('old'))
+            self.assertEqual(store.purge_expired(), 1)
+            self.assertEqual([k.token for k in IdempotencyKey.query], ['live'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,121 @@
+import unittest
+from datetime import datetime, timedelta
+
+from flask import json
+from sqlalchemy import event, text
+
+from app import app
+from models import db, Notification, NotificationCounter, User
+from notifications import add_notifications, unread_count, user_notifications
+
+
+class TestNotificationStore(unittest.TestCase):
+    def setUp(self):
+        app.config['TESTING'] = True
+        self.client = app.test_client()
+        with app.app_context():
+            db.create_all()
+            user = User(username='ann', email='ann@example.com')
+            user.set_password('secret')
+            db.session.add(user)
+            db.session.commit()
+            self.user_id = user.id
+            start = datetime(2024, 6, 1)
+            add_notifications([Notification(user_id=self.user_id, title=f'N{i}', created_at=start + timedelta(minutes=i))
+                               for i in range(5)])
+            # Someone else's notification must never be listed, counted or touched
+            add_notifications([Notification(user_id=None, title='Other')])
+            db.session.commit()
+        with self.client.session_transaction() as sess:
+            sess['user_id'] = self.user_id
+
+    def tearDown(self):
+        with app.app_context():
+            db.session.remove()
+            db.drop_all()
+
+    def _get(self, url):
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200, response.data)
+        return json.loads(response.data)
+
+    def _post(self, url, payload):
+        return self.client.post(url, data=json.dumps(payload), content_type='application/json')
+
+    def _unread(self):
+        return self._get('/api/notifications/unread_count')['unread']
+
+    def test_pages_newest_first(self):
+        first = self._get('/api/notifications?limit=2')
+        self.assertEqual([n['title'] for n in first['notifications']], ['N4', 'N3'])
+        self.assertEqual(first['unread'], 5)
+        second = self._get(f"/api/notifications?limit=2&cursor={first['next_cursor']}")
+        third = self._get(f"/api/notifications?limit=2&cursor={second['next_cursor']}")
+        self.assertEqual([n['title'] for n in second['notifications'] + third['notifications']], ['N2', 'N1', 'N0'])
+        self.assertIsNone(third['next_cursor'])
+        self.assertEqual(self.client.get('/api/notifications?cursor=bogus').status_code, 400)
+
+    def test_counter_follows_single_and_bulk_changes(self):
+        ids = [n['id'] for n in self._get('/api/notifications')['notifications']]
+        self.assertEqual(json.loads(self._post('/api/notifications/mark_read', {'id': ids[0]}).data)['updated'], 1)
+        self.assertEqual(self._unread(), 4)
+        # Already read: not counted twice
+        self._post('/api/notifications/mark_read', {'ids': ids[:2]})
+        self.assertEqual(self._unread(), 3)
+        self.assertEqual([n['title'] for n in self._get('/api/notifications?unread=1')['notifications']], ['N2', 'N1', 'N0'])
+
+        # Clearing read ones leaves the unread count alone; deleting an unread one lowers it
+        self.assertEqual(json.loads(self._post('/api/notifications/delete', {'all': True, 'read': True}).data)['deleted'], 2)
+        self.assertEqual(self._unread(), 3)
+        self._post('/api/notifications/delete', {'id': ids[2]})
+        self.assertEqual(self._unread(), 2)
+        self._post('/api/notifications/mark_read', {'all': True})
+        self.assertEqual(self._unread(), 0)
+        self._post('/api/notifications/add', {'title': 'Manual'})
+        self.assertEqual(self._unread(), 1)
+
+        with app.app_context():
+            # The other user's row is untouched and the counters agree with the rows
+            self.assertEqual(Notification.query.filter_by(user_id=None).count(), 1)
+            for counter in NotificationCounter.query:
+                owner = Notification.user_id.is_(None) if counter.user_key == 0 else Notification.user_id == counter.user_key
+                self.assertEqual(counter.unread, Notification.query.filter(owner, Notification.read.is_(False)).count())
+            self.assertEqual(unread_count(None), 1)
+
+    def test_bad_bulk_requests(self):
+        self.assertEqual(self._post('/api/notifications/mark_read', {}).status_code, 400)
+        self.assertEqual(self._post('/api/notifications/delete', {'ids': list(range(501))}).status_code, 400)
+        self.assertEqual(self._post('/api/notifications/delete', {'ids': ['x']}).status_code, 400)
+
+    def test_unread_count_is_one_key_lookup(self):
+        statements = []
+        with app.app_context():
+            engine = db.engine
+        listener = lambda conn, cursor, statement, *args: statements.append(statement)
+        event.listen(engine, 'before_cursor_execute', listener)
+        try:
+            self.assertEqual(self._unread(), 5)
+        finally:
+            event.remove(engine, 'before_cursor_execute', listener)
+        self.assertEqual(len(statements), 1)
+        self.assertIn('notification_counters', statements[0])
+
+    def test_list_and_unread_queries_use_indexes(self):
+        with app.app_context():
+            for unread_only in (False, True):
+                sql = user_notifications(self.user_id, unread_only).order_by(Notification.created_at.desc(), Notification.id.desc()).limit(50).statement
+                compiled = sql.compile(db.engine, compile_kwargs={'literal_binds': True})
+                plan = ' '.join(row[-1] for row in db.session.execute(text(f'EXPLAIN QUERY PLAN {compiled}')))
+                self.assertIn('USING INDEX ix_notifications_user_', plan)
+                self.assertNotIn('TEMP B-TREE', plan)
+
+    def test_legacy_cookie_list_is_dropped(self):
+        with self.client.session_transaction() as sess:
+            sess['notifications'] = [{'id': 1, 'title': 'old'}]
+        self._unread()
+        with self.client.session_transaction() as sess:
+            self.assertNotIn('notifications', sess)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,104 @@
+import unittest
+from datetime import datetime, timedelta
+
+from flask import json
+
+from app import app
+from models import db, Task, Activity
+from pagination import encode_cursor, decode_cursor, InvalidCursor
+
+
+class TestKeysetPagination(unittest.TestCase):
+    def setUp(self):
+        app.config['TESTING'] = True
+        self.client = app.test_client()
+        with app.app_context():
+            db.create_all()
+            base = datetime(2024, 1, 1, 12, 0, 0)
+            # Pairs of tasks share a created_at so the id tie-breaker is exercised
+            for i in range(7):
+                ts = base + timedelta(minutes=i // 2)
+                db.session.add(Task(title=f'Task {i}', created_at=ts, updated_at=ts))
+                db.session.add(Activity(event_type='task_created', message=f'Activity {i}', created_at=ts))
+            db.session.commit()
+
+    def tearDown(self):
+        with app.app_context():
+            db.session.remove()
+            db.drop_all()
+
+    def _walk(self, url, key):
+        seen, pages, cursor = [], 0, None
+        while True:
+            page_url = url + (f'&cursor={cursor}' if cursor else '')
+            data = json.loads(self.client.get(page_url).data)
+            self.assertTrue(data['success'])
+            seen.extend(item['id'] for item in data[key])
+            pages += 1
+            cursor = data['next_cursor']
+            if not cursor:
+                return seen, pages
+
+    def test_task_pages_cover_every_row_once(self):
+        ids, pages = self._walk('/api/tasks?limit=3&view=compact', 'tasks')
+        self.assertEqual(pages, 3)
+        self.assertEqual(len(ids), 7)
+        self.assertEqual(len(set(ids)), 7)
+
+        full = json.loads(self.client.get('/api/tasks?view=compact').data)
+        self.assertEqual(ids, [t['id'] for t in full['tasks']])
+
+    def test_task_pages_sorted_by_updated_at(self):
+        ids, _ = self._walk('/api/tasks?limit=2&sort=updated&view=compact', 'tasks')
+        self.assertEqual(len(set(ids)), 7)
+
+    def test_include_total(self):
+        data = json.loads(self.client.get('/api/tasks?limit=2&include_total=1').data)
+        self.assertEqual(data['count'], 2)
+        self.assertEqual(data['total'], 7)
+
+    def test_activity_pages(self):
+        ids, pages = self._walk('/api/activity?limit=4', 'activities')
+        self.assertEqual(pages, 2)
+        self.assertEqual(len(set(ids)), 7)
+
+    def test_bad_cursor_is_rejected(self):
+        self.assertEqual(self.client.get('/api/tasks?cursor=not-a-cursor').status_code, 400)
+        activity_cursor = encode_cursor('activity', datetime(2024, 1, 1), 1)
+        self.assertEqual(self.client.get(f'/api/tasks?cursor={activity_cursor}').status_code, 400)
+
+    def test_rows_without_a_timestamp_come_last(self):
+        with app.app_context():
+            for i in range(3):
+                db.session.add(Task(title=f'Undated {i}'))
+                db.session.add(Activity(event_type='task_created', message=f'Undated {i}'))
+            db.session.commit()
+            # Column defaults fill created_at on insert; clear it afterwards
+            Task.query.filter(Task.title.like('Undated%')).update({'created_at': None}, synchronize_session=False)
+            Activity.query.filter(Activity.message.like('Undated%')).update({'created_at': None},
+                                                                             synchronize_session=False)
+            db.session.commit()
+        for limit in (1, 2, 3, 4):
+            ids, _ = self._walk(f'/api/tasks?limit={limit}&view=compact', 'tasks')
+            full = json.loads(self.client.get('/api/tasks?view=compact').data)
+            self.assertEqual(ids, [t['id'] for t in full['tasks']])
+            self.assertEqual(ids[-3:], sorted(ids[-3:], reverse=True))
+            ids, _ = self._walk(f'/api/activity?limit={limit}', 'activities')
+            self.assertEqual(len(set(ids)), 10)
+
+    def test_bad_limit_is_rejected(self):
+        for url in ('/api/tasks', '/api/activity', '/api/notifications'):
+            response = self.client.get(f'{url}?limit=ten')
+            self.assertEqual(response.status_code, 400, url)
+            self.assertEqual(json.loads(response.data)['error'], 'limit must be an integer')
+
+    def test_cursor_round_trip(self):
+        cursor = encode_cursor('created', datetime(2024, 5, 6, 7, 8, 9), 42)
+        self.assertEqual(decode_cursor(cursor, 'created'), ('2024-05-06T07:08:09', 42))
+        with self.assertRaises(InvalidCursor):
+            decode_cursor(cursor, 'updated')
+        self.assertEqual(decode_cursor(encode_cursor('created', None, 7), 'created'), (None, 7))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,68 @@
+import random
+import unittest
+from datetime import timedelta
+
+from flask import json
+
+from app import app
+from models import db, Task, Subtask, TimeEntry, calculate_task_progress, calculate_progress_batch
+from models.progress_tracking import PROGRESS_BATCH_SIZE
+
+
+class TestProgressBatch(unittest.TestCase):
+    def setUp(self):
+        app.config['TESTING'] = True
+        self.client = app.test_client()
+        rng = random.Random(7)
+        with app.app_context():
+            db.create_all()
+            tasks = [Task(title=f'Task {n}', progress=rng.choice([0, 10, 35, 50, 100]),
+                          estimated_hours=rng.choice([None, 0, 0.5, 2, 8]))
+                     for n in range(PROGRESS_BATCH_SIZE + 40)]
+            db.session.add_all(tasks)
+            db.session.flush()
+            for task in tasks:
+                for n in range(rng.randint(0, 4)):
+                    db.session.add(Subtask(parent_task_id=task.id, title=f'Step {n}', completed=rng.random() < 0.5))
+                for _ in range(rng.randint(0, 3)):
+                    db.session.add(TimeEntry(task_id=task.id, duration=timedelta(minutes=rng.randint(1, 300))))
+            db.session.commit()
+
+    def tearDown(self):
+        with app.app_context():
+            db.session.remove()
+            db.drop_all()
+
+    def test_batch_matches_per_task_function(self):
+        with app.app_context():
+            tasks = Task.query.all()
+            expected = {task.id: calculate_task_progress(task) for task in tasks}
+            self.assertGreater(len(set(expected.values())), 5)
+            self.assertEqual(calculate_progress_batch(tasks), expected)
+            self.assertEqual(calculate_progress_batch(Task.query), expected)
+            self.assertEqual(calculate_progress_batch(list(expected)), expected)
+
+    def test_query_filters_and_limit_are_kept(self):
+        with app.app_context():
+            query = Task.query.filter(Task.estimated_hours > 1).order_by(Task.id.desc()).limit(25)
+            expected = {task.id: calculate_task_progress(task) for task in query}
+            self.assertEqual(len(expected), 25)
+            self.assertEqual(calculate_progress_batch(query), expected)
+            self.assertEqual(calculate_progress_batch([]), {})
+
+    def test_aggregates_ignore_rollup_drift(self):
+        with app.app_context():
+            task = Task.query.filter(Task.subtask_total > 0).first()
+            expected = calculate_task_progress(task)
+            db.session.execute(db.update(Task).where(Task.id == task.id).values(subtask_total=0, subtask_completed=0))
+            self.assertEqual(calculate_progress_batch([task.id]), {task.id: expected})
+
+    def test_list_endpoint_uses_the_same_values(self):
+        data = json.loads(self.client.get('/api/tasks?fields=calculated_progress&limit=50').data)
+        with app.app_context():
+            expected = calculate_progress_batch([t['id'] for t in data['tasks']])
+        self.assertEqual({t['id']: t['calculated_progress'] for t in data['tasks']}, expected)
+
+
+if __name__ == '__main__':
+    unittest.main()
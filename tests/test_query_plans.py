@@ -0,0 +1,121 @@
+import re
+import unittest
+from datetime import datetime, timedelta
+
+from sqlalchemy import event, text
+
+from app import app
+from models import db, Task, Project, Subtask, TimeEntry, TaskDependency, Activity
+from pagination import encode_cursor
+
+# Tables the request paths below must never read with a plain full scan
+INDEXED_TABLES = ('tasks', 'activities', 'subtasks', 'time_entries', 'task_dependencies')
+FULL_SCAN = re.compile(r'^SCAN (%s)$' % '|'.join(INDEXED_TABLES))
+
+
+class TestQueryPlans(unittest.TestCase):
+    """Run EXPLAIN QUERY PLAN on every statement an endpoint issues."""
+
+    def setUp(self):
+        app.config['TESTING'] = True
+        self.client = app.test_client()
+        with app.app_context():
+            db.create_all()
+            project = Project(name='Plans')
+            db.session.add(project)
+            db.session.flush()
+            now = datetime.utcnow()
+            tasks = [Task(title=f'Task {i}', project_id=project.id, created_at=now - timedelta(hours=i),
+                          due_date=now + timedelta(days=i)) for i in range(5)]
+            db.session.add_all(tasks)
+            db.session.flush()
+            db.session.add_all([
+                Subtask(parent_task_id=tasks[0].id, title='Sub', order=0),
+                TimeEntry(task_id=tasks[0].id, start_time=now, duration=timedelta(minutes=5)),
+                TaskDependency(task_id=tasks[0].id, depends_on_id=tasks[1].id),
+                Activity(event_type='task_created', message='created', task_id=tasks[0].id),
+            ])
+            db.session.commit()
+            self.project_id = project.id
+            self.task_id = tasks[0].id
+            self.subtask_id = tasks[0].subtasks[0].id
+            self.created_at = tasks[2].created_at
+
+    def tearDown(self):
+        with app.app_context():
+            db.session.remove()
+            db.drop_all()
+
+    def _statements(self, method, url, **kwargs):
+        captured = []
+
+        def capture(conn, cursor, statement, parameters, context, executemany):
+            if statement.lstrip().upper().startswith(('SELECT', 'UPDATE', 'DELETE')) and not executemany:
+                captured.append((statement, parameters))
+
+        with app.app_context():
+            engine = db.engine
+        event.listen(engine, 'before_cursor_execute', capture)
+        try:
+            response = getattr(self.client, method)(url, **kwargs)
+            response.get_data()  # streamed bodies run their queries lazily
+        finally:
+            event.remove(engine, 'before_cursor_execute', capture)
+        self.assertLess(response.status_code, 400, url)
+        return captured
+
+    def assertIndexed(self, method, url, **kwargs):
+        statements = self._statements(method, url, **kwargs)
+        self.assertTrue(statements, url)
+        with app.app_context():
+            conn = db.session.connection().connection.driver_connection
+            for statement, parameters in statements:
+                plan = [row[-1] for row in conn.execute(f'EXPLAIN QUERY PLAN {statement}', parameters)]
+                scans = [step for step in plan if FULL_SCAN.match(step)]
+                self.assertFalse(scans, f'{method.upper()} {url} scans a table:\n{statement}\n{plan}')
+
+    def test_task_listings(self):
+        cursor = encode_cursor('created', self.created_at, 999)
+        for url in (
+            '/api/tasks',
+            '/api/tasks?status=todo',
+            f'/api/tasks?project_id={self.project_id}',
+            '/api/tasks?sort=updated',
+            '/api/tasks?limit=2',
+            f'/api/tasks?limit=2&cursor={cursor}',
+            f'/api/tasks?limit=2&status=todo&cursor={cursor}',
+            '/api/tasks?month=2030-01',
+            '/api/tasks/recent',
+        ):
+            self.assertIndexed('get', url)
+
+    def test_single_task_and_children(self):
+        self.assertIndexed('get', f'/api/tasks/{self.task_id}')
+        self.assertIndexed('get', f'/api/tasks/{self.task_id}/subtasks')
+        self.assertIndexed('put', f'/api/subtasks/{self.subtask_id}/toggle')
+
+    def test_activity_feed(self):
+        self.assertIndexed('get', '/api/activity')
+        with app.app_context():
+            newest = Activity.query.first()
+            cursor = encode_cursor('activity', newest.created_at, newest.id + 1)
+        self.assertIndexed('get', f'/api/activity?cursor={cursor}')
+
+    def test_export(self):
+        self.assertIndexed('get', '/api/export?format=ndjson')
+        self.assertIndexed('get', f'/api/export?format=csv&project_id={self.project_id}')
+
+    def test_deletes(self):
+        self.assertIndexed('delete', f'/api/tasks/{self.task_id}')
+        self.assertIndexed('delete', f'/api/projects/{self.project_id}')
+
+    def test_declared_indexes_exist(self):
+        with app.app_context():
+            names = {row[0] for row in db.session.execute(text("SELECT name FROM sqlite_master WHERE type = 'index'"))}
+        for table in (Task, Activity, Subtask, TimeEntry, TaskDependency):
+            for index in table.__table__.indexes:
+                self.assertIn(index.name, names)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,92 @@
+import os
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+
+from flask import json
+
+from cache import stats_cache
+from models import db, Task
+from replicas import PRIMARY_COOKIE, replica_urls
+from sync_sqlite_replica import sync_replicas
+
+
+class TestReplicaRouting(unittest.TestCase):
+    """A primary and one replica as two SQLite files"""
+
+    def setUp(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        env = {'DATABASE_URL': f"sqlite:///{os.path.join(directory, 'primary.db')}",
+               'DATABASE_REPLICA_URLS': f"sqlite:///{os.path.join(directory, 'replica.db')}",
+               'ACTIVITY_MODE': 'sync'}
+        with mock.patch.dict(os.environ, env):
+            from config import create_app
+            self.app = create_app()
+        self.app.config['TESTING'] = True
+        self.app.extensions['taskwise_scheduler'].stop()
+        with self.app.app_context():
+            db.create_all()
+            db.session.add(Task(title='Replicated'))
+            db.session.commit()
+        # The replica starts as a copy of the primary, then falls behind
+        sync_replicas(self.app)
+        self.client = self.app.test_client()
+
+    def tearDown(self):
+        with self.app.app_context():
+            db.session.remove()
+            db.engine.dispose()
+        for engine in self.app.extensions['taskwise_replicas']:
+            engine.dispose()
+
+    def _titles(self, client):
+        return sorted(t['title'] for t in json.loads(client.get('/api/tasks').data)['tasks'])
+
+    def test_reads_go_to_the_replica_until_the_client_writes(self):
+        writer = self.client
+        reader = self.app.test_client()
+        response = writer.post('/api/tasks', json={'title': 'Fresh'})
+        self.assertEqual(response.status_code, 201)
+        self.assertIn(PRIMARY_COOKIE, response.headers['Set-Cookie'])
+
+        # The writer reads its own write from the primary
+        self.assertEqual(self._titles(writer), ['Fresh', 'Replicated'])
+        # Other clients read the (lagging) replica
+        self.assertEqual(self._titles(reader), ['Replicated'])
+        self.assertEqual(json.loads(reader.get(f"/api/tasks/{json.loads(response.data)['task']['id']}").data)['success'],
+                         False)
+
+        sync_replicas(self.app)
+        self.assertEqual(self._titles(reader), ['Fresh', 'Replicated'])
+
+    def test_expired_window_reads_the_replica(self):
+        self.client.post('/api/tasks', json={'title': 'Fresh'})
+        self.client.set_cookie(PRIMARY_COOKIE, '0')
+        self.assertEqual(self._titles(self.client), ['Replicated'])
+
+    def test_work_outside_requests_uses_the_primary(self):
+        self.client.post('/api/tasks', json={'title': 'Fresh'})
+        with self.app.app_context():
+            self.assertEqual(Task.query.count(), 2)
+
+    def test_stats_cached_from_the_replica_stay_with_replica_readers(self):
+        stats_cache.invalidate()
+        self.addCleanup(stats_cache.invalidate)
+        writer = self.client
+        reader = self.app.test_client()
+        writer.post('/api/tasks', json={'title': 'Fresh'})
+        total = lambda client: json.loads(client.get('/api/stats').data)['stats']['total_tasks']
+        # The reader caches the lagging replica's figures first
+        self.assertEqual(total(reader), 1)
+        self.assertEqual(total(writer), 2)
+        self.assertEqual(total(reader), 1)
+
+    def test_replica_urls(self):
+        self.assertEqual(replica_urls(' sqlite:///a.db, ,sqlite:///b.db '), ['sqlite:///a.db', 'sqlite:///b.db'])
+        self.assertEqual(replica_urls(None), [])
+
+
+if __name__ == '__main__':
+    unittest.main()
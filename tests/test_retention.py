@@ -0,0 +1,71 @@
+import gzip
+import json
+import os
+import shutil
+import tempfile
+import unittest
+from datetime import datetime, timedelta
+
+from app import app
+from models import db, Activity, ActivityArchive, RetentionRun
+from retention import apply_activity_retention
+
+
+class TestActivityRetention(unittest.TestCase):
+    def setUp(self):
+        app.config['TESTING'] = True
+        self.now = datetime(2024, 6, 1)
+        with app.app_context():
+            db.create_all()
+            db.session.add_all(
+                [Activity(event_type='task_updated', message=f'old {i}', created_at=self.now - timedelta(days=100 + i))
+                 for i in range(5)]
+                + [Activity(event_type='task_updated', message='recent', created_at=self.now - timedelta(days=1))]
+            )
+            db.session.commit()
+
+    def tearDown(self):
+        with app.app_context():
+            db.session.remove()
+            db.drop_all()
+
+    def test_table_policy_archives_in_batches(self):
+        with app.app_context():
+            run = apply_activity_retention(90, 'table', batch_size=2, now=self.now)
+            self.assertEqual((run.batches, run.rows_archived, run.rows_deleted), (3, 5, 5))
+            self.assertIsNotNone(run.finished_at)
+            self.assertEqual([a.message for a in Activity.query], ['recent'])
+            archives = ActivityArchive.query.order_by(ActivityArchive.id).all()
+            self.assertEqual([a.row_count for a in archives], [2, 2, 1])
+            # Oldest rows are retired first
+            self.assertEqual(archives[0].activities()[0]['message'], 'old 4')
+            self.assertEqual(run.archive_bytes, sum(len(a.payload) for a in archives))
+            self.assertEqual(RetentionRun.query.count(), 1)
+
+    def test_file_policy_writes_gzip_ndjson(self):
+        archive_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, archive_dir)
+        with app.app_context():
+            run = apply_activity_retention(90, 'file', batch_size=10, archive_dir=archive_dir, now=self.now)
+            self.assertEqual(run.rows_archived, 5)
+            self.assertEqual(ActivityArchive.query.count(), 0)
+        (name,) = os.listdir(archive_dir)
+        with gzip.open(os.path.join(archive_dir, name), 'rt') as f:
+            rows = [json.loads(line) for line in f]
+        self.assertEqual(len(rows), 5)
+
+    def test_delete_policy_and_nothing_to_do(self):
+        with app.app_context():
+            run = apply_activity_retention(90, 'delete', now=self.now)
+            self.assertEqual((run.rows_deleted, run.rows_archived), (5, 0))
+            again = apply_activity_retention(90, 'delete', now=self.now)
+            self.assertEqual((again.batches, again.rows_deleted), (0, 0))
+
+    def test_unknown_policy(self):
+        with app.app_context():
+            with self.assertRaises(ValueError):
+                apply_activity_retention(90, 'shred')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,87 @@
+import unittest
+from datetime import timedelta
+
+from flask import json
+
+from app import app
+from models import db, Task, Subtask, TimeEntry, recompute_task_rollups
+
+
+class TestTaskRollups(unittest.TestCase):
+    def setUp(self):
+        app.config['TESTING'] = True
+        self.client = app.test_client()
+        with app.app_context():
+            db.create_all()
+            task = Task(title='Rollup Task', estimated_hours=2.0)
+            db.session.add(task)
+            db.session.commit()
+            self.task_id = task.id
+
+    def tearDown(self):
+        with app.app_context():
+            db.session.remove()
+            db.drop_all()
+
+    def _rollups(self):
+        with app.app_context():
+            task = db.session.get(Task, self.task_id)
+            return task.subtask_total, task.subtask_completed, round(task.tracked_seconds, 3)
+
+    def test_subtask_routes_maintain_counts(self):
+        ids = []
+        for title in ('One', 'Two', 'Three'):
+            response = self.client.post(f'/api/tasks/{self.task_id}/subtasks',
+                                        data=json.dumps({'title': title}),
+                                        content_type='application/json')
+            ids.append(json.loads(response.data)['subtask']['id'])
+        self.assertEqual(self._rollups()[:2], (3, 0))
+
+        self.client.put(f'/api/subtasks/{ids[0]}/toggle')
+        self.client.put(f'/api/subtasks/{ids[1]}/toggle')
+        self.assertEqual(self._rollups()[:2], (3, 2))
+
+        self.client.put(f'/api/subtasks/{ids[1]}/toggle')
+        self.client.delete(f'/api/subtasks/{ids[0]}')
+        self.assertEqual(self._rollups()[:2], (2, 0))
+
+        task = json.loads(self.client.get(f'/api/tasks/{self.task_id}').data)['task']
+        self.assertEqual(task['subtask_count'], 2)
+        self.assertEqual(task['completed_subtasks'], 0)
+
+    def test_time_entries_maintain_tracked_seconds(self):
+        with app.app_context():
+            entry = TimeEntry(task_id=self.task_id, duration=timedelta(minutes=30))
+            db.session.add(entry)
+            db.session.add(TimeEntry(task_id=self.task_id, duration=timedelta(minutes=30)))
+            db.session.commit()
+            self.assertEqual(self._rollups()[2], 3600.0)
+
+            entry.duration = timedelta(minutes=90)
+            db.session.commit()
+            self.assertEqual(self._rollups()[2], 7200.0)
+
+            db.session.delete(entry)
+            db.session.commit()
+        self.assertEqual(self._rollups()[2], 1800.0)
+
+        task = json.loads(self.client.get(f'/api/tasks/{self.task_id}').data)['task']
+        self.assertEqual(task['total_time_spent'], '0:30:00')
+        # 0.5h of 2h estimated -> 25% * 0.3 weight
+        self.assertEqual(task['calculated_progress'], 8)
+
+    def test_recompute_repairs_drift(self):
+        with app.app_context():
+            db.session.add(Subtask(parent_task_id=self.task_id, title='Done', completed=True))
+            db.session.add(TimeEntry(task_id=self.task_id, duration=timedelta(seconds=90, milliseconds=500)))
+            db.session.commit()
+            db.session.execute(Task.__table__.update().values(subtask_total=99, subtask_completed=7, tracked_seconds=0))
+            db.session.commit()
+
+            recompute_task_rollups()
+            db.session.commit()
+        self.assertEqual(self._rollups(), (1, 1, 90.5))
+
+
+if __name__ == '__main__':
+    unittest.main()
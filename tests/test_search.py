@@ -0,0 +1,149 @@
+import unittest
+from unittest import mock
+
+from flask import json
+from sqlalchemy import event
+
+from app import app
+from models import db, Task, Project, Subtask, TaskStatus
+import search
+from search import ensure_search_index, fts5_query, boolean_query, query_terms
+
+
+class TestTaskSearch(unittest.TestCase):
+    def setUp(self):
+        app.config['TESTING'] = True
+        self.client = app.test_client()
+        with app.app_context():
+            db.create_all()
+            self.project_id = db.session.execute(db.insert(Project).values(name='Finance')).inserted_primary_key[0]
+            report = Task(title='Quarterly report', description='Numbers for the board', project_id=self.project_id)
+            notes = Task(title='Meeting notes', description='Mention the quarterly report draft')
+            invoices = Task(title='Close the books', status=TaskStatus.COMPLETED, project_id=self.project_id)
+            db.session.add_all([report, notes, invoices, Task(title='Unrelated chore')])
+            db.session.flush()
+            db.session.add(Subtask(parent_task_id=invoices.id, title='Collect invoices'))
+            db.session.commit()
+            self.ids = {'report': report.id, 'notes': notes.id, 'invoices': invoices.id}
+
+    def tearDown(self):
+        with app.app_context():
+            db.session.remove()
+            db.drop_all()
+
+    def _search(self, query):
+        response = self.client.get(f'/api/search?{query}')
+        return response.status_code, json.loads(response.data)
+
+    def _hit_ids(self, query):
+        status, data = self._search(query)
+        self.assertEqual(status, 200, data)
+        return [hit['id'] for hit in data['hits']]
+
+    def test_title_hits_rank_first(self):
+        status, data = self._search('q=quarterly+report')
+        self.assertEqual([hit['id'] for hit in data['hits']], [self.ids['report'], self.ids['notes']])
+        self.assertGreater(data['hits'][0]['score'], data['hits'][1]['score'])
+        self.assertEqual(set(data['hits'][0]), {'id', 'title', 'status', 'priority', 'due_date', 'card_color',
+                                                'project_id', 'score'})
+
+    def test_prefix_subtasks_and_filters(self):
+        self.assertEqual(self._hit_ids('q=invoi'), [self.ids['invoices']])
+        self.assertEqual(self._hit_ids('q=QUARTERLY'), [self.ids['report'], self.ids['notes']])
+        self.assertEqual(self._hit_ids(f'q=report&project_id={self.project_id}'), [self.ids['report']])
+        self.assertEqual(self._hit_ids('q=books&status=todo'), [])
+        self.assertEqual(self._hit_ids('q=books&status=completed'), [self.ids['invoices']])
+        self.assertEqual(self._hit_ids('q="report" OR NOT'), [])
+
+    def test_bad_requests(self):
+        self.assertEqual(self._search('q=')[0], 400)
+        self.assertEqual(self._search('q=%22*%22')[0], 400)
+        self.assertEqual(self._search('q=report&status=lost')[0], 400)
+        self.assertEqual(self._search('q=report&page=0')[0], 400)
+        self.assertEqual(self._search('q=report&page=1000')[0], 400)
+
+    def test_pagination(self):
+        with app.app_context():
+            db.session.execute(db.insert(Task), [{'title': f'Backlog item {n}'} for n in range(25)])
+            db.session.commit()
+        _, first = self._search('q=backlog&limit=10')
+        _, last = self._search('q=backlog&limit=10&page=3')
+        self.assertEqual((first['next_page'], last['next_page']), (2, None))
+        self.assertEqual(len(last['hits']), 5)
+        pages = [self._hit_ids(f'q=backlog&limit=10&page={page}') for page in (1, 2, 3)]
+        self.assertEqual(len(set(sum(pages, []))), 25)
+
+    def test_index_follows_writes(self):
+        created = json.loads(self.client.post('/api/tasks', json={'title': 'Plan offsite'}).data)['task']
+        self.assertEqual(self._hit_ids('q=offsite'), [created['id']])
+        self.client.put(f"/api/tasks/{created['id']}", json={'title': 'Plan retreat'})
+        self.assertEqual(self._hit_ids('q=offsite'), [])
+        self.assertEqual(self._hit_ids('q=retreat'), [created['id']])
+        self.client.post(f"/api/tasks/{created['id']}/subtasks", json={'title': 'Book venue'})
+        self.assertEqual(self._hit_ids('q=venue'), [created['id']])
+        with app.app_context():
+            subtask_id = Subtask.query.filter_by(title='Book venue').one().id
+        self.client.delete(f'/api/subtasks/{subtask_id}')
+        self.assertEqual(self._hit_ids('q=venue'), [])
+        self.client.delete(f"/api/tasks/{created['id']}")
+        self.assertEqual(self._hit_ids('q=retreat'), [])
+
+    def test_batch_writes_are_indexed(self):
+        response = self.client.post('/api/tasks/batch', json={'operations': [
+            {'op': 'create', 'data': {'title': 'Renew domain'}},
+            {'op': 'update', 'id': self.ids['notes'], 'data': {'description': 'Action items only'}},
+            {'op': 'delete', 'id': self.ids['report']},
+        ]})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(self._hit_ids('q=domain')), 1)
+        self.assertEqual(self._hit_ids('q=quarterly'), [])
+
+    def test_search_is_one_query(self):
+        statements = []
+        with app.app_context():
+            engine = db.engine
+        listener = lambda conn, cursor, statement, *args: statements.append(statement)
+        event.listen(engine, 'before_cursor_execute', listener)
+        try:
+            self._search('q=report')
+        finally:
+            event.remove(engine, 'before_cursor_execute', listener)
+        self.assertEqual(len(statements), 1)
+        self.assertIn('MATCH', statements[0])
+
+    def test_rebuild_restores_the_index(self):
+        with app.app_context():
+            db.session.execute(db.text('DELETE FROM task_search'))
+            self.assertEqual(ensure_search_index(rebuild=True), ['indexed 4 task(s)'])
+            db.session.commit()
+        self.assertEqual(self._hit_ids('q=invoices'), [self.ids['invoices']])
+
+    def test_words_may_spread_over_title_description_and_subtasks(self):
+        # 'books' is in the title, 'invoices' only in a subtask
+        self.assertEqual(self._hit_ids('q=invoices+books'), [self.ids['invoices']])
+        self.assertEqual(self._hit_ids('q=board+quarterly'), [self.ids['report']])
+
+    def test_ranking_window_is_reported(self):
+        _, data = self._search('q=quarterly')
+        self.assertEqual(data['ranking'], {'window': search.SEARCH_WINDOW, 'limited': False})
+        with mock.patch.object(search, 'SEARCH_WINDOW', 1):
+            _, data = self._search('q=quarterly')
+        # Only the newest match was ranked
+        self.assertTrue(data['ranking']['limited'])
+        self.assertEqual([hit['id'] for hit in data['hits']], [self.ids['notes']])
+
+    def test_mysql_query_ranks_the_same_window(self):
+        from sqlalchemy.dialects import mysql
+        sql = str(search._mysql_search(['quarterly', 'rep'], 1, None).compile(dialect=mysql.dialect()))
+        self.assertIn('MATCH (task_search.title, task_search.description, task_search.subtasks) AGAINST', sql)
+        self.assertIn('ORDER BY task_search.task_id DESC', sql)
+        self.assertIn('count(*) OVER ()', sql)
+
+    def test_query_syntax_is_neutralised(self):
+        self.assertEqual(query_terms('"quarterly" -report*'), ['quarterly', 'report'])
+        self.assertEqual(fts5_query(['quarterly', 'rep']), '"quarterly" "rep"*')
+        self.assertEqual(boolean_query(['quarterly', 'rep']), '+quarterly +rep*')
+
+
+if __name__ == '__main__':
+    unittest.main()
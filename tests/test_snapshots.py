@@ -0,0 +1,154 @@
+import unittest
+from datetime import datetime, timedelta
+
+from flask import json
+
+from app import app
+from models import db, Task, Project, TimeEntry, ProgressSnapshot, SnapshotRun, SnapshotChange, TaskStatus
+from snapshots import backfill_snapshots, refresh_snapshots
+
+
+class TestProgressSnapshots(unittest.TestCase):
+    def setUp(self):
+        app.config['TESTING'] = True
+        self.client = app.test_client()
+        self.today = datetime.utcnow().date()
+        with app.app_context():
+            db.create_all()
+            project = Project(name='Snap')
+            db.session.add(project)
+            db.session.flush()
+            self.project_id = project.id
+            start = datetime.combine(self.today - timedelta(days=4), datetime.min.time()) + timedelta(hours=9)
+            first = Task(title='First', project_id=project.id, created_at=start,
+                         status=TaskStatus.COMPLETED, completed_at=start + timedelta(days=2))
+            second = Task(title='Second', project_id=project.id, created_at=start + timedelta(days=1))
+            db.session.add_all([first, second])
+            db.session.flush()
+            db.session.add(TimeEntry(task_id=first.id, start_time=start + timedelta(days=1), duration=timedelta(hours=2)))
+            db.session.commit()
+
+    def tearDown(self):
+        with app.app_context():
+            db.session.remove()
+            db.drop_all()
+
+    def _rows(self):
+        rows = ProgressSnapshot.query.filter_by(project_id=self.project_id).order_by(ProgressSnapshot.date).all()
+        return [(r.date, r.total_tasks, r.completed_tasks, r.total_time_spent) for r in rows]
+
+    def test_first_refresh_backfills_cumulative_history(self):
+        with app.app_context():
+            run = refresh_snapshots(batch_days=2)
+            self.assertEqual(run.first_day, self.today - timedelta(days=4))
+            rows = self._rows()
+        self.assertEqual(len(rows), 5)
+        self.assertEqual([r[1] for r in rows], [1, 2, 2, 2, 2])
+        self.assertEqual([r[2] for r in rows], [0, 0, 1, 1, 1])
+        self.assertEqual(rows[0][3], timedelta())
+        self.assertEqual(rows[-1][3], timedelta(hours=2))
+
+    def test_incremental_refresh_only_rebuilds_touched_days(self):
+        with app.app_context():
+            refresh_snapshots()
+            run = refresh_snapshots()
+            self.assertEqual(run.first_day, self.today)
+
+            task = Task.query.filter_by(title='Second').one()
+            task.status = TaskStatus.COMPLETED
+            task.completed_at = datetime.utcnow()
+            db.session.commit()
+
+            run = refresh_snapshots()
+            self.assertEqual(run.first_day, self.today - timedelta(days=3))
+            rows = self._rows()
+            self.assertEqual(len(rows), 5)
+            self.assertEqual(rows[-1][2], 2)
+            self.assertEqual(SnapshotRun.query.count(), 3)
+
+    def test_backdated_time_entry_rebuilds_its_day(self):
+        with app.app_context():
+            refresh_snapshots()
+            # Logged against the later task, on a day before it was created
+            second = Task.query.filter_by(title='Second').one()
+            start = datetime.combine(self.today - timedelta(days=4), datetime.min.time()) + timedelta(hours=10)
+            db.session.add(TimeEntry(task_id=second.id, start_time=start, duration=timedelta(hours=1)))
+            db.session.commit()
+
+            run = refresh_snapshots()
+            self.assertEqual(run.first_day, self.today - timedelta(days=4))
+            rows = self._rows()
+        self.assertEqual(rows[0][3], timedelta(hours=1))
+        self.assertEqual(rows[-1][3], timedelta(hours=3))
+
+    def test_moved_time_entry_rebuilds_its_old_day(self):
+        with app.app_context():
+            refresh_snapshots()
+            entry = TimeEntry.query.one()
+            entry.start_time = datetime.utcnow()
+            db.session.commit()
+
+            run = refresh_snapshots()
+            self.assertEqual(run.first_day, self.today - timedelta(days=3))
+            rows = self._rows()
+        self.assertEqual([r[3] for r in rows], [timedelta()] * 4 + [timedelta(hours=2)])
+
+    def test_deleted_entry_and_reopened_task_rebuild_their_old_days(self):
+        with app.app_context():
+            refresh_snapshots()
+            first = Task.query.filter_by(title='First').one()
+            db.session.delete(first.time_entries[0])
+            first.status = TaskStatus.TODO
+            first.completed_at = None
+            db.session.commit()
+
+            refresh_snapshots()
+            rows = self._rows()
+        self.assertEqual([r[2] for r in rows], [0] * 5)
+        self.assertEqual({r[3] for r in rows}, {timedelta()})
+
+    def test_batch_delete_rebuilds_history(self):
+        with app.app_context():
+            refresh_snapshots()
+            first_id = Task.query.filter_by(title='First').one().id
+        response = self.client.post('/api/tasks/batch', json={'operations': [{'op': 'delete', 'id': first_id}]})
+        self.assertEqual(response.status_code, 200)
+        with app.app_context():
+            run = refresh_snapshots()
+            self.assertEqual(run.first_day, self.today - timedelta(days=4))
+            rows = self._rows()
+        self.assertEqual([r[1] for r in rows], [0, 1, 1, 1, 1])
+        self.assertEqual([r[2] for r in rows], [0] * 5)
+
+    def test_changes_keep_one_row_per_day(self):
+        with app.app_context():
+            SnapshotChange.query.delete()
+            db.session.commit()
+            # Only today's row moves: nothing to record
+            db.session.add(Task(title='Today', project_id=self.project_id))
+            db.session.commit()
+            self.assertEqual(SnapshotChange.query.count(), 0)
+
+            first = Task.query.filter_by(title='First').one()
+            for status in (TaskStatus.IN_PROGRESS, TaskStatus.TODO, TaskStatus.COMPLETED):
+                first.status = status
+                db.session.commit()
+            self.assertEqual([c.day for c in SnapshotChange.query], [self.today - timedelta(days=4)])
+
+    def test_backfill_is_idempotent(self):
+        with app.app_context():
+            backfill_snapshots(self.today - timedelta(days=10), batch_days=3)
+            backfill_snapshots(self.today - timedelta(days=10), batch_days=7)
+            self.assertEqual(len(self._rows()), 11)
+
+    def test_snapshot_endpoint(self):
+        with app.app_context():
+            refresh_snapshots()
+        data = json.loads(self.client.get(f'/api/analytics/snapshots?days=3&project_id={self.project_id}').data)
+        self.assertTrue(data['success'])
+        self.assertEqual(len(data['snapshots']), 3)
+        self.assertEqual(data['snapshots'][-1]['completion_rate'], 50.0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,114 @@
+import threading
+import unittest
+from datetime import datetime, timedelta
+
+from flask import json
+from sqlalchemy import event
+
+from app import app
+from cache import stats_cache
+from models import db, Task, Project, TaskStatus
+
+
+class TestDashboardStats(unittest.TestCase):
+    def setUp(self):
+        app.config['TESTING'] = True
+        self.client = app.test_client()
+        stats_cache.invalidate()
+        with app.app_context():
+            db.create_all()
+            project = Project(name='Stats Project')
+            db.session.add(project)
+            db.session.flush()
+            self.project_id = project.id
+            yesterday = datetime.utcnow() - timedelta(days=1)
+            db.session.add_all([
+                Task(title='Done', status=TaskStatus.COMPLETED, due_date=yesterday, project_id=project.id),
+                Task(title='Doing', status=TaskStatus.IN_PROGRESS, due_date=yesterday, project_id=project.id),
+                Task(title='Todo late', status=TaskStatus.TODO, due_date=yesterday),
+                Task(title='Todo', status=TaskStatus.TODO),
+            ])
+            db.session.commit()
+
+    def tearDown(self):
+        with app.app_context():
+            db.session.remove()
+            db.drop_all()
+
+    def _stats(self, url='/api/stats'):
+        statements = []
+
+        def count(conn, cursor, statement, parameters, context, executemany):
+            statements.append(statement)
+
+        with app.app_context():
+            engine = db.engine
+        event.listen(engine, 'before_cursor_execute', count)
+        try:
+            data = json.loads(self.client.get(url).data)
+        finally:
+            event.remove(engine, 'before_cursor_execute', count)
+        self.assertTrue(data['success'])
+        return data['stats'], len(statements)
+
+    def test_stats_use_one_query_then_cache(self):
+        before = stats_cache.stats()
+        stats, queries = self._stats()
+        self.assertEqual(queries, 1)
+        self.assertEqual(stats, {
+            'total_tasks': 4, 'completed_tasks': 1, 'in_progress_tasks': 1,
+            'overdue_tasks': 2, 'completion_rate': 25.0, 'todo_tasks': 2,
+        })
+
+        cached, queries = self._stats()
+        self.assertEqual(queries, 0)
+        self.assertEqual(cached, stats)
+
+        counters = json.loads(self.client.get('/api/stats/cache').data)['cache']
+        self.assertEqual(counters['hits'] - before['hits'], 1)
+        self.assertEqual(counters['misses'] - before['misses'], 1)
+
+    def test_task_write_invalidates(self):
+        self._stats()
+        self.client.post('/api/tasks', data=json.dumps({'title': 'New'}), content_type='application/json')
+        stats, queries = self._stats()
+        self.assertEqual(queries, 1)
+        self.assertEqual(stats['total_tasks'], 5)
+
+    def test_invalidation_waits_for_commit(self):
+        with app.app_context():
+            db.session.add(Task(title='Uncommitted'))
+            db.session.flush()
+            # A concurrent request (own thread, own session) recomputes from pre-commit data
+            results = []
+            reader = threading.Thread(target=lambda: results.append(self._stats()))
+            reader.start()
+            reader.join()
+            self.assertEqual(results[0][0]['total_tasks'], 4)
+            db.session.commit()
+        stats, queries = self._stats()
+        self.assertEqual(queries, 1)
+        self.assertEqual(stats['total_tasks'], 5)
+
+    def test_rolled_back_write_keeps_the_cache(self):
+        self._stats()
+        invalidations = stats_cache.invalidations
+        with app.app_context():
+            db.session.add(Task(title='Abandoned'))
+            db.session.flush()
+            db.session.rollback()
+            db.session.commit()
+        self.assertEqual(stats_cache.invalidations, invalidations)
+        self.assertEqual(self._stats()[1], 0)
+
+    def test_project_scope(self):
+        stats, _ = self._stats(f'/api/stats?project_id={self.project_id}')
+        self.assertEqual(stats['total_tasks'], 2)
+        self.assertEqual(stats['overdue_tasks'], 1)
+        overall, queries = self._stats()
+        self.assertEqual(queries, 1)
+        self.assertEqual(overall['total_tasks'], 4)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,124 @@
+import unittest
+from datetime import timedelta
+
+from flask import json
+from sqlalchemy import event
+
+from app import app
+from models import db, Task, Project, Subtask, TimeEntry, TaskDependency
+
+
+class TestTaskLoading(unittest.TestCase):
+    def setUp(self):
+        app.config['TESTING'] = True
+        self.client = app.test_client()
+        with app.app_context():
+            db.create_all()
+
+    def tearDown(self):
+        with app.app_context():
+            db.session.remove()
+            db.drop_all()
+
+    def _seed(self, count):
+        """Create `count` tasks, each with a project, subtasks, time entries and a dependency"""
+        with app.app_context():
+            project = Project(name='Load Project')
+            db.session.add(project)
+            db.session.flush()
+            previous = None
+            for i in range(count):
+                task = Task(title=f'Task {i}', project_id=project.id, estimated_hours=4.0)
+                db.session.add(task)
+                db.session.flush()
+                db.session.add(Subtask(parent_task_id=task.id, title='Step 1', completed=True))
+                db.session.add(Subtask(parent_task_id=task.id, title='Step 2'))
+                db.session.add(TimeEntry(task_id=task.id, duration=timedelta(hours=1)))
+                if previous is not None:
+                    db.session.add(TaskDependency(task_id=task.id, depends_on_id=previous))
+                previous = task.id
+            db.session.commit()
+
+    def _count_queries(self, url):
+        statements = []
+
+        def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+            # The ETag version lookup is a constant extra; count task loading only
+            if 'collection_versions' not in statement:
+                statements.append(statement)
+
+        with app.app_context():
+            engine = db.engine
+        event.listen(engine, 'before_cursor_execute', before_cursor_execute)
+        try:
+            response = self.client.get(url)
+        finally:
+            event.remove(engine, 'before_cursor_execute', before_cursor_execute)
+        self.assertEqual(response.status_code, 200)
+        return json.loads(response.data), len(statements)
+
+    def test_task_list_query_count_is_flat(self):
+        """GET /api/tasks issues the same number of queries for 3 or 30 tasks"""
+        self._seed(3)
+        small, small_queries = self._count_queries('/api/tasks')
+        self.assertEqual(small['count'], 3)
+
+        self._seed(27)
+        large, large_queries = self._count_queries('/api/tasks')
+        self.assertEqual(large['count'], 30)
+
+        self.assertEqual(small_queries, large_queries)
+        self.assertLessEqual(large_queries, 8)
+
+    def test_recent_tasks_query_count_is_flat(self):
+        self._seed(3)
+        _, small_queries = self._count_queries('/api/tasks/recent?limit=50')
+        self._seed(20)
+        _, large_queries = self._count_queries('/api/tasks/recent?limit=50')
+        self.assertEqual(small_queries, large_queries)
+
+    def test_eager_loaded_payload_matches_relationships(self):
+        self._seed(2)
+        data, _ = self._count_queries('/api/tasks')
+        tasks = {t['title']: t for t in data['tasks']}
+        second = tasks['Task 1']
+        self.assertEqual(second['project_name'], 'Load Project')
+        self.assertEqual(second['subtask_count'], 2)
+        self.assertEqual(second['completed_subtasks'], 1)
+        self.assertEqual(len(second['time_entries']), 1)
+        self.assertEqual(second['dependencies'], [tasks['Task 0']['id']])
+        self.assertEqual(tasks['Task 0']['dependent_tasks'], [second['id']])
+
+    def test_compact_view_skips_relationships(self):
+        """?view=compact returns only card fields and loads no relationships"""
+        self._seed(5)
+        data, queries = self._count_queries('/api/tasks?view=compact')
+        self.assertEqual(set(data['tasks'][0]), {'id', 'title', 'status', 'priority', 'due_date', 'card_color'})
+        self.assertEqual(queries, 1)
+
+    def test_fields_parameter_selects_keys(self):
+        self._seed(2)
+        data, _ = self._count_queries('/api/tasks?fields=title,subtask_count')
+        self.assertEqual(set(data['tasks'][0]), {'id', 'title', 'subtask_count'})
+        self.assertEqual(data['tasks'][0]['subtask_count'], 2)
+
+        task_id = data['tasks'][0]['id']
+        single, _ = self._count_queries(f'/api/tasks/{task_id}?view=compact')
+        self.assertNotIn('subtasks', single['task'])
+
+        recent, _ = self._count_queries('/api/tasks/recent?fields=project_name')
+        self.assertEqual(recent['tasks'][0]['project_name'], 'Load Project')
+
+    def test_unknown_field_is_rejected(self):
+        response = self.client.get('/api/tasks?fields=title,nope')
+        self.assertEqual(response.status_code, 400)
+        response = self.client.get('/api/tasks?view=huge')
+        self.assertEqual(response.status_code, 400)
+
+    def test_missing_task_returns_404(self):
+        response = self.client.get('/api/tasks/999999')
+        self.assertEqual(response.status_code, 404)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,129 @@
+"""
+Collection version counters and strong ETags for polled endpoints.
+
+Each API collection ('tasks', 'projects', 'activity') has a row in
+collection_versions whose counter is incremented by every transaction that
+writes a model the collection's payload depends on: ORM flushes are seen
+through after_flush, bulk UPDATE/DELETE/INSERT statements through
+do_orm_execute. Because the counter lives in the database it is shared by
+every worker, and reading it is a primary-key lookup, so a poller whose
+If-None-Match still matches gets a 304 before any task is loaded or
+serialized.
+
+The increment is the last statement of the writing transaction: writes only
+note the collections they touch, and before_commit flushes what is left and
+bumps the counters on the same connection. The counter row is locked only
+between that UPDATE and the COMMIT right after it, and since the bump
+commits or rolls back with the write, the tag can never describe stale data.
+"""
+import hashlib
+
+from flask import request, make_response
+from sqlalchemy import event, update, insert
+from sqlalchemy.orm import Session
+
+from config import db
+from models import (Task, Project, Subtask, TimeEntry, TaskDependency, Activity,
+                    CollectionVersion)
+
+COLLECTIONS = ('tasks', 'projects', 'activity')
+
+# session.info key: collections to bump when the session's transaction commits
+_PENDING = 'bump_versions'
+
+# Model -> collections whose serialized payload it appears in
+MODEL_COLLECTIONS = {
+    Task: ('tasks', 'projects'),          # projects carry task_count
+    Project: ('projects', 'tasks'),       # tasks carry project_name / project_color
+    Subtask: ('tasks',),
+    TimeEntry: ('tasks',),
+    TaskDependency: ('tasks',),
+    Activity: ('activity',),
+}
+
+
+# Table name -> collections, for bulk statements (ORM-enabled or plain Core)
+TABLE_COLLECTIONS = {model.__tablename__: names for model, names in MODEL_COLLECTIONS.items()}
+
+
+def bump_versions(connection, names):
+    """Increment the counters for names on connection (inside its transaction; keep it short)."""
+    table = CollectionVersion.__table__
+    for name in sorted(names):
+        connection.execute(update(table).where(table.c.name == name).values(version=table.c.version + 1))
+
+
+def get_versions(*names):
+    """Current counters for names, or None if any is missing (then nothing is cacheable)"""
+    table = CollectionVersion.__table__
+    rows = db.session.execute(table.select().where(table.c.name.in_(names)))
+    found = {name: version for name, version in rows}
+    if len(found) != len(names):
+        return None
+    return tuple(found[name] for name in names)
+
+
+def _collections_for(objects):
+    names = set()
+    for obj in objects:
+        names.update(MODEL_COLLECTIONS.get(type(obj), ()))
+    return names
+
+
+@event.listens_for(CollectionVersion.__table__, 'after_create')
+def _seed_versions(table, connection, **kw):
+    connection.execute(insert(table), [{'name': name, 'version': 0} for name in COLLECTIONS])
+
+
+@event.listens_for(Session, 'after_flush')
+def _note_flushed(session, flush_context):
+    dirty = (obj for obj in session.dirty if session.is_modified(obj, include_collections=False))
+    names = _collections_for((*session.new, *dirty, *session.deleted))
+    if names:
+        session.info.setdefault(_PENDING, set()).update(names)
+
+
+@event.listens_for(Session, 'do_orm_execute')
+def _note_bulk_statement(orm_execute_state):
+    if orm_execute_state.is_update or orm_execute_state.is_delete or orm_execute_state.is_insert:
+        table = getattr(orm_execute_state.statement, 'table', None)
+        names = TABLE_COLLECTIONS.get(getattr(table, 'name', None))
+        if names:
+            orm_execute_state.session.info.setdefault(_PENDING, set()).update(names)
+
+
+@event.listens_for(Session, 'before_commit')
+def _bump_before_commit(session):
+    # Flush first so the last changes are noted, then bump as late as possible
+    session.flush()
+    names = session.info.pop(_PENDING, None)
+    if names:
+        bump_versions(session.connection(), names)
+
+
+@event.listens_for(Session, 'after_rollback')
+def _forget_rolled_back(session):
+    session.info.pop(_PENDING, None)
+
+
+def make_etag(*parts):
+    """Strong ETag for the current request URL and the given version parts"""
+    digest = hashlib.sha1(repr((request.full_path, parts)).encode('utf-8')).hexdigest()
+    return digest[:32]
+
+
+def not_modified(etag):
+    """304 response if the client already holds etag, else None"""
+    if etag and request.if_none_match.contains(etag):
+        response = make_response('', 304)
+        response.set_etag(etag)
+        response.headers['Cache-Control'] = 'no-cache'
+        return response
+    return None
+
+
+def with_etag(response, etag):
+    response.set_etag(etag)
+    # Let browsers keep the body but revalidate it on every fetch
+    response.headers['Cache-Control'] = 'no-cache'
+    return response